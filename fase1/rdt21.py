@@ -15,6 +15,8 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.packet import RDT21Packet, PACKET_TYPE_DATA, PACKET_TYPE_ACK
 from utils.simulator import UnreliableChannel
 from utils.logger import ProtocolLogger
+from utils.delivery_queue import DeliveryQueue
+from utils.buffer_pool import shared_pool, recv_view
 
 
 # Implementacao da classe RDT21Sender:
@@ -44,49 +46,50 @@ class RDT21Sender:
         ack_received = False
         attempt = 0
         
-        while not ack_received:
-            attempt += 1
-            
-            if attempt == 1:
-                self.logger.send(packet)
-                self.packets_sent += 1
-            else:
-                self.logger.retransmit(packet)
-                self.retransmissions += 1
-            
-            packet_bytes = packet.to_bytes()
-            
-            if self.channel:
-                self.channel.send(packet_bytes, self.socket, self.dest_addr)
-            else:
-                self.socket.sendto(packet_bytes, self.dest_addr)
-            
-            self.socket.settimeout(2.0)
-            
-            try:
-                response_bytes, _ = self.socket.recvfrom(1024)
-                response, is_valid = RDT21Packet.from_bytes(response_bytes)
+        with shared_pool.slab() as slab:
+            while not ack_received:
+                attempt += 1
                 
-                if not is_valid:
-                    self.logger.corrupt()
-                    self.logger.warning("Corrupted ACK, retransmitting...")
-                    continue
+                if attempt == 1:
+                    self.logger.send(packet)
+                    self.packets_sent += 1
+                else:
+                    self.logger.retransmit(packet)
+                    self.retransmissions += 1
+                
+                packet_bytes = packet.to_bytes()
                 
-                self.logger.receive(response)
+                if self.channel:
+                    self.channel.send(packet_bytes, self.socket, self.dest_addr)
+                else:
+                    self.socket.sendto(packet_bytes, self.dest_addr)
                 
-                if response.packet_type == PACKET_TYPE_ACK:
-                    if response.seq_num == self.seq_num:
-                        self.logger.success(f"✓ ACK({self.seq_num}) received")
-                        ack_received = True
-                    else:
-                        self.logger.warning(f"✗ Wrong ACK number (expected {self.seq_num}, got {response.seq_num})")
+                self.socket.settimeout(2.0)
+                
+                try:
+                    response_bytes, _ = recv_view(self.socket, slab, 1024)
+                    response, is_valid = RDT21Packet.from_bytes(response_bytes)
+                    
+                    if not is_valid:
+                        self.logger.corrupt()
+                        self.logger.warning("Corrupted ACK, retransmitting...")
                         continue
-                        
-            except socket.timeout:
-                self.logger.timeout()
-                continue
-        
-        self.seq_num = 1 - self.seq_num
+                    
+                    self.logger.receive(response)
+                    
+                    if response.packet_type == PACKET_TYPE_ACK:
+                        if response.seq_num == self.seq_num:
+                            self.logger.success(f"✓ ACK({self.seq_num}) received")
+                            ack_received = True
+                        else:
+                            self.logger.warning(f"✗ Wrong ACK number (expected {self.seq_num}, got {response.seq_num})")
+                            continue
+                            
+                except socket.timeout:
+                    self.logger.timeout()
+                    continue
+            
+            self.seq_num = 1 - self.seq_num
     
     def get_statistics(self):
         return {
@@ -101,14 +104,14 @@ class RDT21Sender:
 # Implementacao da classe RDT21Receiver:
 class RDT21Receiver:
     # Construtor - inicializa o objeto
-    def __init__(self, port):
+    def __init__(self, port, delivery_capacity=DeliveryQueue.DEFAULT_CAPACITY):
         self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.bind(('', port))
         self.logger = ProtocolLogger("RECEIVER-2.1")
         self.expected_seq_num = 0
         
-        self.received_messages = []
+        self.delivery = DeliveryQueue(delivery_capacity)
         
         self.packets_received = 0
         self.corrupted_packets = 0
@@ -124,62 +127,75 @@ class RDT21Receiver:
         self.recv_thread.start()
         self.logger.info(f"Listening on port {self.port}")
     def _receive_loop(self):
-        while self.running:
-            try:
-                self.socket.settimeout(1.0)
-                packet_bytes, sender_addr = self.socket.recvfrom(1024)
-                packet, is_valid = RDT21Packet.from_bytes(packet_bytes)
-                
-                if packet and packet.packet_type == PACKET_TYPE_DATA:
-                    self.logger.receive(packet)
-                    self.packets_received += 1
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    self.socket.settimeout(1.0)
+                    packet_bytes, sender_addr = recv_view(self.socket, slab, 1024)
+                    packet, is_valid = RDT21Packet.from_bytes(packet_bytes)
                     
-                    if not is_valid:
-                        self.logger.corrupt()
-                        self.corrupted_packets += 1
-                        
-                        prev_seq = 1 - self.expected_seq_num
-                        ack = RDT21Packet(PACKET_TYPE_ACK, prev_seq)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
+                    if packet and packet.packet_type == PACKET_TYPE_DATA:
+                        self.logger.receive(packet)
+                        self.packets_received += 1
                         
-                    elif packet.seq_num == self.expected_seq_num:
-                        self.received_messages.append(packet.data)
-                        self.logger.deliver(packet.data)
-                        
-                        ack = RDT21Packet(PACKET_TYPE_ACK, self.expected_seq_num)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-                        self.expected_seq_num = 1 - self.expected_seq_num
-                        
-                    else:
-                        self.logger.warning(f"Duplicate packet (expected {self.expected_seq_num}, got {packet.seq_num})")
-                        self.duplicate_packets += 1
-                        
-                        ack = RDT21Packet(PACKET_TYPE_ACK, packet.seq_num)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    self.logger.error(f"Error in receive loop: {e}")
+                        if not is_valid:
+                            self.logger.corrupt()
+                            self.corrupted_packets += 1
+                            
+                            prev_seq = 1 - self.expected_seq_num
+                            ack = RDT21Packet(PACKET_TYPE_ACK, prev_seq)
+                            self.logger.send(ack)
+                            self.socket.sendto(ack.to_bytes(), sender_addr)
+                            
+                        elif packet.seq_num == self.expected_seq_num:
+                            if not self.delivery.offer(packet.data):
+                                self.logger.warning("Delivery queue full, dropping packet (backpressure)")
+                                continue
+                            self.logger.deliver(packet.data)
+                            
+                            ack = RDT21Packet(PACKET_TYPE_ACK, self.expected_seq_num)
+                            self.logger.send(ack)
+                            self.socket.sendto(ack.to_bytes(), sender_addr)
+                            
+                            self.expected_seq_num = 1 - self.expected_seq_num
+                            
+                        else:
+                            self.logger.warning(f"Duplicate packet (expected {self.expected_seq_num}, got {packet.seq_num})")
+                            self.duplicate_packets += 1
+                            
+                            ack = RDT21Packet(PACKET_TYPE_ACK, packet.seq_num)
+                            self.logger.send(ack)
+                            self.socket.sendto(ack.to_bytes(), sender_addr)
+                            
+                except socket.timeout:
+                    continue
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error in receive loop: {e}")
     
     # Para operacao
     def stop(self):
         self.running = False
+        self.delivery.close()
         if self.recv_thread:
             self.recv_thread.join(timeout=2.0)
+    # Metodo para retirar as mensagens pendentes: consome a fila, entao uma segunda chamada
+    # so retorna o que chegou depois (nao e mais a lista acumulada de tudo que foi recebido)
     def get_messages(self):
-        return self.received_messages
+        return self.delivery.drain()
+    # Metodo para receber uma mensagem (bloqueante, None em timeout)
+    def read(self, timeout=None):
+        return self.delivery.read(timeout)
+    def read_into(self, buffer, timeout=None):
+        return self.delivery.read_into(buffer, timeout)
+    def __iter__(self):
+        return iter(self.delivery)
     def get_statistics(self):
         return {
             'packets_received': self.packets_received,
             'corrupted_packets': self.corrupted_packets,
             'duplicate_packets': self.duplicate_packets,
-            'messages_delivered': len(self.received_messages)
+            'messages_delivered': self.delivery.total_delivered
         }
     # Fecha e libera recursos
     def close(self):
@@ -221,7 +237,7 @@ def test_rdt21():
     sender.close()
     
     print("\n--- Teste 2: 20% Corrupção em DATA e ACK ---\n")
-    receiver.received_messages.clear()
+    receiver.delivery.clear()
     
     sender = RDT21Sender(('localhost', 9001), use_simulator=True, corrupt_rate=0.2)
     
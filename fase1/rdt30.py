@@ -1,10 +1,12 @@
 """
 RDT 3.0 - Transferência Confiável com Timer (Canal com Perdas)
 Implementa protocolo alternante com timeout para detectar perdas
+Fragmenta mensagens maiores que o datagrama negociado e remonta no receptor
 Referência: Seção 3.4.1, Figuras 3.15 e 3.16
 """
 
 import socket
+import struct
 import sys
 import time
 import threading
@@ -15,13 +17,15 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.packet import RDT30Packet, PACKET_TYPE_DATA, PACKET_TYPE_ACK
 from utils.simulator import UnreliableChannel
 from utils.logger import ProtocolLogger
+from utils.delivery_queue import DeliveryQueue
+from utils.buffer_pool import shared_pool, recv_view
 
 
 # Implementacao da classe RDT30Sender:
 class RDT30Sender:
     # Construtor - inicializa o objeto
     def __init__(self, dest_addr, timeout=2.0, use_simulator=False, 
-                 loss_rate=0.0, corrupt_rate=0.0):
+                 loss_rate=0.0, corrupt_rate=0.0, max_datagram=RDT30Packet.MAX_DATAGRAM):
         self.dest_addr = dest_addr
         self.timeout = timeout
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -29,6 +33,10 @@ class RDT30Sender:
         self.logger = ProtocolLogger("SENDER-3.0")
         self.seq_num = 0
         
+        # Maximo local; o efetivo e o minimo com o anunciado pelo receptor
+        self.max_datagram = max_datagram
+        self.peer_max_datagram = None
+        
         if use_simulator:
             self.channel = UnreliableChannel(
                 loss_rate=loss_rate, 
@@ -39,70 +47,104 @@ class RDT30Sender:
             self.channel = None
         
         self.packets_sent = 0
+        self.messages_sent = 0
         self.retransmissions = 0
         self.timeouts = 0
         self.start_time = None
         self.total_bytes_sent = 0
     
+    def _fragment_size(self):
+        max_datagram = self.max_datagram
+        if self.peer_max_datagram is None:
+            max_datagram = min(max_datagram, RDT30Packet.DEFAULT_MAX_DATAGRAM)
+        else:
+            max_datagram = min(max_datagram, self.peer_max_datagram)
+        return max_datagram - RDT30Packet.HEADER_SIZE
+    
     # Metodo para enviar dados
     def send_message(self, message):
         if isinstance(message, str):
             message = message.encode()
         self.total_bytes_sent += len(message)
+        self.messages_sent += 1
         
-        packet = RDT30Packet(PACKET_TYPE_DATA, self.seq_num, message)
-        
+        # Fragmenta de forma transparente; cada fragmento e um stop-and-wait
+        view = memoryview(message)
+        offset = 0
+        while True:
+            size = self._fragment_size()
+            chunk = view[offset:offset + size]
+            end = offset + len(chunk)
+            flags = RDT30Packet.FLAG_MORE_FRAGMENTS if end < len(message) else 0
+            if not self._send_packet(RDT30Packet(PACKET_TYPE_DATA, self.seq_num, bytes(chunk), flags)):
+                # Receptor anunciou datagrama menor: refragmenta a partir do mesmo offset
+                continue
+            offset = end
+            if offset >= len(message):
+                break
+    
+    # Stop-and-wait de um pacote; False se ele nao cabe no datagrama anunciado pelo receptor
+    # (que o truncaria), sem alternar o seq
+    def _send_packet(self, packet):
         ack_received = False
         attempt = 0
         
-        while not ack_received:
-            attempt += 1
-            
-            if attempt == 1:
-                self.logger.send(packet)
-                self.packets_sent += 1
-            else:
-                self.logger.retransmit(packet)
-                self.retransmissions += 1
-            
-            packet_bytes = packet.to_bytes()
-            
-            if self.channel:
-                self.channel.send(packet_bytes, self.socket, self.dest_addr)
-            else:
-                self.socket.sendto(packet_bytes, self.dest_addr)
-            
-            self.socket.settimeout(self.timeout)
-            
-            try:
-                response_bytes, _ = self.socket.recvfrom(1024)
-                response, is_valid = RDT30Packet.from_bytes(response_bytes)
+        with shared_pool.slab() as slab:
+            while not ack_received:
+                attempt += 1
                 
-                if not is_valid:
-                    self.logger.corrupt()
-                    self.logger.warning("Corrupted ACK, waiting for timeout...")
-                    continue
+                if attempt == 1:
+                    self.logger.send(packet)
+                    self.packets_sent += 1
+                else:
+                    self.logger.retransmit(packet)
+                    self.retransmissions += 1
+                
+                packet_bytes = packet.to_bytes()
+                
+                if self.channel:
+                    self.channel.send(packet_bytes, self.socket, self.dest_addr)
+                else:
+                    self.socket.sendto(packet_bytes, self.dest_addr)
                 
-                self.logger.receive(response)
+                self.socket.settimeout(self.timeout)
                 
-                if response.packet_type == PACKET_TYPE_ACK:
-                    if response.seq_num == self.seq_num:
-                        self.logger.success(f"✓ ACK({self.seq_num}) received")
-                        ack_received = True
-                    else:
-                        self.logger.warning(f"✗ Old ACK (expected {self.seq_num}, got {response.seq_num})")
+                try:
+                    response_bytes, _ = recv_view(self.socket, slab, 1024)
+                    response, is_valid = RDT30Packet.from_bytes(response_bytes)
+                    
+                    if not is_valid:
+                        self.logger.corrupt()
+                        self.logger.warning("Corrupted ACK, waiting for timeout...")
                         continue
-                        
-            except socket.timeout:
-                self.logger.timeout()
-                self.timeouts += 1
-                continue
-        
-        self.seq_num = 1 - self.seq_num
+                    
+                    self.logger.receive(response)
+                    
+                    if response.packet_type == PACKET_TYPE_ACK:
+                        if len(response.data) == 4:
+                            self.peer_max_datagram = struct.unpack('!I', response.data)[0]
+                        if response.seq_num == self.seq_num:
+                            self.logger.success(f"✓ ACK({self.seq_num}) received")
+                            ack_received = True
+                        elif self.peer_max_datagram is not None and len(packet_bytes) > self.peer_max_datagram:
+                            self.logger.warning(f"Packet larger than receiver datagram ({self.peer_max_datagram}), re-fragmenting")
+                            return False
+                        else:
+                            self.logger.warning(f"✗ Old ACK (expected {self.seq_num}, got {response.seq_num})")
+                            continue
+                            
+                except socket.timeout:
+                    self.logger.timeout()
+                    self.timeouts += 1
+                    continue
+            
+            self.seq_num = 1 - self.seq_num
+        return True
     
     def get_statistics(self):
         return {
             'packets_sent': self.packets_sent,
+            'messages_sent': self.messages_sent,
             'retransmissions': self.retransmissions,
             'timeouts': self.timeouts,
             'total_transmissions': self.packets_sent + self.retransmissions,
@@ -118,14 +160,22 @@ class RDT30Sender:
 # Implementacao da classe RDT30Receiver:
 class RDT30Receiver:
     # Construtor - inicializa o objeto
-    def __init__(self, port):
+    def __init__(self, port, delivery_capacity=DeliveryQueue.DEFAULT_CAPACITY,
+                 max_datagram=RDT30Packet.MAX_DATAGRAM):
+        # O datagrama e lido num slab do pool: maior que ele, todo recv_view falharia no loop
+        if not RDT30Packet.HEADER_SIZE < max_datagram <= shared_pool.slab_size:
+            raise ValueError(f"max_datagram deve estar entre {RDT30Packet.HEADER_SIZE + 1} e {shared_pool.slab_size}")
         self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.bind(('', port))
         self.logger = ProtocolLogger("RECEIVER-3.0")
         self.expected_seq_num = 0
         
-        self.received_messages = []
+        # Buffer de recepcao dimensionado pelo maximo anunciado nos ACKs
+        self.max_datagram = max_datagram
+        self.fragments = []
+        
+        self.delivery = DeliveryQueue(delivery_capacity)
         
         self.packets_received = 0
         self.corrupted_packets = 0
@@ -140,63 +190,82 @@ class RDT30Receiver:
         self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
         self.recv_thread.start()
         self.logger.info(f"Listening on port {self.port}")
+    def _send_ack(self, seq_num, addr):
+        ack = RDT30Packet(PACKET_TYPE_ACK, seq_num, struct.pack('!I', self.max_datagram))
+        self.logger.send(ack)
+        self.socket.sendto(ack.to_bytes(), addr)
     def _receive_loop(self):
-        while self.running:
-            try:
-                self.socket.settimeout(1.0)
-                packet_bytes, sender_addr = self.socket.recvfrom(1024)
-                packet, is_valid = RDT30Packet.from_bytes(packet_bytes)
-                
-                if packet and packet.packet_type == PACKET_TYPE_DATA:
-                    self.logger.receive(packet)
-                    self.packets_received += 1
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    self.socket.settimeout(1.0)
+                    packet_bytes, sender_addr = recv_view(self.socket, slab, self.max_datagram)
+                    packet, is_valid = RDT30Packet.from_bytes(packet_bytes)
                     
-                    if not is_valid:
-                        self.logger.corrupt()
-                        self.corrupted_packets += 1
-                        
-                        prev_seq = 1 - self.expected_seq_num
-                        ack = RDT30Packet(PACKET_TYPE_ACK, prev_seq)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-                    elif packet.seq_num == self.expected_seq_num:
-                        self.received_messages.append(packet.data)
-                        self.logger.deliver(packet.data)
-                        
-                        ack = RDT30Packet(PACKET_TYPE_ACK, self.expected_seq_num)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-                        self.expected_seq_num = 1 - self.expected_seq_num
+                    if packet and packet.packet_type == PACKET_TYPE_DATA:
+                        self.logger.receive(packet)
+                        self.packets_received += 1
                         
-                    else:
-                        self.logger.warning(f"Duplicate packet (expected {self.expected_seq_num}, got {packet.seq_num})")
-                        self.duplicate_packets += 1
-                        
-                        ack = RDT30Packet(PACKET_TYPE_ACK, packet.seq_num)
-                        self.logger.send(ack)
-                        self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    self.logger.error(f"Error in receive loop: {e}")
+                        if not is_valid:
+                            self.logger.corrupt()
+                            self.corrupted_packets += 1
+                            
+                            prev_seq = 1 - self.expected_seq_num
+                            self._send_ack(prev_seq, sender_addr)
+                            
+                        elif packet.seq_num == self.expected_seq_num:
+                            if packet.more_fragments:
+                                self.fragments.append(packet.data)
+                            else:
+                                if self.fragments:
+                                    message = b''.join(self.fragments) + packet.data
+                                else:
+                                    message = packet.data
+                                if not self.delivery.offer(message):
+                                    self.logger.warning("Delivery queue full, dropping packet (backpressure)")
+                                    continue
+                                self.fragments = []
+                                self.logger.deliver(message)
+                            
+                            self._send_ack(self.expected_seq_num, sender_addr)
+                            
+                            self.expected_seq_num = 1 - self.expected_seq_num
+                            
+                        else:
+                            self.logger.warning(f"Duplicate packet (expected {self.expected_seq_num}, got {packet.seq_num})")
+                            self.duplicate_packets += 1
+                            
+                            self._send_ack(packet.seq_num, sender_addr)
+                            
+                except socket.timeout:
+                    continue
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error in receive loop: {e}")
     
     # Para operacao
     def stop(self):
         self.running = False
+        self.delivery.close()
         if self.recv_thread:
             self.recv_thread.join(timeout=2.0)
+    # Metodo para retirar as mensagens pendentes: consome a fila, entao uma segunda chamada
+    # so retorna o que chegou depois (nao e mais a lista acumulada de tudo que foi recebido)
     def get_messages(self):
-        return self.received_messages
+        return self.delivery.drain()
+    # Metodo para receber uma mensagem (bloqueante, None em timeout)
+    def read(self, timeout=None):
+        return self.delivery.read(timeout)
+    def read_into(self, buffer, timeout=None):
+        return self.delivery.read_into(buffer, timeout)
+    def __iter__(self):
+        return iter(self.delivery)
     def get_statistics(self):
         return {
             'packets_received': self.packets_received,
             'corrupted_packets': self.corrupted_packets,
             'duplicate_packets': self.duplicate_packets,
-            'messages_delivered': len(self.received_messages)
+            'messages_delivered': self.delivery.total_delivered
         }
     # Fecha e libera recursos
     def close(self):
@@ -240,7 +309,7 @@ def test_rdt30():
     sender.close()
     
     print("\n--- Teste 2: 15% Perda de Pacotes e ACKs ---\n")
-    receiver.received_messages.clear()
+    receiver.delivery.clear()
     
     sender = RDT30Sender(('localhost', 9002), timeout=1.5, use_simulator=True,
                         loss_rate=0.15, corrupt_rate=0.0)
@@ -270,7 +339,7 @@ def test_rdt30():
     sender.close()
     
     print("\n--- Teste 3: Perda (15%) + Corrupção (10%) + Atraso Variável ---\n")
-    receiver.received_messages.clear()
+    receiver.delivery.clear()
     
     sender = RDT30Sender(('localhost', 9002), timeout=1.5, use_simulator=True,
                         loss_rate=0.15, corrupt_rate=0.10)
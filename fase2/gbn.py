@@ -16,27 +16,57 @@ sys.path.append(str(Path(__file__).parent.parent))
 from utils.gbn_packet import GBNPacket
 from utils.simulator import UnreliableChannel
 from utils.logger import ProtocolLogger
+from utils.delivery_queue import DeliveryQueue
+from utils.packet_ring import PacketRing
+from utils.file_chunks import iter_file_chunks
+from utils.buffer_pool import shared_pool, recv_view
 
 
 # Implementacao da classe GBNSender:
 class GBNSender:
     # Construtor - inicializa o objeto
     def __init__(self, dest_addr, window_size=5, timeout=1.0, 
-                 use_simulator=False, loss_rate=0.0, corrupt_rate=0.0, channel=None):
+                 use_simulator=False, loss_rate=0.0, corrupt_rate=0.0, channel=None,
+                 dup_ack_threshold=3, congestion_control=False, initial_cwnd=1,
+                 endpoint=None, flow_id=None):
         self.dest_addr = dest_addr
         self.window_size = window_size
         self.timeout = timeout
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(('', 0))
-        self.logger = ProtocolLogger("GBN-SENDER")
+        
+        # AIMD opcional (slow start + aumento aditivo + reducao multiplicativa);
+        # window_size passa a ser o limite superior da janela de congestionamento
+        self.congestion_control = congestion_control
+        self.cwnd = float(initial_cwnd if congestion_control else window_size)
+        self.ssthresh = float(window_size)
+        self.cwnd_history = deque(maxlen=10000)
+        
+        # Fast retransmit: ACKs duplicados de base-1 antes do timer (None desativa)
+        self.dup_ack_threshold = dup_ack_threshold
+        self.dup_ack_count = 0
+        self.recovery_start = None
+        
+        # Com endpoint, o fluxo compartilha o socket e a thread de recepcao (ACKs por flow_id)
+        self.endpoint = endpoint
+        self.flow_id = flow_id
+        if endpoint:
+            self.socket = endpoint.socket
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(('', 0))
+        self.logger = ProtocolLogger("GBN-SENDER" if flow_id is None else f"GBN-SENDER-{flow_id}")
         
         self.base = 0
         self.next_seq_num = 0
+        # Proximo seq a (re)transmitir; fica atras de next_seq_num durante o go-back
+        self.send_next = 0
         
-        self.sent_packets = {}
+        # Datagramas codificados da janela, slot = seq % window_size
+        self.sent_packets = PacketRing(window_size)
         
         self.timer = None
         self.timer_lock = threading.Lock()
+        # Com endpoint, o prazo de retransmissao fica no loop do endpoint (sem threading.Timer)
+        self.timer_deadline = None
         
         self.retransmit_count = 0
         self.max_retransmits = 100
@@ -58,18 +88,32 @@ class GBNSender:
         self.packets_sent = 0
         self.retransmissions = 0
         self.timeouts = 0
+        self.fast_retransmits = 0
+        self.recovery_time = 0.0
+        self.recoveries = 0
         self.total_bytes_sent = 0
         self.start_time = None
         
         self.lock = threading.Lock()
+        # Sinalizada quando a janela desliza (base avanca) ou o sender para
+        self.window_cond = threading.Condition(self.lock)
     
     # Inicia operacao
     def start(self):
         self.running = True
-        self.recv_thread = threading.Thread(target=self._receive_acks, daemon=True)
-        self.recv_thread.start()
+        if self.endpoint:
+            self.endpoint.register(self.flow_id, self, sender=True)
+        else:
+            self.recv_thread = threading.Thread(target=self._receive_acks, daemon=True)
+            self.recv_thread.start()
         self.start_time = time.time()
+        with self.lock:
+            self._record_cwnd()
     def _start_timer(self):
+        if self.endpoint:
+            self.timer_deadline = time.time() + self.timeout
+            self.endpoint.wake_at(self, self.timer_deadline)
+            return
         with self.timer_lock:
             if self.timer:
                 self.timer.cancel()
@@ -77,70 +121,154 @@ class GBNSender:
             self.timer.daemon = True
             self.timer.start()
     def _stop_timer(self):
+        self.timer_deadline = None
         with self.timer_lock:
             if self.timer:
                 self.timer.cancel()
                 self.timer = None
     def _timeout_handler(self):
         with self.lock:
-            self.retransmit_count += 1
-            if self.retransmit_count > self.max_retransmits:
-                self.logger.log_error(f"Exceeded max retransmits ({self.max_retransmits}), stopping transmission")
-                self.running = False
+            self._on_timeout()
+    
+    # Chamado pelo FlowEndpoint quando o prazo de retransmissao pode ter vencido
+    def _on_wakeup(self):
+        with self.lock:
+            if self.timer_deadline is None or not self.running:
                 return
-            self.logger.timeout()
-            self.timeouts += 1
-            
-            for seq in range(self.base, self.next_seq_num):
-                if seq in self.sent_packets:
-                    self.logger.retransmit(f"Packet seq={seq}")
-                    self.retransmissions += 1
-                    
-                    packet_bytes = self.sent_packets[seq]
-                    if self.channel:
-                        self.channel.send(packet_bytes, self.socket, self.dest_addr)
-                    else:
-                        self.socket.sendto(packet_bytes, self.dest_addr)
+            if time.time() < self.timer_deadline:
+                # Timer rearmado depois do agendamento: acorda de novo no prazo atual
+                self.endpoint.wake_at(self, self.timer_deadline)
+                return
+            self.timer_deadline = None
+            self._on_timeout()
+    
+    # Timeout: go-back a partir da base (chamado com self.lock adquirido)
+    def _on_timeout(self):
+        self.retransmit_count += 1
+        if self.retransmit_count > self.max_retransmits:
+            self.logger.log_error(f"Exceeded max retransmits ({self.max_retransmits}), stopping transmission")
+            self.running = False
+            self.window_cond.notify_all()
+            return
+        self.logger.timeout()
+        self.timeouts += 1
+        if self.recovery_start is None:
+            self.recovery_start = time.time()
+        
+        self._on_congestion(timeout=True)
+        self._retransmit_window()
+        self._start_timer()
+    
+    # Volta para a base e retransmite o que couber na janela (chamado com self.lock adquirido)
+    def _retransmit_window(self):
+        self.send_next = self.base
+        self._pump_retransmissions()
+    
+    # Retransmite pendentes de send_next ate o limite da janela efetiva (chamado com self.lock adquirido)
+    def _pump_retransmissions(self):
+        limit = min(self.next_seq_num, self.base + self._effective_window())
+        if self.send_next >= limit:
+            return
+        for seq, packet_bytes in enumerate(self.sent_packets.range(self.send_next, limit), self.send_next):
+            self.logger.retransmit(f"Packet seq={seq}")
+            self.retransmissions += 1
             
+            if self.channel:
+                self.channel.send(packet_bytes, self.socket, self.dest_addr)
+            else:
+                self.socket.sendto(packet_bytes, self.dest_addr)
+        self.send_next = limit
+    
+    def _effective_window(self):
+        return min(self.window_size, max(1, int(self.cwnd)))
+    
+    def _record_cwnd(self):
+        elapsed = time.time() - self.start_time if self.start_time else 0.0
+        self.cwnd_history.append((elapsed, self.cwnd))
+    
+    # Slow start ate ssthresh, depois aumento aditivo de ~1 pacote por janela confirmada
+    def _on_new_ack(self, acked):
+        if not self.congestion_control:
+            return
+        for _ in range(acked):
+            if self.cwnd < self.ssthresh:
+                self.cwnd += 1
+            else:
+                self.cwnd += 1 / self.cwnd
+        self.cwnd = min(self.cwnd, float(self.window_size))
+        self._record_cwnd()
+    
+    # Reducao multiplicativa: timeout volta a 1, fast retransmit corta pela metade
+    def _on_congestion(self, timeout):
+        if not self.congestion_control:
+            return
+        self.ssthresh = max(self.cwnd / 2, 2.0)
+        self.cwnd = 1.0 if timeout else self.ssthresh
+        self.logger.info(f"Congestion ({'timeout' if timeout else 'dup ACKs'}): cwnd={self.cwnd:.1f}, ssthresh={self.ssthresh:.1f}")
+        self._record_cwnd()
+    
+    # Trata ACK duplicado de base-1 (chamado com self.lock adquirido)
+    def _on_duplicate_ack(self, ack_seq):
+        self.dup_ack_count += 1
+        if self.recovery_start is None:
+            self.recovery_start = time.time()
+        if self.dup_ack_threshold and self.dup_ack_count == self.dup_ack_threshold:
+            self.logger.warning(f"{self.dup_ack_count} duplicate ACK({ack_seq}) - fast retransmit from seq={self.base}")
+            self.fast_retransmits += 1
+            self._on_congestion(timeout=False)
+            self._retransmit_window()
             self._start_timer()
     
     def _receive_acks(self):
         self.socket.settimeout(0.1)
-        while self.running:
-            try:
-                ack_bytes, _ = self.socket.recvfrom(1024)
-                ack, is_valid = GBNPacket.from_bytes(ack_bytes)
-                
-                if not is_valid or ack.packet_type != GBNPacket.TYPE_ACK:
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    ack_bytes, addr = recv_view(self.socket, slab, 1024)
+                    self._process_datagram(ack_bytes, addr)
+                except socket.timeout:
                     continue
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error receiving ACK: {e}")
+    
+    # Processa um ACK recebido (thread propria ou FlowEndpoint)
+    def _process_datagram(self, ack_bytes, addr):
+        ack, is_valid = GBNPacket.from_bytes(ack_bytes)
+        
+        if not is_valid or ack.packet_type != GBNPacket.TYPE_ACK or ack.flow_id != self.flow_id:
+            return
+        
+        with self.lock:
+            self.logger.receive(ack)
+            
+            if self.base <= ack.seq_num < self.next_seq_num:
+                self.retransmit_count = 0
+                self.dup_ack_count = 0
+                if self.recovery_start is not None:
+                    self.recovery_time += time.time() - self.recovery_start
+                    self.recoveries += 1
+                    self.recovery_start = None
                 
-                with self.lock:
-                    self.logger.receive(ack)
-                    
-                    if ack.seq_num >= self.base:
-                        self.retransmit_count = 0
-                        
-                        old_base = self.base
-                        self.base = ack.seq_num + 1
-                        
-                        for seq in range(old_base, self.base):
-                            if seq in self.sent_packets:
-                                del self.sent_packets[seq]
-                        
-                        self.logger.success(f"✓ ACK({ack.seq_num}) - Window moved to [{self.base}, {self.base + self.window_size - 1}]")
-                        
-                        if self.base == self.next_seq_num:
-                            self._stop_timer()
-                        else:
-                            self._start_timer()
-                    else:
-                        self.logger.warning(f"Old ACK({ack.seq_num}) ignored (base={self.base})")
-                        
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    self.logger.error(f"Error receiving ACK: {e}")
+                # Deslizar e O(1): os slots liberados sao sobrescritos nos proximos envios
+                acked = ack.seq_num + 1 - self.base
+                self.base = ack.seq_num + 1
+                self.send_next = max(self.send_next, self.base)
+                self._on_new_ack(acked)
+                # Continua o go-back pendente conforme a janela abre
+                self._pump_retransmissions()
+                
+                self.logger.success(f"✓ ACK({ack.seq_num}) - Window moved to [{self.base}, {self.base + self._effective_window() - 1}]")
+                self.window_cond.notify_all()
+                
+                if self.base == self.next_seq_num:
+                    self._stop_timer()
+                else:
+                    self._start_timer()
+            elif ack.seq_num == self.base - 1 and self.base < self.next_seq_num:
+                self._on_duplicate_ack(ack.seq_num)
+            else:
+                self.logger.warning(f"Old ACK({ack.seq_num}) ignored (base={self.base})")
     
     # Metodo para enviar dados
     def send_data(self, data):
@@ -153,44 +281,95 @@ class GBNSender:
         
         self._send_single(data)
     
+    # Metodo para enviar um arquivo; as fatias do mmap sao lidas conforme a janela avanca
+    # (o fim do arquivo e sinalizado por um pacote de dados vazio)
+    def send_file(self, path, chunk_size=1024):
+        if chunk_size > self.max_payload():
+            raise ValueError(f"chunk_size={chunk_size} excede o payload maximo do receptor ({self.max_payload()} bytes)")
+        sent = 0
+        for chunk in iter_file_chunks(path, chunk_size):
+            if not self._send_single(chunk):
+                return sent
+            sent += len(chunk)
+        self._send_single(b'')
+        return sent
+    
+    # Maior payload que o receptor le inteiro: datagrama da thread propria ou slab do endpoint
+    def max_payload(self):
+        if self.endpoint is not None:
+            return shared_pool.slab_size - GBNPacket.FLOW_HEADER_SIZE
+        return GBNReceiver.MAX_DATAGRAM - GBNPacket.HEADER_SIZE
+    
+    # Metodo para enviar sem bloquear (False se a janela estiver cheia)
+    def try_send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        with self.lock:
+            if not self._window_open():
+                return False
+            self._transmit(data)
+        return True
+    
+    # Dados novos so entram depois que o go-back pendente terminar
+    def _window_open(self):
+        return (self.send_next == self.next_seq_num
+                and self.next_seq_num < self.base + self._effective_window())
+    
+    # Aguarda vaga na janela (chamado com self.lock adquirido)
+    def _wait_for_window(self):
+        while not self._window_open():
+            if not self.running:
+                return False
+            self.window_cond.wait()
+        return True
+    
     def _send_single(self, data):
+        with self.lock:
+            if not self._wait_for_window():
+                self.logger.warning("Sender stopped, packet not sent")
+                return False
+            self._transmit(data)
+        return True
+    
+    # Transmite um novo pacote (chamado com self.lock adquirido)
+    def _transmit(self, data):
         self.total_bytes_sent += len(data)
-        while True:
-            with self.lock:
-                if self.next_seq_num < self.base + self.window_size:
-                    break
-            time.sleep(0.01)
+        seq_num = self.next_seq_num
+        packet = GBNPacket(GBNPacket.TYPE_DATA, seq_num, data, self.flow_id)
+        packet_bytes = packet.to_bytes()
         
+        self.sent_packets.put(seq_num, packet_bytes)
+        
+        self.logger.send(f"Packet seq={seq_num}, window=[{self.base}, {self.base + self._effective_window() - 1}]")
+        self.packets_sent += 1
+        
+        if self.channel:
+            self.channel.send(packet_bytes, self.socket, self.dest_addr)
+        else:
+            self.socket.sendto(packet_bytes, self.dest_addr)
+        
+        if self.base == self.next_seq_num:
+            self._start_timer()
+        
+        self.next_seq_num += 1
+        self.send_next = self.next_seq_num
+    
+    # Metodo para obter a evolucao da janela: lista de (segundos desde start, cwnd)
+    def get_cwnd_history(self):
         with self.lock:
-            seq_num = self.next_seq_num
-            packet = GBNPacket(GBNPacket.TYPE_DATA, seq_num, data)
-            packet_bytes = packet.to_bytes()
-            
-            self.sent_packets[seq_num] = packet_bytes
-            
-            self.logger.send(f"Packet seq={seq_num}, window=[{self.base}, {self.base + self.window_size - 1}]")
-            self.packets_sent += 1
-            
-            if self.channel:
-                self.channel.send(packet_bytes, self.socket, self.dest_addr)
-            else:
-                self.socket.sendto(packet_bytes, self.dest_addr)
-            
-            if self.base == self.next_seq_num:
-                self._start_timer()
-            
-            self.next_seq_num += 1
+            return list(self.cwnd_history)
     
     def wait_for_completion(self, timeout=10.0):
-        start = time.time()
-        while time.time() - start < timeout:
-            with self.lock:
-                if self.base == self.next_seq_num:
-                    self.logger.success("All packets acknowledged!")
-                    return True
-            time.sleep(0.1)
-        self.logger.warning("Timeout waiting for completion")
-        return False
+        deadline = time.time() + timeout
+        with self.window_cond:
+            while self.base != self.next_seq_num:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.running:
+                    self.logger.warning("Timeout waiting for completion")
+                    return False
+                self.window_cond.wait(remaining)
+            self.logger.success("All packets acknowledged!")
+            return True
     
     def get_statistics(self):
         elapsed = time.time() - self.start_time if self.start_time else 0
@@ -198,43 +377,72 @@ class GBNSender:
             'packets_sent': self.packets_sent,
             'retransmissions': self.retransmissions,
             'timeouts': self.timeouts,
+            'fast_retransmits': self.fast_retransmits,
             'total_transmissions': self.packets_sent + self.retransmissions,
             'total_bytes_sent': self.total_bytes_sent,
+            'avg_recovery_time': self.recovery_time / self.recoveries if self.recoveries else 0,
+            'cwnd': self.cwnd,
+            'ssthresh': self.ssthresh,
             'elapsed_time': elapsed,
             'throughput': self.total_bytes_sent / elapsed if elapsed > 0 else 0
         }
     # Para operacao
     def stop(self):
-        self.running = False
+        with self.window_cond:
+            self.running = False
+            self.window_cond.notify_all()
         self._stop_timer()
+        if self.endpoint:
+            self.endpoint.unregister(self.flow_id, sender=True)
         if self.recv_thread:
             self.recv_thread.join(timeout=2.0)
-    # Fecha e libera recursos
+    # Fecha e libera recursos (o socket compartilhado pertence ao endpoint)
     def close(self):
         self.stop()
         if self.channel:
             stats = self.channel.get_statistics()
             self.logger.info(f"Channel stats: {stats}")
-        self.socket.close()
+        if not self.endpoint:
+            self.socket.close()
 
 # Implementacao da classe GBNReceiver:
 class GBNReceiver:
+    # Maior datagrama lido pela thread propria
+    MAX_DATAGRAM = 2048
+    
     # Construtor - inicializa o objeto
-    def __init__(self, port, window_size=5, channel=None):
-        self.port = port
+    def __init__(self, port, window_size=5, channel=None,
+                 delivery_capacity=DeliveryQueue.DEFAULT_CAPACITY,
+                 ack_every=1, ack_delay=0.04, endpoint=None, flow_id=None):
+        self.port = endpoint.port if endpoint else port
         self.window_size = window_size
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(('', port))
-        self.logger = ProtocolLogger("GBN-RECEIVER")
+        
+        # ACK atrasado: confirma a cada ack_every pacotes ou apos ack_delay segundos
+        self.ack_every = ack_every
+        self.ack_delay = ack_delay
+        self.pending_acks = 0
+        self.ack_deadline = None
+        self.ack_addr = None
+        
+        # Com endpoint, o fluxo compartilha o socket e a thread de recepcao (dados por flow_id)
+        self.endpoint = endpoint
+        self.flow_id = flow_id
+        if endpoint:
+            self.socket = endpoint.socket
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(('', port))
+        self.logger = ProtocolLogger("GBN-RECEIVER" if flow_id is None else f"GBN-RECEIVER-{flow_id}")
         self.channel = channel
         
         self.expected_seq_num = 0
         
-        self.received_data = []
+        self.delivery = DeliveryQueue(delivery_capacity)
         
         self.packets_received = 0
         self.packets_discarded = 0
         self.corrupted_packets = 0
+        self.acks_sent = 0
         
         self.running = False
         self.recv_thread = None
@@ -245,79 +453,152 @@ class GBNReceiver:
     
     # Inicia operacao
     def start(self):
+        if self.endpoint:
+            if not self.running:
+                self.running = True
+                self.endpoint.register(self.flow_id, self, sender=False)
+            return
+        if self.running and self.recv_thread and self.recv_thread.is_alive():
+            return
         self.running = True
         self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
         self.recv_thread.start()
         self.logger.info(f"Listening on port {self.port}")
+    def _send_ack(self, seq_num, addr, duplicate=False):
+        ack = GBNPacket(GBNPacket.TYPE_ACK, seq_num, flow_id=self.flow_id)
+        self.logger.send(f"ACK({seq_num}) [duplicate]" if duplicate else f"ACK({seq_num})")
+        if self.channel:
+            self.channel.send(ack.to_bytes(), self.socket, addr)
+        else:
+            self.socket.sendto(ack.to_bytes(), addr)
+        self.acks_sent += 1
+        # ACK cumulativo: cobre tudo que estava pendente
+        self.pending_acks = 0
+        self.ack_deadline = None
+    
+    # Envia o ACK atrasado se o prazo venceu (chamado com self.lock adquirido)
+    def _flush_delayed_ack(self):
+        if self.ack_deadline is not None and time.time() >= self.ack_deadline:
+            self._send_ack(self.expected_seq_num - 1, self.ack_addr)
+    
     def _receive_loop(self):
-        self.socket.settimeout(1.0)
-        while self.running:
-            try:
-                packet_bytes, sender_addr = self.socket.recvfrom(2048)
-                
-                packet, is_valid = GBNPacket.from_bytes(packet_bytes)
-                
-                if not packet or packet.packet_type != GBNPacket.TYPE_DATA:
+        idle_timeout = 1.0
+        current_timeout = idle_timeout
+        self.socket.settimeout(idle_timeout)
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    # Acorda a tempo de enviar o ACK atrasado pendente
+                    deadline = self.ack_deadline
+                    if deadline is None:
+                        wanted_timeout = idle_timeout
+                    else:
+                        wanted_timeout = max(0.001, min(idle_timeout, deadline - time.time()))
+                    if wanted_timeout != current_timeout:
+                        self.socket.settimeout(wanted_timeout)
+                        current_timeout = wanted_timeout
+                    
+                    packet_bytes, sender_addr = recv_view(self.socket, slab, self.MAX_DATAGRAM)
+                    self._process_datagram(packet_bytes, sender_addr)
+                            
+                except socket.timeout:
+                    with self.lock:
+                        self._flush_delayed_ack()
                     continue
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error in receive loop: {e}")
+    
+    # Processa um pacote de dados recebido (thread propria ou FlowEndpoint)
+    def _process_datagram(self, packet_bytes, sender_addr):
+        packet, is_valid = GBNPacket.from_bytes(packet_bytes)
+        
+        if not packet or packet.packet_type != GBNPacket.TYPE_DATA:
+            return
+        if is_valid and packet.flow_id != self.flow_id:
+            return
+        
+        with self.lock:
+            self.packets_received += 1
+            
+            if not is_valid:
+                self.logger.corrupt()
+                self.corrupted_packets += 1
                 
-                with self.lock:
-                    self.packets_received += 1
-                    
-                    if not is_valid:
-                        self.logger.corrupt()
-                        self.corrupted_packets += 1
-                        
-                        if self.expected_seq_num > 0:
-                            ack = GBNPacket(GBNPacket.TYPE_ACK, self.expected_seq_num - 1)
-                            self.logger.send(f"ACK({self.expected_seq_num - 1}) [duplicate]")
-                            self.socket.sendto(ack.to_bytes(), sender_addr)
-                    
+                if self.expected_seq_num > 0:
+                    self._send_ack(self.expected_seq_num - 1, sender_addr, duplicate=True)
+            
+            else:
+                self.logger.receive(packet)
+                
+                if packet.seq_num == self.expected_seq_num:
+                    if not self.delivery.offer(packet.data):
+                        # Aplicacao atrasada: nao confirma este pacote, o sender segura a janela
+                        # (o ACK atrasado dos ja entregues continua valendo)
+                        self.logger.warning(f"Delivery queue full, dropping seq={packet.seq_num} (backpressure)")
+                        self.packets_discarded += 1
                     else:
-                        self.logger.receive(packet)
-                        
-                        if packet.seq_num == self.expected_seq_num:
-                            self.received_data.append(packet.data)
-                            self.logger.deliver(packet.data)
-                            
-                            ack = GBNPacket(GBNPacket.TYPE_ACK, self.expected_seq_num)
-                            self.logger.send(f"ACK({self.expected_seq_num})")
-                            if self.channel:
-                                self.channel.send(ack.to_bytes(), self.socket, sender_addr)
-                            else:
-                                self.socket.sendto(ack.to_bytes(), sender_addr)
-                            
-                            self.expected_seq_num += 1
+                        self.logger.deliver(packet.data)
                         
-                        else:
-                            self.logger.warning(f"Out-of-order packet (seq={packet.seq_num}, expected {self.expected_seq_num}) - DISCARDED")
-                            self.packets_discarded += 1
-                            
-                            if self.expected_seq_num > 0:
-                                ack = GBNPacket(GBNPacket.TYPE_ACK, self.expected_seq_num - 1)
-                                self.logger.send(f"ACK({self.expected_seq_num - 1}) [duplicate]")
-                                if self.channel:
-                                    self.channel.send(ack.to_bytes(), self.socket, sender_addr)
-                                else:
-                                    self.socket.sendto(ack.to_bytes(), sender_addr)
-                        
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    self.logger.error(f"Error in receive loop: {e}")
+                        self.expected_seq_num += 1
+                        self.pending_acks += 1
+                        self.ack_addr = sender_addr
+                        if self.pending_acks >= self.ack_every:
+                            self._send_ack(self.expected_seq_num - 1, sender_addr)
+                        elif self.ack_deadline is None:
+                            self.ack_deadline = time.time() + self.ack_delay
+                
+                else:
+                    self.logger.warning(f"Out-of-order packet (seq={packet.seq_num}, expected {self.expected_seq_num}) - DISCARDED")
+                    self.packets_discarded += 1
+                    
+                    # Lacuna: confirma imediatamente (tambem libera o ACK atrasado)
+                    if self.expected_seq_num > 0:
+                        self._send_ack(self.expected_seq_num - 1, sender_addr, duplicate=True)
+            
+            self._flush_delayed_ack()
+            if self.endpoint and self.ack_deadline is not None:
+                self.endpoint.wake_at(self, self.ack_deadline)
     
-    def get_data(self):
+    # Chamado pelo FlowEndpoint quando o prazo do ACK atrasado vence
+    def _on_wakeup(self):
         with self.lock:
-            return self.received_data.copy()
-    # Metodo para receber dados
+            self._flush_delayed_ack()
+            if self.ack_deadline is not None:
+                self.endpoint.wake_at(self, self.ack_deadline)
+    
+    # Metodo para retirar os dados pendentes: consome a fila, entao uma segunda chamada
+    # so retorna o que chegou depois (nao e mais a lista acumulada de tudo que foi recebido)
+    def get_data(self):
+        return self.delivery.drain()
+    # Metodo para receber ate expected_count itens (acorda assim que a thread de recepcao entrega);
+    # consome os itens retornados e devolve uma lista parcial em timeout
     def receive_data(self, expected_count, timeout=10):
-        start_time = time.time()
-        while len(self.received_data) < expected_count:
-            if time.time() - start_time > timeout:
-                break
-            time.sleep(0.1)
-        
-        return self.get_data()
+        return self.delivery.read_many(expected_count, timeout)
+    # Versao awaitable de receive_data para uso com asyncio
+    async def receive_data_async(self, expected_count, timeout=10):
+        return await self.delivery.read_many_async(expected_count, timeout)
+    # Metodo para ler um item (bloqueante, None em timeout)
+    def read(self, timeout=None):
+        return self.delivery.read(timeout)
+    def read_into(self, buffer, timeout=None):
+        return self.delivery.read_into(buffer, timeout)
+    def __iter__(self):
+        return iter(self.delivery)
+    # Metodo para gravar em disco os dados de send_file ate o pacote vazio de fim
+    def receive_file(self, path, timeout=10):
+        written = 0
+        with open(path, 'wb') as f:
+            while True:
+                data = self.delivery.read(timeout)
+                if data is None:
+                    self.logger.warning(f"Timeout receiving file, {written} bytes written")
+                    break
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+        return written
     
     def get_statistics(self):
         with self.lock:
@@ -325,17 +606,22 @@ class GBNReceiver:
                 'packets_received': self.packets_received,
                 'packets_discarded': self.packets_discarded,
                 'corrupted_packets': self.corrupted_packets,
-                'data_delivered': len(self.received_data)
+                'acks_sent': self.acks_sent,
+                'data_delivered': self.delivery.total_delivered
             }
     # Para operacao
     def stop(self):
+        if self.endpoint and self.running:
+            self.endpoint.unregister(self.flow_id, sender=False)
         self.running = False
+        self.delivery.close()
         if self.recv_thread:
             self.recv_thread.join(timeout=2.0)
-    # Fecha e libera recursos
+    # Fecha e libera recursos (o socket compartilhado pertence ao endpoint)
     def close(self):
         self.stop()
-        self.socket.close()
+        if not self.endpoint:
+            self.socket.close()
 
 def test_gbn():
     print("\n" + "="*70)
@@ -3,230 +3,427 @@ import threading
 import time
 from utils.sr_packet import SRPacket
 from utils.logger import ProtocolLogger
+from utils.delivery_queue import DeliveryQueue
+from utils.packet_ring import PacketRing
+from utils.reorder_buffer import ReorderBuffer
+from utils.file_chunks import iter_file_chunks
+from utils.buffer_pool import shared_pool, recv_view
+from utils.timer_wheel import TimerWheel
 
 # Implementacao da classe SRSender
 class SRSender:
     # Construtor - inicializa o objeto
-    def __init__(self, receiver_address, window_size=5, timeout=1.0, channel=None):
+    def __init__(self, receiver_address, window_size=5, timeout=1.0, channel=None,
+                 endpoint=None, flow_id=None, queue_capacity=1024):
         self.receiver_address = receiver_address
         self.window_size = window_size
         self.timeout = timeout
         self.channel = channel
-        self.logger = ProtocolLogger("SR-SENDER")
+        self.logger = ProtocolLogger("SR-SENDER" if flow_id is None else f"SR-SENDER-{flow_id}")
         
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(('localhost', 0))
+        # Com endpoint, o fluxo compartilha o socket e a thread de recepcao (ACKs por flow_id)
+        self.endpoint = endpoint
+        self.flow_id = flow_id
+        if endpoint:
+            self.socket = endpoint.socket
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(('localhost', 0))
         
         self.base = 0
         self.next_seq_num = 0
-        self.packets = {}
-        self.acked = set()
-        self.timers = {}
-        self.retransmit_count = {}  # Track retransmissions per packet
+        # Estado apenas da janela [base, next_seq_num), slot = seq % window_size:
+        # datagramas codificados, bitmap de confirmados e retransmissoes por slot
+        self.packets = PacketRing(window_size)
+        self.acked = bytearray(window_size)
+        self.retransmit_count = bytearray(window_size)
         self.max_retransmits = 30    # Limit retransmissions
+        
+        self.written = 0
+        self.packets_sent = 0
+        self.retransmissions = 0
+        self.acks_received = 0
         self.lock = threading.Lock()
+        # Sinalizada quando a janela desliza (base avanca) ou o sender para
+        self.window_cond = threading.Condition(self.lock)
+        
+        # Fila limitada entre write() e a janela (write bloqueia quando cheia); esvaziada por
+        # write() e pelos ACKs/timeouts que abrem a janela, sem thread propria
+        self.send_queue = DeliveryQueue(queue_capacity)
+        
+        # Timers por (flow_id, seq), expiracoes em lote; com endpoint a roda e compartilhada
+        # por todos os fluxos dele (uma thread por endpoint, nao por sender)
+        if endpoint:
+            self.timer_wheel = endpoint.timer_wheel()
+        else:
+            self.timer_wheel = TimerWheel(self._on_timeouts, tick=min(0.01, timeout / 4))
         
         self.running = True
-        self.recv_thread = threading.Thread(target=self._receive_acks, daemon=True)
-        self.recv_thread.start()
+        if endpoint:
+            self.recv_thread = None
+            endpoint.register(flow_id, self, sender=True)
+        else:
+            self.recv_thread = threading.Thread(target=self._receive_acks, daemon=True)
+            self.recv_thread.start()
+    
+    # Metodo para enfileirar dados para envio (False em timeout ou sender fechado)
+    def write(self, data, timeout=None):
+        if isinstance(data, str):
+            data = data.encode()
+        if not self.send_queue.put(data, timeout):
+            return False
+        with self.lock:
+            self.written += 1
+            self._pump()
+        return True
     
-    # Metodo para enviar dados
+    # Metodo para enviar dados (bloqueia ate todos serem confirmados)
     def send_data(self, data_list):
-        total_packets = len(data_list)
-        seq_num = 0
-        
-        while seq_num < total_packets or self.base < total_packets:
-            with self.lock:
-                while seq_num < total_packets and seq_num < self.base + self.window_size:
-                    if seq_num not in self.acked:
-                        packet = SRPacket(SRPacket.TYPE_DATA, seq_num, data_list[seq_num])
-                        self.packets[seq_num] = packet
-                        
-                        self._send_packet(packet, seq_num)
-                        self._start_timer(seq_num)
-                        
-                    seq_num += 1
-                
-                if self.base >= total_packets:
-                    break
-            
-            time.sleep(0.01)
+        for data in data_list:
+            if not self.write(data):
+                return
+        self.wait_for_completion()
+    
+    # Metodo para enviar um arquivo; as fatias do mmap sao lidas conforme a fila esvazia
+    # (o fim do arquivo e sinalizado por um pacote de dados vazio)
+    def send_file(self, path, chunk_size=1024):
+        if chunk_size > self.max_payload():
+            raise ValueError(f"chunk_size={chunk_size} excede o payload maximo do receptor ({self.max_payload()} bytes)")
+        sent = 0
+        for chunk in iter_file_chunks(path, chunk_size):
+            if not self.write(chunk):
+                return sent
+            sent += len(chunk)
+        self.write(b'')
+        self.wait_for_completion()
+        return sent
+    
+    # Maior payload que o receptor le inteiro: datagrama da thread propria ou slab do endpoint
+    def max_payload(self):
+        if self.endpoint is not None:
+            return shared_pool.slab_size - SRPacket.FLOW_HEADER_SIZE
+        return SRReceiver.MAX_DATAGRAM - SRPacket.HEADER_SIZE
+    
+    # Aguarda a confirmacao de tudo que foi escrito (False em timeout ou sender fechado)
+    def wait_for_completion(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self.window_cond:
+            while self.base < self.written:
+                remaining = None if deadline is None else deadline - time.time()
+                if not self.running or (remaining is not None and remaining <= 0):
+                    return False
+                self.window_cond.wait(remaining)
+            return True
+    
+    # Transmite da fila o que couber na janela (chamado com self.lock adquirido)
+    def _pump(self):
+        free = self.base + self.window_size - self.next_seq_num
+        if not self.running or free <= 0:
+            return
+        for data in self.send_queue.read_many(free, timeout=0):
+            self._transmit(data)
+    
+    # Transmite um novo pacote (chamado com self.lock adquirido)
+    def _transmit(self, data):
+        seq_num = self.next_seq_num
+        raw_packet = SRPacket(SRPacket.TYPE_DATA, seq_num, data, self.flow_id).to_bytes()
+        slot = seq_num % self.window_size
+        self.packets.put(seq_num, raw_packet)
+        self.acked[slot] = 0
+        self.retransmit_count[slot] = 0
+        self.next_seq_num += 1
         
-        while self.base < total_packets:
-            time.sleep(0.01)
+        self._send_packet(raw_packet, seq_num)
+        self.packets_sent += 1
+        self._start_timer(seq_num)
+    
+    # Avanca a base sobre os confirmados e libera os slots (chamado com self.lock adquirido)
+    def _slide_window(self):
+        while self.base < self.next_seq_num and self.acked[self.base % self.window_size]:
+            self.acked[self.base % self.window_size] = 0
+            self.packets.put(self.base, None)
+            self.base += 1
+        self.window_cond.notify_all()
+        self._pump()
     
     # Metodo para enviar pacote
-    def _send_packet(self, packet, seq_num):
-        raw_packet = packet.to_bytes()
+    def _send_packet(self, raw_packet, seq_num):
         if self.channel:
             self.channel.send(raw_packet, self.socket, self.receiver_address)
         else:
             self.socket.sendto(raw_packet, self.receiver_address)
-        window_end = min(self.base + self.window_size - 1, len(self.packets) - 1)
+        window_end = self.base + self.window_size - 1
         self.logger.log_send(f"Packet seq={seq_num}, window=[{self.base}, {window_end}]")
     
-    # Metodo para iniciar timer
+    # Metodo para iniciar (ou reiniciar) o timer de um pacote
     def _start_timer(self, seq_num):
-        if seq_num in self.timers:
-            self.timers[seq_num].cancel()
-        timer = threading.Timer(self.timeout, self._timeout, args=[seq_num])
-        timer.daemon = True
-        timer.start()
-        self.timers[seq_num] = timer
-    
-    # Metodo para processar timeout
-    def _timeout(self, seq_num):
+        self.timer_wheel.arm((self.flow_id, seq_num), self.timeout)
+    
+    # Recebe da timer wheel o lote de chaves (flow_id, seq) vencidas e trata todas sob um unico lock
+    def _on_timeouts(self, keys):
         with self.lock:
-            if seq_num not in self.acked and seq_num in self.packets:
-                # Check retransmission limit
-                if seq_num not in self.retransmit_count:
-                    self.retransmit_count[seq_num] = 0
-                
-                if self.retransmit_count[seq_num] >= self.max_retransmits:
-                    self.logger.log_event(f"⚠️  Max retransmits reached for seq={seq_num}, giving up")
-                    # Mark as acked to move window
-                    self.acked.add(seq_num)
-                    if seq_num == self.base:
-                        while self.base in self.acked:
-                            self.base += 1
-                    return
-                
-                self.retransmit_count[seq_num] += 1
-                self.logger.log_timeout(f"Packet seq={seq_num}")
-                packet = self.packets[seq_num]
-                self._send_packet(packet, seq_num)
-                self.logger.log_retransmit(f"Packet seq={seq_num}")
-                self._start_timer(seq_num)
+            for _, seq_num in keys:
+                self._timeout(seq_num)
+    
+    # Metodo para processar timeout (chamado com self.lock adquirido)
+    def _timeout(self, seq_num):
+        slot = seq_num % self.window_size
+        if self.base <= seq_num < self.next_seq_num and not self.acked[slot]:
+            # Check retransmission limit
+            if self.retransmit_count[slot] >= self.max_retransmits:
+                self.logger.log_event(f"⚠️  Max retransmits reached for seq={seq_num}, giving up")
+                # Mark as acked to move window
+                self.acked[slot] = 1
+                if seq_num == self.base:
+                    self._slide_window()
+                return
+            
+            self.retransmit_count[slot] += 1
+            self.logger.log_timeout(f"Packet seq={seq_num}")
+            self._send_packet(self.packets.get(seq_num), seq_num)
+            self.retransmissions += 1
+            self.logger.log_retransmit(f"Packet seq={seq_num}")
+            self._start_timer(seq_num)
     
     # Metodo para receber ACKs
     def _receive_acks(self):
         self.socket.settimeout(0.1)
         
-        while self.running:
-            try:
-                data, _ = self.socket.recvfrom(1024)
-                ack_packet = SRPacket.from_bytes(data)
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    data, addr = recv_view(self.socket, slab, 1024)
+                    self._process_datagram(data, addr)
                 
-                if ack_packet.packet_type == SRPacket.TYPE_ACK:
-                    with self.lock:
-                        seq_num = ack_packet.seq_num
-                        self.logger.log_receive(f"[ACK] seq={seq_num} len=0")
-                        
-                        if seq_num not in self.acked:
-                            self.acked.add(seq_num)
-                            
-                            if seq_num in self.timers:
-                                self.timers[seq_num].cancel()
-                                del self.timers[seq_num]
-                            
-                            if seq_num == self.base:
-                                while self.base in self.acked:
-                                    self.base += 1
-                                
-                                new_window_end = self.base + self.window_size - 1
-                                self.logger.log_event(f"✓ ACK({seq_num}) - Window moved to [{self.base}, {new_window_end}]")
-                            else:
-                                self.logger.log_event(f"✓ ACK({seq_num}) - Buffered (base={self.base})")
-            
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
+                except socket.timeout:
                     continue
+                except Exception as e:
+                    if self.running:
+                        continue
     
-    # Metodo para fechar conexao
+    # Metodo para processar um ACK (thread propria ou FlowEndpoint)
+    def _process_datagram(self, data, addr):
+        ack_packet = SRPacket.from_bytes(data)
+        
+        if ack_packet is None or ack_packet.flow_id != self.flow_id:
+            return
+        if ack_packet.packet_type == SRPacket.TYPE_ACK:
+            with self.lock:
+                seq_num = ack_packet.seq_num
+                slot = seq_num % self.window_size
+                self.logger.log_receive(f"[ACK] seq={seq_num} len=0")
+                
+                if self.base <= seq_num < self.next_seq_num and not self.acked[slot]:
+                    self.acked[slot] = 1
+                    self.acks_received += 1
+                    self.timer_wheel.cancel((self.flow_id, seq_num))
+                    
+                    if seq_num == self.base:
+                        self._slide_window()
+                        
+                        new_window_end = self.base + self.window_size - 1
+                        self.logger.log_event(f"✓ ACK({seq_num}) - Window moved to [{self.base}, {new_window_end}]")
+                    else:
+                        self.logger.log_event(f"✓ ACK({seq_num}) - Buffered (base={self.base})")
+    
+    def get_statistics(self):
+        with self.lock:
+            return {
+                'packets_sent': self.packets_sent,
+                'retransmissions': self.retransmissions,
+                'acks_received': self.acks_received,
+                'in_flight': self.next_seq_num - self.base,
+                'queued': len(self.send_queue)
+            }
+    
+    # Metodo para fechar conexao (o socket compartilhado pertence ao endpoint)
     def close(self):
-        self.running = False
-        for timer in self.timers.values():
-            timer.cancel()
-        self.socket.close()
+        with self.window_cond:
+            self.running = False
+            self.window_cond.notify_all()
+        self.send_queue.close()
+        if self.endpoint:
+            # Roda do endpoint: remove so os prazos deste fluxo
+            with self.lock:
+                for seq_num in range(self.base, self.next_seq_num):
+                    self.timer_wheel.cancel((self.flow_id, seq_num))
+            self.endpoint.unregister(self.flow_id, sender=True)
+        else:
+            self.timer_wheel.stop()
+            self.socket.close()
 
 # Implementacao da classe SRReceiver
 class SRReceiver:
+    # Maior datagrama lido pela thread propria
+    MAX_DATAGRAM = 2048
+    
     # Construtor - inicializa o objeto
-    def __init__(self, port, window_size=5, channel=None):
-        self.port = port
+    def __init__(self, port, window_size=5, channel=None,
+                 delivery_capacity=DeliveryQueue.DEFAULT_CAPACITY,
+                 endpoint=None, flow_id=None):
+        self.port = endpoint.port if endpoint else port
         self.window_size = window_size
         self.channel = channel
-        self.logger = ProtocolLogger("SR-RECEIVER")
+        self.logger = ProtocolLogger("SR-RECEIVER" if flow_id is None else f"SR-RECEIVER-{flow_id}")
         
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind(('localhost', port))
+        # Com endpoint, a thread do endpoint entrega os dados deste flow_id
+        self.endpoint = endpoint
+        self.flow_id = flow_id
+        if endpoint:
+            self.socket = endpoint.socket
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.bind(('localhost', port))
         
         self.expected_seq = 0
-        self.buffer = {}
-        self.received_data = []
-        self.running = True
+        # Fora de ordem dentro da janela: slot = seq % window_size, bitmap de ocupacao. Modo objeto:
+        # o payload ja e um bytes proprio (from_bytes copia), a arena so somaria duas copias
+        self.buffer = ReorderBuffer(window_size)
+        self.delivery = DeliveryQueue(delivery_capacity)
+        
+        self.packets_received = 0
+        self.duplicates = 0
+        self.acks_sent = 0
         
-        self.logger.log_event(f"Listening on port {port}")
+        self.running = False
+        self.recv_thread = None
+        self.lock = threading.Lock()
+        
+        self.start()
     
-    # Metodo para receber dados
-    def receive_data(self, expected_count, timeout=30):
-        self.socket.settimeout(0.5)
-        start_time = time.time()
-        last_progress = time.time()
-        last_count = 0
-        
-        while len(self.received_data) < expected_count and self.running:
-            # Check global timeout
-            if time.time() - start_time > timeout:
-                self.logger.log_event(f"⏰ Global timeout reached, received {len(self.received_data)}/{expected_count}")
-                break
-            
-            # Check progress timeout (no new packets for 5 seconds)
-            if len(self.received_data) != last_count:
-                last_progress = time.time()
-                last_count = len(self.received_data)
-            elif time.time() - last_progress > 5.0:
-                self.logger.log_event(f"⏰ No progress for 5s, stopping at {len(self.received_data)}/{expected_count}")
-                break
+    # Inicia operacao (thread propria de recepcao: ACK imediato mesmo sem leitor)
+    def start(self):
+        if self.endpoint:
+            if not self.running:
+                self.running = True
+                self.endpoint.register(self.flow_id, self, sender=False)
+            return
+        if self.running and self.recv_thread and self.recv_thread.is_alive():
+            return
+        self.running = True
+        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.recv_thread.start()
+        self.logger.log_event(f"Listening on port {self.port}")
+    
+    def _receive_loop(self):
+        self.socket.settimeout(1.0)
+        with shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    data, sender_addr = recv_view(self.socket, slab, self.MAX_DATAGRAM)
+                    self._process_datagram(data, sender_addr)
+                except socket.timeout:
+                    continue
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error in receive loop: {e}")
+    
+    # Metodo para processar um pacote de dados (thread propria ou FlowEndpoint)
+    def _process_datagram(self, data, sender_addr):
+        packet = SRPacket.from_bytes(data)
+        
+        if packet is None or packet.packet_type != SRPacket.TYPE_DATA or packet.flow_id != self.flow_id:
+            return
+        
+        with self.lock:
+            seq_num = packet.seq_num
+            self.packets_received += 1
+            self.logger.log_receive(f"[DATA] seq={seq_num} len={len(packet.data)}")
             
-            try:
-                data, sender_addr = self.socket.recvfrom(2048)
+            if self.expected_seq <= seq_num < self.expected_seq + self.window_size:
                 
-                try:
-                    packet = SRPacket.from_bytes(data)
+                if seq_num in self.buffer:
+                    # Ja bufferizado (a fila encheu antes de entregar): tenta esvaziar de novo
+                    self._deliver_buffered()
+                
+                elif seq_num == self.expected_seq:
+                    if not self.delivery.offer(packet.data):
+                        # Fila cheia: sem ACK, o sender retransmite depois
+                        self.logger.log_event(f"Delivery queue full, dropping seq={seq_num} (backpressure)")
+                        return
+                    self.logger.log_event(f"✅ DELIVER to app: {len(packet.data)} bytes")
                     
-                    if packet.packet_type == SRPacket.TYPE_DATA:
-                        seq_num = packet.seq_num
-                        self.logger.log_receive(f"[DATA] seq={seq_num} len={len(packet.data)}")
-                        
-                        if self.expected_seq <= seq_num < self.expected_seq + self.window_size:
-                            
-                            if seq_num == self.expected_seq:
-                                self.received_data.append(packet.data)
-                                self.logger.log_event(f"✅ DELIVER to app: {len(packet.data)} bytes")
-                                
-                                self.expected_seq += 1
-                                while self.expected_seq in self.buffer:
-                                    buffered_data = self.buffer.pop(self.expected_seq)
-                                    self.received_data.append(buffered_data)
-                                    self.logger.log_event(f"✅ DELIVER from buffer: seq={self.expected_seq}")
-                                    self.expected_seq += 1
-                                
-                            elif seq_num > self.expected_seq:
-                                if seq_num not in self.buffer:
-                                    self.buffer[seq_num] = packet.data
-                                    self.logger.log_event(f"📦 BUFFER: seq={seq_num} (expected={self.expected_seq})")
-                            
-                            ack = SRPacket(SRPacket.TYPE_ACK, seq_num)
-                            self._send_ack(ack, sender_addr)
-                        
-                        elif seq_num < self.expected_seq:
-                            ack = SRPacket(SRPacket.TYPE_ACK, seq_num)
-                            self._send_ack(ack, sender_addr)
-                            self.logger.log_send(f"ACK({seq_num}) [duplicate]")
+                    self.expected_seq += 1
+                    self._deliver_buffered()
+                    
+                elif seq_num > self.expected_seq:
+                    if self.buffer.insert(seq_num, packet.data):
+                        self.logger.log_event(f"📦 BUFFER: seq={seq_num} (expected={self.expected_seq})")
                 
-                except ValueError:
-                    continue
+                ack = SRPacket(SRPacket.TYPE_ACK, seq_num, flow_id=self.flow_id)
+                self._send_ack(ack, sender_addr)
             
-            except socket.timeout:
-                continue
-            except Exception:
-                if self.running:
-                    continue
-        
-        return self.received_data
+            elif seq_num < self.expected_seq:
+                self.duplicates += 1
+                ack = SRPacket(SRPacket.TYPE_ACK, seq_num, flow_id=self.flow_id)
+                self._send_ack(ack, sender_addr)
+                self.logger.log_send(f"ACK({seq_num}) [duplicate]")
+    
+    # Entrega de uma vez a sequencia contigua bufferizada, limitada ao espaco livre na fila
+    # (chamado com self.lock adquirido)
+    def _deliver_buffered(self):
+        if not self.buffer or self.expected_seq not in self.buffer:
+            return
+        free = self.delivery.free_space()
+        if free == 0:
+            return
+        items = self.buffer.drain(self.expected_seq, free)
+        for data in items:
+            self.delivery.offer(data)
+        self.logger.log_event(f"✅ DELIVER from buffer: seq={self.expected_seq}..{self.expected_seq + len(items) - 1}")
+        self.expected_seq += len(items)
+    
+    # Libera o buffer de reordenacao conforme a aplicacao consome a fila
+    def _refill(self):
+        if self.buffer:
+            with self.lock:
+                self._deliver_buffered()
+    
+    # Metodo para receber ate expected_count itens entregues; consome os itens retornados
+    # e devolve uma lista parcial em timeout
+    def receive_data(self, expected_count, timeout=30):
+        deadline = time.time() + timeout
+        received = []
+        while len(received) < expected_count:
+            items = self.delivery.read_many(expected_count - len(received), timeout=0)
+            if not items:
+                item = self.delivery.read(max(0.0, deadline - time.time()))
+                if item is None:
+                    break
+                items = [item]
+            received.extend(items)
+            self._refill()
+        if len(received) < expected_count:
+            self.logger.log_event(f"⏰ Timeout reached, received {len(received)}/{expected_count}")
+        return received
+    
+    # Metodo para ler um item ja entregue (bloqueante, None em timeout ou receiver fechado)
+    def read(self, timeout=None):
+        data = self.delivery.read(timeout)
+        self._refill()
+        return data
+    
+    def __iter__(self):
+        while True:
+            data = self.read()
+            if data is None:
+                return
+            yield data
+    
+    # Metodo para gravar em disco os dados de send_file ate o pacote vazio de fim
+    def receive_file(self, path, timeout=30):
+        written = 0
+        with open(path, 'wb') as f:
+            while True:
+                data = self.read(timeout)
+                if data is None:
+                    self.logger.log_event(f"⏰ Timeout receiving file, {written} bytes written")
+                    break
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+        return written
     
     # Metodo para enviar ACK
     def _send_ack(self, ack, addr):
@@ -235,9 +432,30 @@ class SRReceiver:
             self.channel.send(raw_ack, self.socket, addr)
         else:
             self.socket.sendto(raw_ack, addr)
+        self.acks_sent += 1
         self.logger.log_send(f"ACK({ack.seq_num})")
     
-    # Metodo para fechar conexao
-    def close(self):
+    def get_statistics(self):
+        with self.lock:
+            return {
+                'packets_received': self.packets_received,
+                'duplicates': self.duplicates,
+                'buffered': len(self.buffer),
+                'acks_sent': self.acks_sent,
+                'data_delivered': self.delivery.total_delivered
+            }
+    
+    # Para operacao
+    def stop(self):
+        if self.endpoint and self.running:
+            self.endpoint.unregister(self.flow_id, sender=False)
         self.running = False
-        self.socket.close()
+        self.delivery.close()
+        if self.recv_thread:
+            self.recv_thread.join(timeout=2.0)
+    
+    # Metodo para fechar conexao (o socket compartilhado pertence ao endpoint)
+    def close(self):
+        self.stop()
+        if not self.endpoint:
+            self.socket.close()
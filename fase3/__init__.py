@@ -3,9 +3,38 @@ Pacote Fase 3 - TCP Simplificado
 Implementa conexão TCP com three-way handshake, flow control e four-way close
 """
 
-from .tcp_socket import SimpleTCPSocket
+from .tcp_socket import SimpleTCPSocket, IncompleteReadError
+from .tcp_streams import (
+    AsyncTCPConnection,
+    SimpleStreamWriter,
+    SimpleServer,
+    open_simple_connection,
+    start_simple_server,
+)
+from .congestion_control import (
+    CongestionControl,
+    RenoCongestionControl,
+    NewRenoCongestionControl,
+    CubicCongestionControl,
+    CONGESTION_CONTROLS,
+    create_congestion_control,
+)
 
 # Para compatibilidade com imports como fase3.tcp
 from . import tcp_socket as tcp
 
-__all__ = ['SimpleTCPSocket']
+__all__ = [
+    'SimpleTCPSocket',
+    'IncompleteReadError',
+    'AsyncTCPConnection',
+    'SimpleStreamWriter',
+    'SimpleServer',
+    'open_simple_connection',
+    'start_simple_server',
+    'CongestionControl',
+    'RenoCongestionControl',
+    'NewRenoCongestionControl',
+    'CubicCongestionControl',
+    'CONGESTION_CONTROLS',
+    'create_congestion_control',
+]
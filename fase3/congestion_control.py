@@ -0,0 +1,168 @@
+"""
+Controle de Congestionamento Plugável - TCP Simplificado
+Reno, NewReno e CUBIC controlando cwnd (em bytes) por meio de ganchos chamados pelo socket
+"""
+
+
+# Implementacao da classe CongestionControl:
+class CongestionControl:
+    name = 'base'
+    # Appropriate Byte Counting (RFC 3465, L = 2 MSS): com ACKs atrasados cada ACK cobre ate
+    # dois segmentos, e o slow start continua dobrando cwnd por RTT
+    ABC_LIMIT = 2
+
+    # Construtor - inicializa o objeto (initial_window em segmentos)
+    def __init__(self, mss, initial_window=10):
+        if initial_window < 1:
+            raise ValueError("initial_window deve ser >= 1")
+        self.mss = mss
+        self.cwnd = initial_window * mss
+        self.ssthresh = float('inf')
+        self.in_recovery = False
+        # Maior seq enviado quando a perda foi detectada (fim da recuperacao)
+        self.recover = 0
+        self.min_rtt = None
+
+    # ACK novo; retorna True se o socket deve retransmitir o proximo segmento (ACK parcial)
+    def on_ack(self, bytes_acked, ack_num, now):
+        return False
+
+    # Perda detectada por ACKs duplicados (fast retransmit)
+    def on_loss(self, flight_size, recover, now):
+        pass
+
+    # ACK duplicado adicional durante a recuperacao
+    def on_dup_ack(self):
+        pass
+
+    # Timeout de retransmissao
+    def on_timeout(self, flight_size, now):
+        pass
+
+    def on_rtt_sample(self, rtt):
+        if self.min_rtt is None or rtt < self.min_rtt:
+            self.min_rtt = rtt
+
+    def __repr__(self):
+        return f"{self.name}(cwnd={self.cwnd:.0f}, ssthresh={self.ssthresh:.0f})"
+
+
+# Implementacao da classe RenoCongestionControl:
+class RenoCongestionControl(CongestionControl):
+    name = 'reno'
+
+    def on_ack(self, bytes_acked, ack_num, now):
+        if self.in_recovery:
+            # Qualquer ACK novo encerra a recuperacao (desinfla a janela)
+            self.in_recovery = False
+            self.cwnd = self.ssthresh
+            return False
+        self._increase(bytes_acked, now)
+        return False
+
+    # Slow start ate ssthresh, depois ~1 MSS por janela confirmada
+    def _increase(self, bytes_acked, now):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += min(bytes_acked, self.ABC_LIMIT * self.mss)
+        else:
+            self.cwnd += self.mss * self.mss / self.cwnd
+
+    def _reduce(self, flight_size, now):
+        self.ssthresh = max(flight_size / 2, 2 * self.mss)
+
+    def on_loss(self, flight_size, recover, now):
+        self._reduce(flight_size, now)
+        self.cwnd = self.ssthresh + 3 * self.mss
+        self.in_recovery = True
+        self.recover = recover
+
+    def on_dup_ack(self):
+        if self.in_recovery:
+            self.cwnd += self.mss
+
+    def on_timeout(self, flight_size, now):
+        self._reduce(flight_size, now)
+        self.cwnd = self.mss
+        self.in_recovery = False
+
+
+# Implementacao da classe NewRenoCongestionControl:
+class NewRenoCongestionControl(RenoCongestionControl):
+    name = 'newreno'
+
+    def on_ack(self, bytes_acked, ack_num, now):
+        if self.in_recovery and ack_num < self.recover:
+            # ACK parcial: retransmite o proximo buraco sem sair da recuperacao
+            self.cwnd = max(self.cwnd - bytes_acked + self.mss, self.mss)
+            return True
+        return super().on_ack(bytes_acked, ack_num, now)
+
+
+# Implementacao da classe CubicCongestionControl:
+class CubicCongestionControl(NewRenoCongestionControl):
+    name = 'cubic'
+    C = 0.4
+    BETA = 0.7
+
+    # Construtor - inicializa o objeto
+    def __init__(self, mss, initial_window=10):
+        super().__init__(mss, initial_window)
+        # Estado da curva cubica, em segmentos
+        self.w_max = 0.0
+        self.k = 0.0
+        self.epoch_start = None
+        self.w_est = 0.0
+
+    # Janela cubica W(t) = C (t - K)^3 + W_max, com regiao amigavel ao Reno (RFC 8312)
+    def _increase(self, bytes_acked, now):
+        if self.cwnd < self.ssthresh:
+            self.cwnd += min(bytes_acked, self.ABC_LIMIT * self.mss)
+            return
+        cwnd_segments = self.cwnd / self.mss
+        if self.epoch_start is None:
+            self.epoch_start = now
+            if cwnd_segments < self.w_max:
+                self.k = ((self.w_max - cwnd_segments) / self.C) ** (1 / 3)
+            else:
+                self.k = 0.0
+                self.w_max = cwnd_segments
+            self.w_est = cwnd_segments
+        t = now - self.epoch_start
+        target = self.C * (t - self.k) ** 3 + self.w_max
+
+        self.w_est += 3 * (1 - self.BETA) / (1 + self.BETA) * bytes_acked / self.cwnd
+        target = max(target, self.w_est)
+        if target > cwnd_segments:
+            self.cwnd += self.mss * (target - cwnd_segments) / cwnd_segments
+        else:
+            # Plato perto de W_max: crescimento minimo
+            self.cwnd += self.mss / (100 * cwnd_segments)
+
+    def _reduce(self, flight_size, now):
+        cwnd_segments = self.cwnd / self.mss
+        # Convergencia rapida: libera banda se a perda veio antes do W_max anterior
+        if cwnd_segments < self.w_max:
+            self.w_max = cwnd_segments * (1 + self.BETA) / 2
+        else:
+            self.w_max = cwnd_segments
+        self.epoch_start = None
+        self.ssthresh = max(self.cwnd * self.BETA, 2 * self.mss)
+
+    def on_loss(self, flight_size, recover, now):
+        super().on_loss(flight_size, recover, now)
+        # CUBIC reduz para BETA * cwnd (e nao para metade)
+        self.cwnd = self.ssthresh + 3 * self.mss
+
+
+CONGESTION_CONTROLS = {
+    'reno': RenoCongestionControl,
+    'newreno': NewRenoCongestionControl,
+    'cubic': CubicCongestionControl,
+}
+
+
+def create_congestion_control(name, mss, initial_window=10):
+    if name not in CONGESTION_CONTROLS:
+        raise ValueError(f"controle de congestionamento desconhecido: {name!r} "
+                         f"(disponiveis: {', '.join(CONGESTION_CONTROLS)})")
+    return CONGESTION_CONTROLS[name](mss, initial_window)
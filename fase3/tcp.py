@@ -3,7 +3,7 @@ Módulo tcp - alias para tcp_socket
 Mantém compatibilidade com imports fase3.tcp
 """
 
-from .tcp_socket import SimpleTCPSocket
+from .tcp_socket import SimpleTCPSocket, IncompleteReadError
 
-__all__ = ['SimpleTCPSocket']
+__all__ = ['SimpleTCPSocket', 'IncompleteReadError']
 
@@ -3,10 +3,13 @@ TCP Simplificado - Implementação Completa
 Implementa conexão TCP com three-way handshake, flow control e four-way close
 """
 
+import hashlib
+import selectors
 import socket
 import threading
 import time
 import random
+import traceback
 from collections import deque
 import sys
 import os
@@ -15,6 +18,82 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from utils.tcp_segment import TCPSegment
 from utils.logger import ProtocolLogger
+from utils.buffer_pool import shared_pool, recv_view
+from utils.byte_ring import ByteRing
+from utils.timer_wheel import TimerWheel
+from fase3.congestion_control import create_congestion_control
+
+
+# Implementacao da classe IncompleteReadError:
+# Conexao encerrada (ou timeout) antes de readexactly obter n bytes; partial guarda o que foi lido
+class IncompleteReadError(EOFError):
+    # Construtor - inicializa o objeto
+    def __init__(self, partial, expected):
+        super().__init__(f"{len(partial)} de {expected} bytes lidos antes do fim da leitura")
+        self.partial = partial
+        self.expected = expected
+
+
+# Implementacao da classe ScheduledTimer:
+# Prazo agendado por _schedule na roda compartilhada; cancel() como o do threading.Timer
+class ScheduledTimer:
+    __slots__ = ('wheel', 'callback', 'owner')
+    
+    # Construtor - inicializa o objeto (owner: socket que agendou, para registrar erros)
+    def __init__(self, wheel, callback, owner):
+        self.wheel = wheel
+        self.callback = callback
+        self.owner = owner
+    
+    # Metodo para cancelar o prazo (sem efeito se ja disparou)
+    def cancel(self):
+        self.wheel.cancel(self)
+
+
+# Roda unica para os timers de todos os sockets (RTO, persist, ACK atrasado, SYN-ACK e
+# TIME_WAIT): uma thread por processo em vez de uma por rearme, criada no primeiro uso
+_timer_wheel = None
+_timer_wheel_lock = threading.Lock()
+
+
+def _shared_timer_wheel():
+    global _timer_wheel
+    with _timer_wheel_lock:
+        if _timer_wheel is None:
+            _timer_wheel = TimerWheel(_fire_timers)
+        return _timer_wheel
+
+
+def _fire_timers(timers):
+    for timer in timers:
+        try:
+            timer.callback(timer)
+        except (OSError, ValueError) as e:
+            # Socket UDP fechado com o timer ja vencido (close concorrente), como no receive loop
+            timer.owner.logger.log_event(f"Timer descartado com o socket fechado: {e}")
+        except Exception as e:
+            # Bug no callback: registra com traceback sem derrubar a thread de todos os sockets
+            timer.owner.logger.log_error(f"Erro no callback de timer: {e!r}")
+            traceback.print_exc()
+
+
+# Implementacao da classe HalfOpenConnection:
+# Entrada da fila de SYN do listener: so o necessario para completar o handshake (sem socket)
+class HalfOpenConnection:
+    __slots__ = ('iss', 'ack_num', 'created_at', 'sent_at', 'window', 'retries', 'retransmit_at')
+    
+    # Construtor - inicializa o objeto (iss: nosso seq inicial; ack_num: ISN do peer + 1)
+    def __init__(self, iss, ack_num, created_at, retransmit_at):
+        self.iss = iss
+        self.ack_num = ack_num
+        self.created_at = created_at
+        # Envio do SYN-ACK para a amostra de RTT; None se retransmitido (Karn)
+        self.sent_at = created_at
+        # Retransmissoes do SYN-ACK ja feitas e instante da proxima
+        self.retries = 0
+        self.retransmit_at = retransmit_at
+        # Janela do ACK final quando ele chegou com a fila de accept cheia (handshake completo)
+        self.window = None
 
 
 # Implementacao da classe SimpleTCPSocket:
@@ -28,27 +107,54 @@ class SimpleTCPSocket:
     FIN_WAIT_2 = 'FIN_WAIT_2'
     CLOSE_WAIT = 'CLOSE_WAIT'
     LAST_ACK = 'LAST_ACK'
+    CLOSING = 'CLOSING'
     TIME_WAIT = 'TIME_WAIT'
     
-    BUFFER_SIZE = 4096
+    # Buffer de recepcao (maior valor do campo de 16 bits); a janela anunciada e o espaco livre nele
+    BUFFER_SIZE = 65535
     MSS = 1460
+    # Janela inicial em segmentos (RFC 6928)
+    INITIAL_WINDOW = 10
+    DUP_ACK_THRESHOLD = 3
     INITIAL_TIMEOUT = 1.0
+    MIN_TIMEOUT = 0.2
+    MAX_TIMEOUT = 5.0
     MAX_RETRIES = 5
     TIME_WAIT_DURATION = 2.0
+    # ACK atrasado (RFC 1122: ate 500 ms; 40 ms como o minimo do Linux), enviado antes a cada 2 MSS
+    DELAYED_ACK_TIMEOUT = 0.04
+    # High-water mark do buffer de envio (bytes em espera + em transito), como SO_SNDBUF
+    SEND_BUFFER_SIZE = 256 * 1024
+    # Fila de SYN do listener (conexoes semi-abertas, como tcp_max_syn_backlog) e prazo para o ACK final
+    SYN_BACKLOG = 1024
+    SYN_RECEIVED_TIMEOUT = 5.0
+    # Retransmissoes do SYN-ACK sem resposta (como tcp_synack_retries), com backoff exponencial
+    SYN_ACK_RETRIES = 5
+    # SYN cookies: periodo do contador de tempo (cookie vale no periodo atual e no anterior)
+    SYN_COOKIE_PERIOD = 64.0
     
     # Construtor - inicializa o objeto
-    def __init__(self, src_port=0, channel=None, verbose=True):
-        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.src_port = src_port
-        if src_port == 0:
-            self.src_port = random.randint(10000, 60000)
-        
-        try:
-            self.udp_socket.bind(('localhost', self.src_port))
-        except OSError:
-            self.src_port = random.randint(10000, 60000)
-            self.udp_socket.bind(('localhost', self.src_port))
+    # congestion_control: 'reno', 'newreno' ou 'cubic'; initial_window em segmentos
+    # udp_socket: socket ja vinculado (conexoes aceitas usam o do listener, que e o unico leitor)
+    # delayed_ack_timeout: atraso maximo do ACK de dados em ordem (0 confirma cada segmento)
+    # send_buffer_size: limite de bytes aceitos por send() e ainda nao confirmados
+    # nodelay: desliga o algoritmo de Nagle (como TCP_NODELAY)
+    def __init__(self, src_port=0, channel=None, verbose=True,
+                 congestion_control='newreno', initial_window=INITIAL_WINDOW, udp_socket=None,
+                 delayed_ack_timeout=DELAYED_ACK_TIMEOUT, send_buffer_size=SEND_BUFFER_SIZE, nodelay=False):
+        if udp_socket is None:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # Porta 0: o sistema escolhe uma porta efemera livre. Sem SO_REUSEADDR, senao duas
+            # portas efemeras podem coincidir e a 4-tupla deixa de identificar a conexao
+            if src_port != 0:
+                self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.udp_socket.bind(('localhost', src_port))
+            self.src_port = self.udp_socket.getsockname()[1]
+            self.shared_udp_socket = False
+        else:
+            self.udp_socket = udp_socket
+            self.src_port = src_port
+            self.shared_udp_socket = True
         
         self.channel = channel
         
@@ -58,12 +164,32 @@ class SimpleTCPSocket:
         self.seq_num = random.randint(0, 1000)
         self.ack_num = 0
         
-        self.send_buffer = deque()
-        self.recv_buffer = deque()
+        # Dados aceitos por send() e ainda nao transmitidos; o motor de envio os drena com os ACKs
+        self.send_buffer = bytearray()
+        self.send_buffer_size = send_buffer_size
+        self.nodelay = nodelay
+        # Fluxo recebido em ordem, contiguo; recv_view entrega views reservadas ate a proxima leitura
+        self.recv_ring = ByteRing(self.BUFFER_SIZE)
+        self.recv_reserved = 0
         self.out_of_order_buffer = {}
+        # Ultima janela enviada ao peer (decide quando mandar atualizacao de janela)
+        self.last_advertised_window = self.BUFFER_SIZE
         
         self.rwnd = self.BUFFER_SIZE
-        self.cwnd = self.MSS
+        # Persist timer: sonda a janela zero do peer com backoff exponencial
+        self.persist_timer = None
+        self.persist_backoff = 0
+        # ACK atrasado: bytes em ordem ainda nao confirmados e timer que forca o ACK
+        self.delayed_ack_timeout = delayed_ack_timeout
+        self.ack_pending_bytes = 0
+        self.ack_timer = None
+        self.congestion_control = congestion_control
+        self.initial_window = initial_window
+        self.congestion = create_congestion_control(congestion_control, self.MSS, initial_window)
+        self.cwnd_history = deque(maxlen=10000)
+        self.dup_acks = 0
+        # Maior seq enviado no ultimo timeout: ACKs abaixo dele retransmitem o proximo buraco
+        self.rto_recover = 0
         
         self.last_byte_sent = self.seq_num
         self.last_byte_acked = self.seq_num
@@ -73,34 +199,83 @@ class SimpleTCPSocket:
         self.estimated_rtt = self.INITIAL_TIMEOUT
         self.dev_rtt = 0
         self.timeout_interval = self.INITIAL_TIMEOUT
+        self.rtt_samples = 0
+        # Instante de envio por seq dos segmentos de dados transmitidos uma unica vez (Karn)
+        self.send_times = {}
+        # Envio do SYN / SYN-ACK; None se retransmitido (amostra ambigua)
+        self.handshake_sent_at = None
         
         self.lock = threading.Lock()
+        # Sinalizada quando ACKs liberam a janela de envio ou a conexao muda de estado
+        self.window_cond = threading.Condition(self.lock)
+        # Sinalizada quando chegam dados em ordem ou a conexao deixa ESTABLISHED
+        self.recv_cond = threading.Condition(self.lock)
         self.recv_thread = None
         self.running = False
         
         self.connection_event = threading.Event()
-        self.data_available_event = threading.Event()
         self.close_event = threading.Event()
-        self.ack_received_event = threading.Event()
         
         self.accept_queue = deque()
         self.accept_event = threading.Event()
         
-        self.established_connections = {}
+        # Listener: fila de SYN (4-tupla -> HalfOpenConnection), limite da fila de accept
+        # (backlog) e SYN cookies (nenhum estado ate o ACK final)
+        self.syn_queue = {}
+        # Handshakes completos a espera de espaco na fila de accept (chaves da fila de SYN)
+        self.completed_handshakes = deque()
+        self.backlog = 0
+        self.syn_cookies = False
+        self.syn_cookie_secret = os.urandom(16)
+        self.syn_drops = 0
+        self.syn_duplicates = 0
+        self.accept_overflows = 0
+        self.syn_cookies_sent = 0
+        self.syn_ack_retransmissions = 0
         
-        self.shared_udp_socket = False
+        # Tabela de conexoes do listener: 4-tupla (ip/porta local, ip/porta remota) -> conexao
+        self.connections = {}
+        self.local_addr = None
+        # Conexao aceita: listener dono da tabela e chave nela
+        self.listener = None
+        self.connection_key = None
         
         self.logger = ProtocolLogger("TCP", verbose=verbose)
         
         self.timer = None
         self.pending_segment = None
+        # Fila de retransmissao: segmentos de dados enviados e ainda nao confirmados, em ordem
+        self.unacked = deque()
+        
+        self.segments_sent = 0
+        self.retransmissions = 0
+        self.fast_retransmissions = 0
+        self.window_probes = 0
+        self.window_updates = 0
+        self.acks_sent = 0
+        self.delayed_acks = 0
+        self.piggybacked_acks = 0
+        self.start_time = time.monotonic()
+        self._record_cwnd()
         
         self.logger.log_event(f"Socket criado na porta {self.src_port}")
     
+    @property
+    def cwnd(self):
+        return self.congestion.cwnd
+    
+    def _record_cwnd(self):
+        self.cwnd_history.append((time.monotonic() - self.start_time, self.congestion.cwnd))
+    
     def _send_segment(self, segment, addr=None):
         if addr is None:
             addr = self.dst_addr
         segment_bytes = segment.to_bytes()
+        self.last_advertised_window = segment.window
+        if self.ack_pending_bytes and segment.ack_num == self.ack_num and segment.has_flag(TCPSegment.FLAG_ACK):
+            if segment.data:
+                self.piggybacked_acks += 1
+            self._cancel_delayed_ack()
         
         if self.channel:
             self.channel.send(segment_bytes, self.udp_socket, addr)
@@ -111,47 +286,54 @@ class SimpleTCPSocket:
             f"{segment} -> {addr[1]}"
         )
     
+    # Unico leitor do socket UDP: num listener atende todas as conexoes aceitas pela tabela
     def _receive_loop(self):
         try:
             self.udp_socket.settimeout(0.1)
-        except:
+            selector = selectors.DefaultSelector()
+            selector.register(self.udp_socket, selectors.EVENT_READ)
+        except (OSError, ValueError):
             return
-        while self.running:
-            try:
-                data, addr = self.udp_socket.recvfrom(65535)
-                segment, is_valid = TCPSegment.from_bytes(data)
-                
-                if not is_valid:
-                    self.logger.log_event(f"Segmento corrompido recebido de {addr}")
-                    continue
-                
-                self.logger.log_receive(f"{segment} <- {addr[1]}")
-                
-                self._process_segment(segment, addr)
-                
-            except socket.timeout:
-                continue
-            except OSError as e:
-                if self.running:
-                    self.running = False
-                break
-            except Exception as e:
-                if self.running:
-                    self.logger.log_event(f"Erro no receive loop: {e}")
+        with selector, shared_pool.slab() as slab:
+            while self.running:
+                try:
+                    if not selector.select(timeout=0.1):
+                        continue
+                    data, addr = recv_view(self.udp_socket, slab)
+                    segment, is_valid = TCPSegment.from_bytes(data)
+                    
+                    if not is_valid:
+                        self.logger.log_event(f"Segmento corrompido recebido de {addr}")
+                        continue
+                    
+                    self.logger.log_receive(f"{segment} <- {addr[1]}")
+                    
+                    self._process_segment(segment, addr)
+                    
+                except socket.timeout:
                     continue
+                except (OSError, ValueError):
+                    # Socket fechado durante o select/recv
+                    if self.running:
+                        self.running = False
+                    break
+                except Exception as e:
+                    if self.running:
+                        self.logger.log_event(f"Erro no receive loop: {e}")
+                        continue
     
     def _process_segment(self, segment, addr):
-        if self.state == self.LISTEN and addr in self.established_connections:
-            conn_socket = self.established_connections[addr]
-            conn_socket._process_segment(segment, addr)
-            return
+        if self.state == self.LISTEN:
+            # Demultiplexacao pela 4-tupla: a maquina de estados da conexao roda na thread do listener
+            conn_socket = self.connections.get(self.local_addr + addr)
+            if conn_socket is not None:
+                conn_socket._process_segment(segment, addr)
+                return
         with self.lock:
             if self.state == self.LISTEN:
                 self._handle_listen(segment, addr)
             elif self.state == self.SYN_SENT:
                 self._handle_syn_sent(segment, addr)
-            elif self.state == self.SYN_RECEIVED:
-                self._handle_syn_received(segment, addr)
             elif self.state == self.ESTABLISHED:
                 self._handle_established(segment, addr)
             elif self.state == self.FIN_WAIT_1:
@@ -162,42 +344,180 @@ class SimpleTCPSocket:
                 self._handle_close_wait(segment, addr)
             elif self.state == self.LAST_ACK:
                 self._handle_last_ack(segment, addr)
+            elif self.state == self.CLOSING:
+                self._handle_closing(segment, addr)
+            elif self.state == self.TIME_WAIT:
+                self._handle_time_wait(segment, addr)
     
-    # Trata evento especifico
+    # SYN: entrada na fila de SYN (ou cookie) e SYN-ACK; ACK final: cria a conexao ja ESTABLISHED
     def _handle_listen(self, segment, addr):
+        key = self.local_addr + addr
         if segment.has_flag(TCPSegment.FLAG_SYN):
-            self.logger.log_event("Recebido SYN, enviando SYN-ACK")
-            self.dst_addr = addr
-            self.ack_num = segment.seq_num + 1
-            self.next_seq_expected = self.ack_num
-            
-            new_socket = SimpleTCPSocket(0, self.channel, self.logger.verbose)
-            
-            old_socket = new_socket.udp_socket
-            new_socket.udp_socket = self.udp_socket
-            new_socket.src_port = self.src_port
-            new_socket.shared_udp_socket = True
-            old_socket.close()
-            
-            new_socket.state = self.SYN_RECEIVED
-            new_socket.dst_addr = addr
-            new_socket.ack_num = segment.seq_num + 1
-            new_socket.next_seq_expected = new_socket.ack_num
-            new_socket.rwnd = segment.window
-            
-            syn_ack = TCPSegment(
-                new_socket.src_port,
-                segment.src_port,
-                new_socket.seq_num,
-                new_socket.ack_num,
-                TCPSegment.FLAG_SYN | TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE
-            )
-            new_socket._send_segment(syn_ack, addr)
-            new_socket.seq_num += 1
-            
-            self.accept_queue.append((new_socket, segment, addr))
-            self.accept_event.set()
+            self._handle_syn(segment, addr, key)
+        elif segment.has_flag(TCPSegment.FLAG_ACK):
+            self._handle_handshake_ack(segment, addr, key)
+    
+    def _handle_syn(self, segment, addr, key):
+        now = time.monotonic()
+        half_open = self.syn_queue.get(key)
+        if half_open is not None and half_open.ack_num == segment.seq_num + 1:
+            # SYN retransmitido (SYN-ACK perdido): reenvia o mesmo SYN-ACK, sem nova entrada
+            self.syn_duplicates += 1
+            half_open.sent_at = None
+            self._send_syn_ack(half_open.iss, half_open.ack_num, addr)
+            return
+        if len(self.accept_queue) >= self.backlog:
+            # Fila de accept cheia: descarta o SYN (o cliente retransmite)
+            self.syn_drops += 1
+            self.logger.log_event(f"Fila de accept cheia ({self.backlog}): SYN de {addr} descartado")
+            return
+        if self.syn_cookies:
+            counter = int(now // self.SYN_COOKIE_PERIOD)
+            self.syn_cookies_sent += 1
+            self._send_syn_ack(self._syn_cookie(addr, segment.seq_num, counter), segment.seq_num + 1, addr)
+            return
+        if half_open is None and len(self.syn_queue) >= self.SYN_BACKLOG:
+            self._expire_half_open(now)
+            if len(self.syn_queue) >= self.SYN_BACKLOG:
+                self.syn_drops += 1
+                self.logger.log_event(f"Fila de SYN cheia ({self.SYN_BACKLOG}): SYN de {addr} descartado")
+                return
+        
+        self.logger.log_event("Recebido SYN, enviando SYN-ACK")
+        # SYN com outro ISN na mesma 4-tupla e uma nova tentativa: substitui a entrada antiga
+        half_open = HalfOpenConnection(random.randint(0, 1000), segment.seq_num + 1, now,
+                                       now + self.timeout_interval)
+        self.syn_queue[key] = half_open
+        self._send_syn_ack(half_open.iss, half_open.ack_num, addr)
+        self._arm_syn_ack_timer()
+    
+    # ACK final (ou primeiro segmento de dados, se o ACK se perdeu) de um handshake pendente
+    def _handle_handshake_ack(self, segment, addr, key):
+        half_open = self.syn_queue.get(key)
+        if half_open is not None:
+            if segment.ack_num != half_open.iss + 1:
+                return
+            iss, ack_num, sent_at = half_open.iss, half_open.ack_num, half_open.sent_at
+        elif self.syn_cookies and self._check_syn_cookie(addr, segment.seq_num - 1, segment.ack_num - 1):
+            iss, ack_num, sent_at = segment.ack_num - 1, segment.seq_num, None
+        else:
+            return
+        if len(self.accept_queue) >= self.backlog:
+            self.accept_overflows += 1
+            self.logger.log_event(f"Fila de accept cheia ({self.backlog}): handshake de {addr} em espera")
+            # Com entrada na fila de SYN, o handshake fica completo e entra quando accept() liberar
+            # espaco; com cookie nao ha onde guarda-lo e o ACK e descartado (os dados sao retransmitidos)
+            if half_open is not None and half_open.window is None:
+                half_open.window = segment.window
+                self.completed_handshakes.append(key)
+            return
+        self.syn_queue.pop(key, None)
+        self._establish_connection(key, addr, iss, ack_num, segment.window, sent_at, segment)
+    
+    # Cria a conexao aceita ja ESTABLISHED (chamado com self.lock adquirido). segment: ACK final,
+    # cujos dados (se houver) ja sao entregues a conexao
+    def _establish_connection(self, key, addr, iss, ack_num, window, sent_at, segment=None):
+        # type(self): subclasses (ex.: a versao asyncio) aceitam conexoes do proprio tipo
+        new_socket = type(self)(self.src_port, self.channel, self.logger.verbose,
+                                self.congestion_control, self.initial_window,
+                                udp_socket=self.udp_socket, delayed_ack_timeout=self.delayed_ack_timeout,
+                                send_buffer_size=self.send_buffer_size, nodelay=self.nodelay)
+        new_socket.listener = self
+        new_socket.connection_key = key
+        new_socket.running = True
+        
+        new_socket.state = self.ESTABLISHED
+        new_socket.dst_addr = addr
+        new_socket.seq_num = iss + 1
+        new_socket.last_byte_sent = new_socket.last_byte_acked = new_socket.seq_num
+        new_socket.ack_num = new_socket.next_seq_expected = ack_num
+        new_socket.rwnd = window
+        new_socket.handshake_sent_at = sent_at
+        
+        # Ainda invisivel para outras threads: a ordem de locks listener -> conexao nao trava
+        with new_socket.lock:
+            new_socket._handshake_rtt_sample()
+            new_socket.logger.log_event(f"Conexão ESTABELECIDA com {addr}")
+            new_socket.connection_event.set()
+            # ACK final perdido: o primeiro segmento de dados completa o handshake
+            if segment is not None and (segment.data or segment.has_flag(TCPSegment.FLAG_FIN)):
+                new_socket._handle_established(segment, addr)
+        
+        self.connections[key] = new_socket
+        self.accept_queue.append((new_socket, segment, addr))
+        self.accept_event.set()
+    
+    # Retira a proxima conexao da fila de accept e admite os handshakes que esperavam espaco
+    # (chamado com self.lock adquirido)
+    def _pop_accepted(self):
+        new_socket, _, addr = self.accept_queue.popleft()
+        while self.completed_handshakes and len(self.accept_queue) < self.backlog:
+            key = self.completed_handshakes.popleft()
+            half_open = self.syn_queue.get(key)
+            # Entrada substituida por um SYN novo na mesma 4-tupla: handshake antigo abandonado
+            if half_open is None or half_open.window is None:
+                continue
+            del self.syn_queue[key]
+            self._establish_connection(key, key[2:], half_open.iss, half_open.ack_num,
+                                       half_open.window, half_open.sent_at)
+        return new_socket, addr
+    
+    def _send_syn_ack(self, iss, ack_num, addr):
+        syn_ack = TCPSegment(
+            self.src_port,
+            addr[1],
+            iss,
+            ack_num,
+            TCPSegment.FLAG_SYN | TCPSegment.FLAG_ACK,
+            self._advertised_window()
+        )
+        self._send_segment(syn_ack, addr)
+    
+    # Timer unico do listener para os SYN-ACKs pendentes (chamado com self.lock adquirido)
+    def _arm_syn_ack_timer(self):
+        if self.timer is None and self.running:
+            self.timer = self._schedule(self.timeout_interval, self._retransmit_syn_acks)
+    
+    # ACK final perdido: sem o SYN-ACK repetido o listener so saberia do handshake no proximo
+    # segmento do cliente. Esgotadas as tentativas, a entrada e descartada
+    def _retransmit_syn_acks(self, timer):
+        with self.lock:
+            if self.timer is not timer or self.state != self.LISTEN:
+                return
+            self.timer = None
+            now = time.monotonic()
+            for key, half_open in list(self.syn_queue.items()):
+                if half_open.window is not None or now < half_open.retransmit_at:
+                    continue
+                if half_open.retries >= self.SYN_ACK_RETRIES:
+                    del self.syn_queue[key]
+                    continue
+                half_open.retries += 1
+                half_open.sent_at = None
+                half_open.retransmit_at = now + self.timeout_interval * 2 ** half_open.retries
+                self.syn_ack_retransmissions += 1
+                self._send_syn_ack(half_open.iss, half_open.ack_num, key[2:])
+            if self.syn_queue:
+                self._arm_syn_ack_timer()
+    
+    # Fila de SYN cheia: descarta handshakes que passaram do prazo (so entao; custo O(n) raro)
+    def _expire_half_open(self, now):
+        # Handshakes completos nao expiram: o cliente ja considera a conexao estabelecida
+        expired = [key for key, half_open in self.syn_queue.items()
+                   if half_open.window is None and now - half_open.created_at > self.SYN_RECEIVED_TIMEOUT]
+        for key in expired:
+            del self.syn_queue[key]
+    
+    # ISN sem estado: 5 bits do contador de tempo + 26 bits de MAC(4-tupla, ISN do peer, contador).
+    # Fica abaixo de 2**31: os numeros de sequencia nao dao a volta no campo de 32 bits
+    def _syn_cookie(self, addr, peer_isn, counter):
+        message = f"{self.local_addr}{addr}{peer_isn}{counter}".encode()
+        digest = hashlib.blake2s(message, key=self.syn_cookie_secret, digest_size=4).digest()
+        return (counter % 32) << 26 | (int.from_bytes(digest, 'big') & (2 ** 26 - 1))
+    
+    def _check_syn_cookie(self, addr, peer_isn, cookie):
+        counter = int(time.monotonic() // self.SYN_COOKIE_PERIOD)
+        return any(cookie == self._syn_cookie(addr, peer_isn, c) for c in (counter, counter - 1))
     
     # Trata evento especifico
     def _handle_syn_sent(self, segment, addr):
@@ -211,6 +531,8 @@ class SimpleTCPSocket:
                 self.ack_num = segment.seq_num + 1
                 self.next_seq_expected = self.ack_num
                 self.rwnd = segment.window
+                self.last_byte_acked = self.seq_num
+                self._handshake_rtt_sample()
                 
                 ack = TCPSegment(
                     self.src_port,
@@ -218,7 +540,7 @@ class SimpleTCPSocket:
                     self.seq_num,
                     self.ack_num,
                     TCPSegment.FLAG_ACK,
-                    self.BUFFER_SIZE
+                    self._advertised_window()
                 )
                 self._send_segment(ack, addr)
                 
@@ -226,104 +548,178 @@ class SimpleTCPSocket:
                 self.logger.log_event(f"Conexão ESTABELECIDA com {addr}")
                 self.connection_event.set()
     
-    # Trata evento especifico
-    def _handle_syn_received(self, segment, addr):
-        if segment.has_flag(TCPSegment.FLAG_ACK):
-            if segment.ack_num == self.seq_num:
-                self.logger.log_event("Recebido ACK final do handshake")
-                self.state = self.ESTABLISHED
-                self.rwnd = segment.window
-                self.logger.log_event(f"Conexão ESTABELECIDA com {addr}")
-                self.connection_event.set()
-    
     # Trata evento especifico
     def _handle_established(self, segment, addr):
-        self.rwnd = segment.window
+        if segment.has_flag(TCPSegment.FLAG_SYN):
+            # SYN-ACK retransmitido: o ACK final se perdeu, repete-o
+            if segment.has_flag(TCPSegment.FLAG_ACK):
+                self._send_ack()
+            return
+        
         if segment.has_flag(TCPSegment.FLAG_ACK):
-            if segment.ack_num > self.last_byte_acked:
-                bytes_acked = segment.ack_num - self.last_byte_acked
-                self.last_byte_acked = segment.ack_num
-                self.logger.log_event(f"ACK recebido: {bytes_acked} bytes confirmados")
-                
-                if self.timer:
-                    self.timer.cancel()
-                    self.timer = None
-                    self.pending_segment = None
-                
-                # Sinalizar que ACK foi recebido
-                self.ack_received_event.set()
-                
-                sample_rtt = self.timeout_interval * 0.8
-                self._update_rtt(sample_rtt)
+            self._process_ack(segment)
+            self._push_pending()
         
         if segment.has_flag(TCPSegment.FLAG_FIN):
+            if not self._accept_fin(segment):
+                return
             self.logger.log_event("Recebido FIN, iniciando fechamento passivo")
             
-            if len(segment.data) > 0:
-                if segment.seq_num == self.next_seq_expected:
-                    self.recv_buffer.append(segment.data)
-                    self.next_seq_expected += len(segment.data)
-                    self.data_available_event.set()
-            
-            self.ack_num = segment.seq_num + len(segment.data) + 1
-            
             ack = TCPSegment(
                 self.src_port,
                 segment.src_port,
                 self.seq_num,
                 self.ack_num,
                 TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE
+                self._advertised_window()
             )
             self._send_segment(ack, addr)
             
             self.state = self.CLOSE_WAIT
             self.close_event.set()
+            self.window_cond.notify_all()
+            self.recv_cond.notify_all()
             return
         
+        self._receive_data(segment)
+    
+    # FIN so e aceito em ordem e com os dados cabendo na janela, como no caminho de dados: entrega
+    # os dados e confirma o FIN. Senao o ACK imediato repete o proximo byte esperado e o peer
+    # retransmite o FIN (chamado com self.lock adquirido)
+    def _accept_fin(self, segment):
+        if segment.seq_num != self.next_seq_expected or not self._fits_receive_window(segment):
+            self.logger.log_event(f"FIN fora de ordem ou alem da janela descartado: seq={segment.seq_num}, esperado={self.next_seq_expected}, janela={self._advertised_window()}")
+            self._send_ack()
+            return False
         if len(segment.data) > 0:
+            self._deliver(segment.data)
+        self.ack_num = self.next_seq_expected + 1
+        return True
+    
+    # Caminho de dados em ESTABLISHED e, apos o nosso FIN (meio-fechamento), em FIN_WAIT_1/2
+    # (chamado com self.lock adquirido)
+    def _receive_data(self, segment):
+        # Sonda de janela zero (seq ja confirmado, sem dados) tambem e respondida com ACK
+        if len(segment.data) > 0 or segment.seq_num < self.next_seq_expected:
             self.logger.log_event(f"Processando dados: seq={segment.seq_num}, esperado={self.next_seq_expected}, len={len(segment.data)}")
-            if segment.seq_num == self.next_seq_expected:
-                self.recv_buffer.append(segment.data)
-                self.next_seq_expected += len(segment.data)
-                self.ack_num = self.next_seq_expected
+            if segment.seq_num < self.next_seq_expected:
+                self.logger.log_event(f"Dados duplicados ou antigos: seq={segment.seq_num}, esperado={self.next_seq_expected}")
+            elif not self._fits_receive_window(segment):
+                # Sem espaco no buffer: descarta (o peer retransmite quando a janela abrir)
+                self.logger.log_event(f"Dados alem da janela descartados: seq={segment.seq_num}, janela={self._advertised_window()}")
+            elif segment.seq_num == self.next_seq_expected:
+                # Segmento que preenche um buraco e confirmado na hora (RFC 5681)
+                filled_gap = bool(self.out_of_order_buffer)
+                self._deliver(segment.data)
                 self.logger.log_event(f"Dados recebidos: {len(segment.data)} bytes")
                 
                 while self.next_seq_expected in self.out_of_order_buffer:
-                    data = self.out_of_order_buffer.pop(self.next_seq_expected)
-                    self.recv_buffer.append(data)
-                    self.next_seq_expected += len(data)
-                    self.ack_num = self.next_seq_expected
-                
-                self.data_available_event.set()
-            elif segment.seq_num > self.next_seq_expected:
+                    self._deliver(self.out_of_order_buffer.pop(self.next_seq_expected))
+                self.ack_num = self.next_seq_expected
+                if not filled_gap and not segment.has_flag(TCPSegment.FLAG_PSH):
+                    self._delay_ack(len(segment.data))
+                    return
+            else:
                 self.logger.log_event(f"Dados fora de ordem: seq={segment.seq_num}, esperado={self.next_seq_expected}")
                 self.out_of_order_buffer[segment.seq_num] = segment.data
-            else:
-                self.logger.log_event(f"Dados duplicados ou antigos: seq={segment.seq_num}, esperado={self.next_seq_expected}")
             
-            ack = TCPSegment(
-                self.src_port,
-                segment.src_port,
-                self.seq_num,
-                self.ack_num,
-                TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE
-            )
-            self._send_segment(ack, addr)
+            # Fora de ordem, duplicados, alem da janela e sondas: ACK imediato (ACKs duplicados
+            # disparam o fast retransmit do emissor)
+            self._send_ack()
+    
+    # ACK atrasado (RFC 1122): confirma a cada 2 MSS em ordem ou apos delayed_ack_timeout; ate
+    # la, qualquer segmento enviado (dados, FIN, atualizacao de janela) leva o ACK de carona
+    # (chamado com self.lock adquirido)
+    def _delay_ack(self, length):
+        self.ack_pending_bytes += length
+        if self.ack_pending_bytes >= 2 * self.MSS or not self.delayed_ack_timeout:
+            self._send_ack()
+        elif self.ack_timer is None:
+            self.ack_timer = self._schedule(self.delayed_ack_timeout, self._send_delayed_ack)
+    
+    def _send_delayed_ack(self, timer):
+        with self.lock:
+            if self.ack_timer is not timer:
+                return
+            self.ack_timer = None
+            if self.ack_pending_bytes and self.state != self.CLOSED:
+                self.delayed_acks += 1
+                self._send_ack()
+    
+    # ACK puro com o proximo byte esperado e a janela atual (chamado com self.lock adquirido)
+    def _send_ack(self):
+        ack = TCPSegment(
+            self.src_port,
+            self.dst_addr[1],
+            self.seq_num,
+            self.ack_num,
+            TCPSegment.FLAG_ACK,
+            self._advertised_window()
+        )
+        self.acks_sent += 1
+        self._send_segment(ack)
+    
+    # O ACK pendente seguiu num segmento enviado (chamado com self.lock adquirido)
+    def _cancel_delayed_ack(self):
+        self.ack_pending_bytes = 0
+        if self.ack_timer:
+            self.ack_timer.cancel()
+            self.ack_timer = None
+    
+    # Copia dados em ordem para o ring de recepcao (chamado com self.lock adquirido)
+    def _deliver(self, data):
+        self.recv_ring.write(data)
+        self.next_seq_expected += len(data)
+        self.recv_cond.notify_all()
+    
+    # Janela a anunciar: espaco livre no ring. SWS do receptor (RFC 1122): sobras menores
+    # que min(MSS, buffer/2) sao anunciadas como zero ate a aplicacao ler mais
+    def _advertised_window(self):
+        free = self.BUFFER_SIZE - len(self.recv_ring)
+        if free < min(self.MSS, self.BUFFER_SIZE // 2):
+            return 0
+        return free
+    
+    # Dados so sao aceitos ate a borda direita da janela (proximo esperado + espaco livre real);
+    # os fora de ordem ocupam essa mesma faixa, entao ring + fora de ordem <= BUFFER_SIZE
+    def _fits_receive_window(self, segment):
+        free = self.BUFFER_SIZE - len(self.recv_ring)
+        return segment.seq_num + len(segment.data) <= self.next_seq_expected + free
+    
+    # Atualizacao de janela apos leitura da aplicacao (chamado com self.lock adquirido).
+    # So quando a janela abre ao menos um MSS e dobra em relacao a ultima anunciada
+    def _maybe_send_window_update(self):
+        if self.state not in (self.ESTABLISHED, self.FIN_WAIT_1, self.FIN_WAIT_2):
+            return
+        window = self._advertised_window()
+        if window < self.MSS or window < 2 * self.last_advertised_window:
+            return
+        update = TCPSegment(
+            self.src_port,
+            self.dst_addr[1],
+            self.seq_num,
+            self.ack_num,
+            TCPSegment.FLAG_ACK,
+            window
+        )
+        self._send_segment(update)
+        self.window_updates += 1
+        self.logger.log_event(f"Atualizacao de janela: {window} bytes")
     
     # Trata evento especifico
     def _handle_fin_wait_1(self, segment, addr):
-        if segment.has_flag(TCPSegment.FLAG_ACK):
+        # So o ACK que cobre o FIN: no meio-fechamento o peer ainda envia dados com ACKs antigos
+        if segment.has_flag(TCPSegment.FLAG_ACK) and segment.ack_num == self.seq_num:
             self.logger.log_event("ACK do FIN recebido")
             self.state = self.FIN_WAIT_2
             if self.timer:
                 self.timer.cancel()
                 self.timer = None
         
-        if segment.has_flag(TCPSegment.FLAG_FIN):
+        if not segment.has_flag(TCPSegment.FLAG_FIN):
+            self._receive_data(segment)
+        elif self._accept_fin(segment):
             self.logger.log_event("FIN simultâneo recebido")
-            self.ack_num = segment.seq_num + 1
             
             ack = TCPSegment(
                 self.src_port,
@@ -331,35 +727,157 @@ class SimpleTCPSocket:
                 self.seq_num,
                 self.ack_num,
                 TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE
+                self._advertised_window()
             )
             self._send_segment(ack, addr)
             
             if self.state == self.FIN_WAIT_2:
                 self._enter_time_wait()
+            else:
+                # FINs cruzados: falta so o ACK do nosso FIN
+                self.state = self.CLOSING
+            # Fim dos dados do peer (meio-fechamento): EOF para o leitor
+            self.recv_cond.notify_all()
     
     # Trata evento especifico
     def _handle_fin_wait_2(self, segment, addr):
-        if segment.has_flag(TCPSegment.FLAG_FIN):
+        if not segment.has_flag(TCPSegment.FLAG_FIN):
+            self._receive_data(segment)
+        elif self._accept_fin(segment):
             self.logger.log_event("FIN do peer recebido")
-            self.ack_num = segment.seq_num + 1
             ack = TCPSegment(
                 self.src_port,
                 segment.src_port,
                 self.seq_num,
                 self.ack_num,
                 TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE
+                self._advertised_window()
             )
             self._send_segment(ack, addr)
             
             self._enter_time_wait()
+            self.recv_cond.notify_all()
+    
+    # Trata evento especifico (fechamento simultaneo: FIN do peer ja confirmado, o nosso nao)
+    def _handle_closing(self, segment, addr):
+        if segment.has_flag(TCPSegment.FLAG_ACK) and segment.ack_num == self.seq_num:
+            self.logger.log_event("ACK do FIN recebido")
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+            self._enter_time_wait()
+        if segment.has_flag(TCPSegment.FLAG_FIN):
+            # FIN retransmitido: nosso ACK se perdeu
+            self._send_fin_ack(addr)
     
     # Trata evento especifico
     def _handle_close_wait(self, segment, addr):
         if segment.has_flag(TCPSegment.FLAG_ACK):
-            if segment.ack_num > self.last_byte_acked:
-                self.last_byte_acked = segment.ack_num
+            self._process_ack(segment)
+            self._push_pending()
+        if segment.has_flag(TCPSegment.FLAG_FIN):
+            # FIN retransmitido: nosso ACK se perdeu
+            self._send_fin_ack(addr)
+    
+    # Trata evento especifico
+    def _handle_time_wait(self, segment, addr):
+        if segment.has_flag(TCPSegment.FLAG_FIN):
+            # ACK final perdido: o peer em LAST_ACK retransmite o FIN
+            self._send_fin_ack(addr)
+    
+    # Reenvia o ACK do FIN do peer (chamado com self.lock adquirido)
+    def _send_fin_ack(self, addr):
+        ack = TCPSegment(
+            self.src_port,
+            addr[1],
+            self.seq_num,
+            self.ack_num,
+            TCPSegment.FLAG_ACK,
+            self._advertised_window()
+        )
+        self._send_segment(ack, addr)
+    
+    # ACK cumulativo: libera de uma vez todos os segmentos cobertos (chamado com self.lock adquirido)
+    def _process_ack(self, segment):
+        now = time.monotonic()
+        # Atualizacao de janela: nao conta como ACK duplicado (RFC 5681). ACKs antigos
+        # (reordenados) nao trazem a janela atual
+        window_update = segment.ack_num >= self.last_byte_acked and segment.window != self.rwnd
+        if window_update:
+            self._update_peer_window(segment.window)
+        if segment.ack_num == self.last_byte_acked:
+            if self.unacked and not segment.data and not window_update:
+                self._process_dup_ack(now)
+            return
+        if segment.ack_num < self.last_byte_acked:
+            return
+        self.dup_acks = 0
+        bytes_acked = segment.ack_num - self.last_byte_acked
+        self.last_byte_acked = segment.ack_num
+        
+        freed = 0
+        sent_at = None
+        ambiguous = False
+        while self.unacked and self.unacked[0].seq_num + len(self.unacked[0].data) <= segment.ack_num:
+            sent_at = self.send_times.pop(self.unacked.popleft().seq_num, None)
+            # Karn: ACK que cobre um segmento retransmitido nao gera amostra
+            ambiguous = ambiguous or sent_at is None
+            freed += 1
+        self.logger.log_event(f"ACK recebido: {bytes_acked} bytes confirmados ({freed} segmentos)")
+        
+        # Amostra pelo segmento mais recente coberto pelo ACK
+        if freed and not ambiguous:
+            self._update_rtt(now - sent_at)
+        
+        retransmit_next = self.congestion.on_ack(bytes_acked, segment.ack_num, now)
+        self._record_cwnd()
+        
+        if self.unacked and (retransmit_next or segment.ack_num < self.rto_recover):
+            # ACK parcial: o proximo segmento tambem foi perdido
+            self._retransmit_head()
+        elif self.unacked:
+            self._start_data_timer()
+        elif self.timer:
+            self.timer.cancel()
+            self.timer = None
+        
+        self.window_cond.notify_all()
+    
+    # ACK duplicado: o 3o dispara fast retransmit; os seguintes inflam a janela na recuperacao
+    def _process_dup_ack(self, now):
+        self.dup_acks += 1
+        if self.dup_acks == self.DUP_ACK_THRESHOLD:
+            # Durante a recuperacao (ou apos timeout) os ACKs duplicados sao do mesmo evento de perda
+            if self.congestion.in_recovery or self.last_byte_acked < self.rto_recover:
+                return
+            self.logger.log_event(f"{self.dup_acks} ACKs duplicados - fast retransmit seq={self.unacked[0].seq_num}")
+            self.congestion.on_loss(self._bytes_in_flight(), self.seq_num, now)
+            self.fast_retransmissions += 1
+            self._retransmit_head()
+        elif self.dup_acks > self.DUP_ACK_THRESHOLD:
+            self.congestion.on_dup_ack()
+        else:
+            return
+        self._record_cwnd()
+        self.window_cond.notify_all()
+    
+    # Retransmite o segmento mais antigo nao confirmado e reinicia o timer (chamado com self.lock adquirido)
+    def _retransmit_head(self):
+        self.send_times.pop(self.unacked[0].seq_num, None)
+        self._send_segment(self.unacked[0], self.dst_addr)
+        self.retransmissions += 1
+        self._start_data_timer()
+    
+    # Nova janela do peer: janela aberta encerra as sondas (chamado com self.lock adquirido)
+    def _update_peer_window(self, window):
+        self.rwnd = window
+        if window > 0:
+            self.persist_backoff = 0
+            if self.persist_timer:
+                self.persist_timer.cancel()
+                self.persist_timer = None
+        self.window_cond.notify_all()
+    
     # Trata evento especifico
     def _handle_last_ack(self, segment, addr):
         if segment.has_flag(TCPSegment.FLAG_ACK):
@@ -369,32 +887,53 @@ class SimpleTCPSocket:
                 self.timer = None
             
             self.state = self.CLOSED
+            self._leave_listener()
             self.close_event.set()
     
     def _enter_time_wait(self):
         self.state = self.TIME_WAIT
         self.logger.log_event(f"Entrando em TIME_WAIT por {self.TIME_WAIT_DURATION}s")
-        def exit_time_wait():
+        def exit_time_wait(timer):
             with self.lock:
                 self.logger.log_event("Saindo de TIME_WAIT, fechando conexão")
                 self.state = self.CLOSED
+                self._leave_listener()
                 self.close_event.set()
         
-        timer = threading.Timer(self.TIME_WAIT_DURATION, exit_time_wait)
-        timer.daemon = True
-        timer.start()
+        self._schedule(self.TIME_WAIT_DURATION, exit_time_wait)
     
+    # Conexao aceita encerrada: sai da tabela do listener (ordem de locks: conexao -> listener)
+    def _leave_listener(self):
+        if self.listener is not None:
+            self.listener._remove_connection(self)
+            self.listener = None
+    
+    def _remove_connection(self, conn_socket):
+        with self.lock:
+            if self.connections.get(conn_socket.connection_key) is conn_socket:
+                del self.connections[conn_socket.connection_key]
+    
+    # Estimador do RFC 6298 (chamado com self.lock adquirido)
     def _update_rtt(self, sample_rtt):
-        if self.estimated_rtt == self.INITIAL_TIMEOUT:
+        if self.rtt_samples == 0:
             self.estimated_rtt = sample_rtt
             self.dev_rtt = sample_rtt / 2
         else:
             alpha = 0.125
             beta = 0.25
-            self.estimated_rtt = (1 - alpha) * self.estimated_rtt + alpha * sample_rtt
+            # dev_rtt usa a estimativa anterior a esta amostra
             self.dev_rtt = (1 - beta) * self.dev_rtt + beta * abs(sample_rtt - self.estimated_rtt)
+            self.estimated_rtt = (1 - alpha) * self.estimated_rtt + alpha * sample_rtt
+        self.rtt_samples += 1
         self.timeout_interval = self.estimated_rtt + 4 * self.dev_rtt
-        self.timeout_interval = max(0.2, min(self.timeout_interval, 5.0))
+        self.timeout_interval = max(self.MIN_TIMEOUT, min(self.timeout_interval, self.MAX_TIMEOUT))
+        self.congestion.on_rtt_sample(sample_rtt)
+    
+    # Amostra SYN -> SYN-ACK (cliente) ou SYN-ACK -> ACK final (servidor), se nao houve retransmissao
+    def _handshake_rtt_sample(self):
+        if self.handshake_sent_at is not None:
+            self._update_rtt(time.monotonic() - self.handshake_sent_at)
+            self.handshake_sent_at = None
     
     def connect(self, host, port):
         if self.state != self.CLOSED:
@@ -403,57 +942,78 @@ class SimpleTCPSocket:
         self.logger.log_event(f"Iniciando conexão com {host}:{port}")
         
         self.connection_event.clear()
-        self.data_available_event.clear()
         self.close_event.clear()
         
         self.running = True
-        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True,
+                                            name=f"tcp-recv-{self.src_port}")
         self.recv_thread.start()
         
         time.sleep(0.05)
         
+        # Com o lock: um SYN-ACK rapido so e processado depois do seq_num avancar
+        with self.lock:
+            self._send_syn()
+        
+        success = self.connection_event.wait(timeout=10.0)
+        
+        # connection_event so e sinalizado pelo SYN-ACK: o peer pode ja ter fechado (CLOSE_WAIT)
+        if not success:
+            self.logger.log_event("Timeout na conexão")
+            self.running = False
+            if self.timer:
+                self.timer.cancel()
+            return False
+        
+        return True
+    
+    # Envia o SYN para dst_addr e arma a retransmissao (chamado com self.lock adquirido)
+    def _send_syn(self):
         syn = TCPSegment(
             self.src_port,
-            port,
+            self.dst_addr[1],
             self.seq_num,
             0,
             TCPSegment.FLAG_SYN,
-            self.BUFFER_SIZE
+            self._advertised_window()
         )
         
         self.state = self.SYN_SENT
         self._send_segment(syn)
+        self.handshake_sent_at = time.monotonic()
         self.seq_num += 1
         
         self.pending_segment = syn
         self._set_retransmission_timer()
+    
+    # backlog: limite da fila de accept (conexoes estabelecidas ainda nao aceitas)
+    # syn_cookies: responde SYNs sem guardar estado; a conexao so e criada no ACK final
+    def listen(self, backlog=5, syn_cookies=False):
+        self._prepare_listen(backlog, syn_cookies)
         
-        success = self.connection_event.wait(timeout=10.0)
-        
-        if not success or self.state != self.ESTABLISHED:
-            self.logger.log_event("Timeout na conexão")
-            self.running = False
-            if self.timer:
-                self.timer.cancel()
-            return False
+        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True,
+                                            name=f"tcp-recv-{self.src_port}")
+        self.recv_thread.start()
         
-        return True
+        time.sleep(0.05)
     
-    def listen(self, backlog=5):
+    # Estado de LISTEN comum ao listener com thread e ao asyncio
+    def _prepare_listen(self, backlog, syn_cookies):
         if self.state != self.CLOSED:
             raise RuntimeError(f"Socket já está em uso (estado: {self.state})")
         self.state = self.LISTEN
         self.logger.log_event(f"Socket em LISTEN na porta {self.src_port}")
         
+        self.backlog = max(1, backlog)
+        self.syn_cookies = syn_cookies
         self.accept_event.clear()
         self.accept_queue.clear()
-        self.established_connections.clear()
+        self.syn_queue.clear()
+        self.completed_handshakes.clear()
+        self.connections.clear()
+        self.local_addr = self.udp_socket.getsockname()
         
         self.running = True
-        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
-        self.recv_thread.start()
-        
-        time.sleep(0.05)
     
     def accept(self):
         if self.state != self.LISTEN:
@@ -465,113 +1025,281 @@ class SimpleTCPSocket:
         if not self.running:
             return None, None
         
+        # A fila de accept so guarda conexoes com o handshake completo; os segmentos delas
+        # chegam pela thread de recepcao do listener
         with self.lock:
             if len(self.accept_queue) == 0:
                 return None, None
             
-            new_socket, syn_segment, addr = self.accept_queue.popleft()
-        
-        new_socket.running = True
-        new_socket.recv_thread = threading.Thread(target=new_socket._receive_loop, daemon=True)
-        new_socket.recv_thread.start()
-        
-        success = new_socket.connection_event.wait(timeout=5.0)
-        
-        if not success or new_socket.state != self.ESTABLISHED:
-            new_socket.logger.log_event("Timeout no handshake")
-            new_socket.running = False
-            return None, None
-        
-        self.established_connections[addr] = new_socket
-        
-        return new_socket, addr
+            return self._pop_accepted()
     
-    # Metodo para enviar dados
+    # Metodo para enviar dados: copia para o buffer de envio e retorna sem esperar ACKs; so
+    # bloqueia acima do high-water mark (send_buffer_size). Ver flush() e drain()
     def send(self, data):
         if isinstance(data, str):
             data = data.encode('utf-8')
         if self.state != self.ESTABLISHED:
             raise RuntimeError(f"Cannot send: connection not established (state={self.state})")
         
-        total_sent = len(data)
+        view = memoryview(data)
         offset = 0
         
-        while offset < len(data):
-            chunk_size = min(self.MSS, len(data) - offset)
-            chunk = data[offset:offset + chunk_size]
-            
-            segment = TCPSegment(
+        with self.window_cond:
+            while offset < len(view):
+                if not self._can_send():
+                    return offset
+                space = self.send_buffer_size - len(self.send_buffer) - self._bytes_in_flight()
+                if space <= 0:
+                    # Buffer cheio: aguardar ACKs liberarem espaco
+                    self.window_cond.wait(self.timeout_interval)
+                    continue
+                chunk = view[offset:offset + space]
+                self.send_buffer += chunk
+                offset += len(chunk)
+                self._push_pending()
+        
+        return len(data)
+    
+    # Transmite ja o que o Nagle esta segurando (sem esperar ACKs; ver drain)
+    def flush(self):
+        with self.lock:
+            self._push_pending(force=True)
+    
+    # Bloqueia ate todo o buffer de envio ser transmitido e confirmado; False se a conexao
+    # deixou de enviar ou o timeout expirou antes
+    def drain(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.window_cond:
+            self._push_pending(force=True)
+            while (self.send_buffer or self.unacked) and self._can_send():
+                wait = self.timeout_interval
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return False
+                self.window_cond.wait(wait)
+            return not self.send_buffer and not self.unacked
+    
+    # Liga/desliga o Nagle em conexao aberta; ao ligar o nodelay a sobra retida sai na hora
+    def set_nodelay(self, enabled):
+        with self.lock:
+            self.nodelay = enabled
+            self._push_pending()
+    
+    # Motor de envio: transmite do buffer o que a janela permite (chamado com self.lock adquirido).
+    # force ignora o Nagle (flush/drain)
+    def _push_pending(self, force=False):
+        if not self.send_buffer or not self._can_send():
+            return
+        with memoryview(self.send_buffer) as view:
+            sent = self._transmit_window(view, 0, nagle=not (self.nodelay or force))
+        del self.send_buffer[:sent]
+    
+    # Transmite de view[offset:] o que a janela permite; retorna o novo offset (chamado com self.lock adquirido).
+    # nagle: com dados em transito, uma sobra menor que o MSS espera o ACK para juntar-se a novas escritas
+    def _transmit_window(self, view, offset, nagle=False):
+        while offset < len(view):
+            chunk_size = min(self.MSS, len(view) - offset)
+            if nagle and chunk_size < self.MSS and self.unacked:
+                break
+            if not self.unacked:
+                # Nada em transito: envia o que couber em rwnd
+                chunk_size = min(chunk_size, self.rwnd)
+                if chunk_size == 0:
+                    # Janela zero: o persist timer sonda o peer ate a janela abrir
+                    self._start_persist_timer()
+                    break
+            elif self._bytes_in_flight() + chunk_size > self._send_window():
+                break
+            offset += chunk_size
+            remaining = len(view) - offset
+            # PSH quando o buffer esvazia ou a sobra fica retida pelo Nagle: o emissor passa a
+            # depender do ACK, que o receptor nao atrasa
+            push = remaining == 0 or (nagle and remaining < self.MSS)
+            self._transmit(bytes(view[offset - chunk_size:offset]), push=push)
+        return offset
+    
+    def _can_send(self):
+        return self.running and self.state in (self.ESTABLISHED, self.CLOSE_WAIT)
+    
+    def _bytes_in_flight(self):
+        return self.seq_num - self.last_byte_acked
+    
+    def _send_window(self):
+        return min(self.cwnd, self.rwnd)
+    
+    # Transmite um novo segmento de dados (chamado com self.lock adquirido)
+    def _transmit(self, chunk, push=False):
+        segment = TCPSegment(
+            self.src_port,
+            self.dst_addr[1],
+            self.seq_num,
+            self.ack_num,
+            TCPSegment.FLAG_ACK | TCPSegment.FLAG_PSH if push else TCPSegment.FLAG_ACK,
+            self._advertised_window(),
+            chunk
+        )
+        self._send_segment(segment, self.dst_addr)
+        self.send_times[segment.seq_num] = time.monotonic()
+        self.segments_sent += 1
+        self.unacked.append(segment)
+        
+        self.seq_num += len(chunk)
+        self.last_byte_sent = self.seq_num
+        
+        if self.persist_timer:
+            self.persist_timer.cancel()
+            self.persist_timer = None
+        if self.timer is None:
+            self._start_data_timer()
+    
+    # Persist timer (chamado com self.lock adquirido): RTO com backoff exponencial ate MAX_TIMEOUT
+    def _start_persist_timer(self):
+        if self.persist_timer:
+            return
+        interval = min(self.timeout_interval * 2 ** self.persist_backoff, self.MAX_TIMEOUT)
+        self.persist_timer = self._schedule(interval, self._send_window_probe)
+    
+    # Sonda de janela zero: seq ja confirmado e sem dados, o peer responde com ACK e a janela atual
+    def _send_window_probe(self, timer):
+        with self.lock:
+            if self.persist_timer is not timer:
+                return
+            self.persist_timer = None
+            if self.rwnd > 0 or self.unacked or not self._can_send():
+                return
+            probe = TCPSegment(
                 self.src_port,
                 self.dst_addr[1],
-                self.seq_num,
+                self.seq_num - 1,
                 self.ack_num,
                 TCPSegment.FLAG_ACK,
-                self.BUFFER_SIZE,
-                chunk
+                self._advertised_window()
             )
-            
-            # Limpar evento de ACK antes de enviar
-            self.ack_received_event.clear()
-            
-            with self.lock:
-                self._send_segment(segment, self.dst_addr)
-                self.pending_segment = segment
-                
-                # Configurar timer de retransmissão
-                if self.timer:
-                    self.timer.cancel()
-                self.timer = threading.Timer(self.timeout_interval, self._retransmit_data)
-                self.timer.daemon = True
-                self.timer.start()
-            
-            self.seq_num += len(chunk)
-            offset += chunk_size
-            
-            # Aguardar ACK antes de enviar próximo segmento (com timeout)
-            self.ack_received_event.wait(timeout=self.timeout_interval * 10)
-        
-        return total_sent
+            self._send_segment(probe)
+            self.window_probes += 1
+            self.persist_backoff += 1
+            self.logger.log_event(f"Janela zero - sonda {self.window_probes}")
+            self._start_persist_timer()
     
-    # Metodo para receber dados
+    def get_statistics(self):
+        with self.lock:
+            return {
+                'segments_sent': self.segments_sent,
+                'retransmissions': self.retransmissions,
+                'bytes_in_flight': self._bytes_in_flight(),
+                'cwnd': self.cwnd,
+                'ssthresh': self.congestion.ssthresh,
+                'congestion_control': self.congestion.name,
+                'fast_retransmissions': self.fast_retransmissions,
+                'rwnd': self.rwnd,
+                'advertised_window': self._advertised_window(),
+                'window_probes': self.window_probes,
+                'window_updates': self.window_updates,
+                'acks_sent': self.acks_sent,
+                'delayed_acks': self.delayed_acks,
+                'piggybacked_acks': self.piggybacked_acks,
+                'send_buffered': len(self.send_buffer),
+                'recv_buffered': len(self.recv_ring),
+                'out_of_order_buffered': sum(len(data) for data in self.out_of_order_buffer.values()),
+                'timeout_interval': self.timeout_interval,
+                'estimated_rtt': self.estimated_rtt,
+                'dev_rtt': self.dev_rtt,
+                'rtt_samples': self.rtt_samples,
+                'syn_queue': len(self.syn_queue),
+                'accept_queue': len(self.accept_queue),
+                'syn_drops': self.syn_drops,
+                'syn_duplicates': self.syn_duplicates,
+                'accept_overflows': self.accept_overflows,
+                'syn_cookies_sent': self.syn_cookies_sent,
+                'syn_ack_retransmissions': self.syn_ack_retransmissions
+            }
+    
+    # Metodo para receber dados (ate buffer_size bytes, uma unica copia a partir do ring)
     def recv(self, buffer_size=4096, timeout=None):
-        if self.state not in [self.ESTABLISHED, self.CLOSE_WAIT]:
-            return b''
-        start_time = time.time()
-        
-        while True:
-            with self.lock:
-                if len(self.recv_buffer) > 0:
-                    result = b''
-                    bytes_read = 0
-                    
-                    while len(self.recv_buffer) > 0 and bytes_read < buffer_size:
-                        chunk = self.recv_buffer.popleft()
-                        if bytes_read + len(chunk) <= buffer_size:
-                            result += chunk
-                            bytes_read += len(chunk)
-                        else:
-                            remaining = buffer_size - bytes_read
-                            result += chunk[:remaining]
-                            self.recv_buffer.appendleft(chunk[remaining:])
-                            break
-                    
-                    if len(self.recv_buffer) == 0:
-                        self.data_available_event.clear()
-                    
-                    return result
-            
-            if self.state == self.CLOSE_WAIT:
+        with self.lock:
+            if not self._wait_readable(1, timeout):
                 return b''
-            
-            if timeout is not None:
-                elapsed = time.time() - start_time
-                if elapsed >= timeout:
-                    return b''
-                remaining_timeout = timeout - elapsed
+            data = self.recv_ring.read(buffer_size)
+            self._maybe_send_window_update()
+            return data
+    
+    # Metodo para receber dados direto em um buffer gravavel (bytearray, memoryview...); retorna bytes lidos
+    def recv_into(self, buffer, nbytes=0, timeout=None):
+        view = memoryview(buffer)
+        if nbytes:
+            view = view[:nbytes]
+        with self.lock:
+            if not self._wait_readable(1, timeout):
+                return 0
+            count = self.recv_ring.read_into(view)
+            self._maybe_send_window_update()
+            return count
+    
+    # Metodo para receber ate n bytes como memoryview do ring, sem copia.
+    # A view fica reservada ate a proxima chamada de recv*/readexactly ou release_view()
+    def recv_view(self, n=65536, timeout=None):
+        with self.lock:
+            if not self._wait_readable(1, timeout):
+                return memoryview(b'')
+            # A view anterior foi liberada em _wait_readable
+            self._maybe_send_window_update()
+            view = self.recv_ring.peek(n)
+            self.recv_reserved = len(view)
+            return view
+    
+    # Metodo para devolver ao ring a view entregue por recv_view
+    def release_view(self):
+        with self.lock:
+            self._release_view()
+            self._maybe_send_window_update()
+    
+    # Metodo para receber exatamente n bytes; IncompleteReadError se a conexao fechar ou o timeout vencer
+    def readexactly(self, n, timeout=None):
+        with self.lock:
+            # Com os n bytes ja no ring basta uma copia. Pedidos que o ring nao alcanca (a janela
+            # fecha com menos de um MSS livre) sao lidos em partes
+            if n <= self.recv_ring.capacity - self.MSS:
+                if self._wait_readable(n, timeout):
+                    data = self.recv_ring.read(n)
+                    self._maybe_send_window_update()
+                    return data
+                raise IncompleteReadError(self.recv_ring.read(n), n)
+        result = bytearray(n)
+        view = memoryview(result)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        received = 0
+        while received < n:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            count = self.recv_into(view[received:], timeout=remaining)
+            if not count:
+                raise IncompleteReadError(bytes(result[:received]), n)
+            received += count
+        return bytes(result)
+    
+    def _release_view(self):
+        if self.recv_reserved:
+            self.recv_ring.consume(self.recv_reserved)
+            self.recv_reserved = 0
+    
+    # Aguarda ate minimum bytes legiveis; False se a conexao deixar ESTABLISHED antes ou o timeout vencer
+    # (chamado com self.lock adquirido; libera a view pendente de recv_view)
+    def _wait_readable(self, minimum, timeout):
+        self._release_view()
+        if self.state not in (self.ESTABLISHED, self.CLOSE_WAIT):
+            return False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.recv_ring) < minimum:
+            if self.state != self.ESTABLISHED:
+                return False
+            if deadline is None:
+                self.recv_cond.wait()
             else:
-                remaining_timeout = 0.1
-            
-            self.data_available_event.wait(timeout=remaining_timeout)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.recv_cond.wait(remaining)
+        return True
     
     # Fecha e libera recursos
     def close(self):
@@ -580,15 +1308,22 @@ class SimpleTCPSocket:
         self.logger.log_event("Iniciando fechamento da conexão")
         
         if self.state == self.LISTEN:
-            self.state = self.CLOSED
-            self.running = False
-            
-            for conn_socket in list(self.established_connections.values()):
+            # Conexoes fecham antes: a troca de FIN depende da thread de recepcao do listener
+            with self.lock:
+                open_connections = list(self.connections.values())
+            for conn_socket in open_connections:
                 try:
                     conn_socket.close()
                 except:
                     pass
-            self.established_connections.clear()
+            
+            with self.lock:
+                self.state = self.CLOSED
+                self.running = False
+                self.connections.clear()
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
             
             if self.recv_thread and self.recv_thread.is_alive():
                 self.recv_thread.join(timeout=2.0)
@@ -599,43 +1334,19 @@ class SimpleTCPSocket:
                 pass
             return
         
-        if self.state == self.ESTABLISHED:
+        if self.state in (self.SYN_SENT, self.SYN_RECEIVED):
+            # Handshake incompleto (ex.: conexao nunca aceita): nao ha FIN a trocar
             with self.lock:
-                fin = TCPSegment(
-                    self.src_port,
-                    self.dst_addr[1],
-                    self.seq_num,
-                    self.ack_num,
-                    TCPSegment.FLAG_FIN | TCPSegment.FLAG_ACK,
-                    self.BUFFER_SIZE
-                )
-                
-                self._send_segment(fin)
-                self.seq_num += 1
-                
-                self.state = self.FIN_WAIT_1
-                
-                self.pending_segment = fin
-                self._set_retransmission_timer()
+                self.state = self.CLOSED
+                self.close_event.set()
         
-        elif self.state == self.CLOSE_WAIT:
+        elif self.state in (self.ESTABLISHED, self.CLOSE_WAIT):
+            # FIN so depois de todos os dados confirmados (o FIN nao carrega dados pendentes)
+            if not self.drain(timeout=10.0):
+                self.logger.log_event(f"Warning: {len(self.send_buffer)} bytes não enviados antes do FIN")
             with self.lock:
-                fin = TCPSegment(
-                    self.src_port,
-                    self.dst_addr[1],
-                    self.seq_num,
-                    self.ack_num,
-                    TCPSegment.FLAG_FIN | TCPSegment.FLAG_ACK,
-                    self.BUFFER_SIZE
-                )
-                
-                self._send_segment(fin)
-                self.seq_num += 1
-                
-                self.state = self.LAST_ACK
-                
-                self.pending_segment = fin
-                self._set_retransmission_timer()
+                if self.state in (self.ESTABLISHED, self.CLOSE_WAIT):
+                    self._send_fin()
         
         if not self.close_event.wait(timeout=10.0):
             self.logger.log_event("Warning: close timeout, forçando fechamento")
@@ -645,6 +1356,12 @@ class SimpleTCPSocket:
         if self.timer:
             self.timer.cancel()
             self.timer = None
+        if self.persist_timer:
+            self.persist_timer.cancel()
+            self.persist_timer = None
+        if self.ack_timer:
+            self.ack_timer.cancel()
+            self.ack_timer = None
         
         if self.recv_thread and self.recv_thread.is_alive():
             for attempt in range(5):
@@ -659,40 +1376,100 @@ class SimpleTCPSocket:
                 self.udp_socket.close()
             except:
                 pass
+        self._leave_listener()
         
         self.connection_event.clear()
-        self.data_available_event.clear()
         self.close_event.clear()
         
         self.logger.log_event("Conexão fechada")
     
+    # Agenda callback(timer) apos delay segundos na roda compartilhada e retorna o timer (com
+    # cancel()); o callback compara o timer recebido com o atual para ignorar disparos obsoletos
+    def _schedule(self, delay, callback):
+        wheel = _shared_timer_wheel()
+        timer = ScheduledTimer(wheel, callback, self)
+        wheel.arm(timer, delay)
+        return timer
+    
+    # Envia o FIN: ESTABLISHED -> FIN_WAIT_1 (ativo) ou CLOSE_WAIT -> LAST_ACK (passivo)
+    # (chamado com self.lock adquirido)
+    def _send_fin(self):
+        if self.state == self.CLOSE_WAIT:
+            # close_event foi sinalizado pelo FIN do peer: agora aguarda o ACK do nosso FIN
+            self.close_event.clear()
+        fin = TCPSegment(
+            self.src_port,
+            self.dst_addr[1],
+            self.seq_num,
+            self.ack_num,
+            TCPSegment.FLAG_FIN | TCPSegment.FLAG_ACK,
+            self._advertised_window()
+        )
+        
+        self._send_segment(fin)
+        self.seq_num += 1
+        
+        if self.state == self.ESTABLISHED:
+            self.state = self.FIN_WAIT_1
+            self.recv_cond.notify_all()
+        else:
+            self.state = self.LAST_ACK
+        
+        self.pending_segment = fin
+        self._set_retransmission_timer()
+    
     def _set_retransmission_timer(self):
         if self.timer:
             self.timer.cancel()
-        def retransmit():
+        def retransmit(timer):
             with self.lock:
+                if self.timer is not timer:
+                    return
                 if self.pending_segment and self.state not in [self.CLOSED]:
                     self.logger.log_event("Timeout - retransmitindo segmento")
                     self._send_segment(self.pending_segment)
+                    self.handshake_sent_at = None
                     self._set_retransmission_timer()
         
-        self.timer = threading.Timer(self.timeout_interval, retransmit)
-        self.timer.daemon = True
-        self.timer.start()
+        self.timer = self._schedule(self.timeout_interval, retransmit)
+    
+    # Timer unico de retransmissao para o segmento mais antigo nao confirmado (chamado com self.lock adquirido)
+    def _start_data_timer(self):
+        if self.timer:
+            self.timer.cancel()
+        self.timer = self._schedule(self.timeout_interval, self._retransmit_data)
     
-    def _retransmit_data(self):
+    def _retransmit_data(self, timer):
         with self.lock:
-            if self.pending_segment and self.state == self.ESTABLISHED:
-                self.logger.log_event("Timeout - retransmitindo dados")
-                self._send_segment(self.pending_segment, self.dst_addr)
-                if self.timer:
-                    self.timer.cancel()
-                self.timer = threading.Timer(self.timeout_interval, self._retransmit_data)
-                self.timer.daemon = True
-                self.timer.start()
+            # Timer substituido/cancelado enquanto aguardava o lock
+            if self.timer is not timer:
+                return
+            if self.unacked and self.state in (self.ESTABLISHED, self.CLOSE_WAIT):
+                self.logger.log_event(f"Timeout - retransmitindo dados seq={self.unacked[0].seq_num}")
+                self.congestion.on_timeout(self._bytes_in_flight(), time.monotonic())
+                self._record_cwnd()
+                self.dup_acks = 0
+                self.rto_recover = self.seq_num
+                # Backoff exponencial (Karn): o RTO so e recalculado com a proxima amostra valida
+                self.timeout_interval = min(self.timeout_interval * 2, self.MAX_TIMEOUT)
+                self._retransmit_head()
+            else:
+                self.timer = None
+    
+    # Metodo para obter a evolucao da janela: lista de (segundos desde a criacao, cwnd em bytes)
+    def get_cwnd_history(self):
+        with self.lock:
+            return list(self.cwnd_history)
+    
+    # A coleta roda em qualquer thread (ate num timer com o lock de outro socket): sem o
+    # four-way close, que bloquearia ate 10s; so cancela os timers e fecha o socket UDP proprio
     def __del__(self):
         try:
-            if self.state != self.CLOSED:
-                self.close()
+            self.running = False
+            for timer in (self.timer, self.persist_timer, self.ack_timer):
+                if timer:
+                    timer.cancel()
+            if not self.shared_udp_socket:
+                self.udp_socket.close()
         except:
             pass
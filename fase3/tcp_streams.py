@@ -0,0 +1,408 @@
+"""
+Streams asyncio - TCP Simplificado
+open_simple_connection / start_simple_server sobre um DatagramProtocol, sem threads
+"""
+
+import asyncio
+import socket
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.tcp_segment import TCPSegment
+from fase3.tcp_socket import SimpleTCPSocket
+
+
+# Buffer de recepcao do socket do servidor: o DatagramTransport le um datagrama por volta do
+# loop e todas as conexoes chegam pelo mesmo socket (rajadas de SYN/dados nao transbordam)
+SERVER_RCVBUF = 2 ** 22
+
+
+# Socket UDP visto pela maquina de estados: sendto/getsockname/close sobre o DatagramTransport
+class _DatagramSocket:
+    # Construtor - inicializa o objeto (transport preenchido em connection_made)
+    def __init__(self):
+        self.transport = None
+
+    def sendto(self, data, addr):
+        self.transport.sendto(data, addr)
+
+    def getsockname(self):
+        return self.transport.get_extra_info('sockname')
+
+    # Fecha e libera recursos
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+
+# Substitui threading.Condition no loop: notify_all() chama o callback na hora
+class _LoopNotifier:
+    # Construtor - inicializa o objeto
+    def __init__(self, callback):
+        self.callback = callback
+
+    def notify_all(self):
+        self.callback()
+
+
+# Transport minimo para StreamReader.set_transport: pausa/retoma a copia do ring para o reader
+class _ReaderFlowControl:
+    # Construtor - inicializa o objeto
+    def __init__(self, conn):
+        self.conn = conn
+
+    def pause_reading(self):
+        self.conn.reader_paused = True
+
+    def resume_reading(self):
+        self.conn._resume_reader()
+
+
+# Implementacao da classe SimpleTCPProtocol:
+class SimpleTCPProtocol(asyncio.DatagramProtocol):
+    # Construtor - inicializa o objeto (endpoint: conexao cliente ou listener)
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def connection_made(self, transport):
+        self.endpoint.udp_socket.transport = transport
+
+    def datagram_received(self, data, addr):
+        segment, is_valid = TCPSegment.from_bytes(data)
+        if not is_valid:
+            self.endpoint.logger.log_event(f"Segmento corrompido recebido de {addr}")
+            return
+        self.endpoint.logger.log_receive(f"{segment} <- {addr[1]}")
+        self.endpoint._process_segment(segment, addr)
+
+    def error_received(self, exc):
+        self.endpoint.logger.log_event(f"Erro no socket UDP: {exc}")
+
+
+# Implementacao da classe AsyncTCPConnection:
+# Mesma maquina de estados do SimpleTCPSocket; timers viram call_later e as condicoes viram callbacks
+class AsyncTCPConnection(SimpleTCPSocket):
+    # Limite do StreamReader: acima de 2x a copia do ring para e a janela anunciada fecha
+    READER_LIMIT = 2 ** 16
+    # Limites do buffer de escrita (como FlowControlMixin): drain() bloqueia acima do high-water
+    # mark e libera quando o buffer cai ao low-water mark
+    WRITE_HIGH_WATER = 2 ** 16
+    CLOSE_TIMEOUT = 10.0
+
+    # Construtor - inicializa o objeto (mesma assinatura: _handle_listen cria conexoes com type(self))
+    def __init__(self, src_port=0, channel=None, verbose=False,
+                 congestion_control='newreno', initial_window=SimpleTCPSocket.INITIAL_WINDOW, udp_socket=None,
+                 delayed_ack_timeout=SimpleTCPSocket.DELAYED_ACK_TIMEOUT,
+                 send_buffer_size=SimpleTCPSocket.SEND_BUFFER_SIZE, nodelay=False):
+        super().__init__(src_port, channel, verbose, congestion_control, initial_window, udp_socket=udp_socket,
+                         delayed_ack_timeout=delayed_ack_timeout, send_buffer_size=send_buffer_size,
+                         nodelay=nodelay)
+        self.loop = asyncio.get_running_loop()
+        self.connection_event = asyncio.Event()
+        self.close_event = asyncio.Event()
+        self.accept_event = asyncio.Event()
+        self.recv_cond = _LoopNotifier(self._feed_reader)
+        self.window_cond = _LoopNotifier(self._schedule_pump)
+
+        self.reader = asyncio.StreamReader(limit=self.READER_LIMIT)
+        self.reader.set_transport(_ReaderFlowControl(self))
+        self.reader_paused = False
+        self.eof_fed = False
+
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.set_write_buffer_limits()
+        self.pump_scheduled = False
+        self.closing = False
+        # write_eof(): FIN assim que o buffer esvaziar, com a leitura ainda aberta
+        self.eof_written = False
+        self.close_task = None
+
+        # Listener: para de aceitar SYNs em SimpleServer.close(); tabela vazia sinalizada
+        self.accepting = True
+        self.connections_changed = asyncio.Event()
+
+    def _schedule(self, delay, callback):
+        handle = self.loop.call_later(delay, lambda: callback(handle))
+        return handle
+
+    def _handle_listen(self, segment, addr):
+        if self.accepting:
+            super()._handle_listen(segment, addr)
+
+    def _remove_connection(self, conn_socket):
+        super()._remove_connection(conn_socket)
+        self.connections_changed.set()
+
+    # Copia o ring para o StreamReader enquanto ele nao pausar; EOF depois do FIN do peer
+    def _feed_reader(self):
+        while len(self.recv_ring) and not self.reader_paused:
+            self.reader.feed_data(self.recv_ring.read(len(self.recv_ring)))
+        if not len(self.recv_ring) and self.state in (self.CLOSE_WAIT, self.LAST_ACK, self.CLOSING,
+                                                     self.TIME_WAIT, self.CLOSED):
+            self._feed_eof()
+
+    def _feed_eof(self):
+        if not self.eof_fed:
+            self.eof_fed = True
+            self.reader.feed_eof()
+
+    # A aplicacao leu do StreamReader: esvazia o ring e anuncia a janela reaberta. Na proxima
+    # volta do loop, como um transport real: _wait_for_data retoma antes de criar o waiter
+    def _resume_reader(self):
+        self.reader_paused = False
+        self.loop.call_soon(self._refill_reader)
+
+    def _refill_reader(self):
+        with self.lock:
+            self._feed_reader()
+            self._maybe_send_window_update()
+
+    # Metodo para definir os limites do buffer de escrita (mesmas regras de asyncio)
+    def set_write_buffer_limits(self, high=None, low=None):
+        if high is None:
+            high = self.WRITE_HIGH_WATER if low is None else 4 * low
+        if low is None:
+            low = high // 4
+        if not high >= low >= 0:
+            raise ValueError(f"high ({high!r}) deve ser >= low ({low!r}) e ambos >= 0")
+        self.write_high_water = high
+        self.write_low_water = low
+
+    def get_write_buffer_limits(self):
+        return self.write_low_water, self.write_high_water
+
+    def get_write_buffer_size(self):
+        return len(self.send_buffer)
+
+    def _write(self, data):
+        if self.eof_written:
+            raise RuntimeError("write() depois de write_eof()")
+        if self.closing or not self._can_send():
+            raise ConnectionResetError(f"Conexão não aceita escrita (estado={self.state})")
+        self.send_buffer += data
+        if len(self.send_buffer) > self.write_high_water:
+            self.drained.clear()
+        self._pump_writes()
+
+    # Meio-fechamento: o FIN sai pelo mesmo caminho do close(), depois dos dados pendentes
+    def _write_eof(self):
+        if self.eof_written or self.closing:
+            return
+        self.eof_written = True
+        self._pump_writes()
+
+    # ACK ou janela nova: transmite mais do buffer de escrita na proxima volta do loop
+    def _schedule_pump(self):
+        if not self.pump_scheduled:
+            self.pump_scheduled = True
+            self.loop.call_soon(self._pump_writes)
+
+    def _pump_writes(self):
+        self.pump_scheduled = False
+        with self.lock:
+            can_send = self._can_send()
+            finishing = self.closing or self.eof_written
+            # Fechando: a sobra retida pelo Nagle sai sem esperar novas escritas
+            self._push_pending(force=finishing)
+            if len(self.send_buffer) <= self.write_low_water or not can_send:
+                self.drained.set()
+            # FIN so depois de todos os dados confirmados (o FIN nao carrega dados pendentes)
+            if finishing and can_send and not self.send_buffer and not self.unacked:
+                self._send_fin()
+
+    async def _drain(self):
+        await self.drained.wait()
+        if self.send_buffer and not self._can_send():
+            raise ConnectionResetError(f"Conexão encerrada com {len(self.send_buffer)} bytes pendentes")
+
+    # Fecha e libera recursos (nao bloqueia: o fechamento roda numa task; ver wait_closed)
+    def close(self):
+        if self.close_task is None:
+            self.closing = True
+            self.close_task = self.loop.create_task(self._close_connection())
+        return self.close_task
+
+    async def _close_connection(self):
+        if self.state in (self.SYN_SENT, self.SYN_RECEIVED):
+            with self.lock:
+                self.state = self.CLOSED
+        else:
+            # Todo o buffer sai antes do FIN: drained ja libera no low-water mark
+            self._pump_writes()
+            while self.send_buffer and self._can_send():
+                self.drained.clear()
+                await self.drained.wait()
+                self._pump_writes()
+            try:
+                await asyncio.wait_for(self._wait_state_closed(), self.CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.logger.log_event("Warning: close timeout, forçando fechamento")
+        self.running = False
+        for timer in (self.timer, self.persist_timer, self.ack_timer):
+            if timer:
+                timer.cancel()
+        self.timer = self.persist_timer = self.ack_timer = None
+        self._feed_eof()
+        self._leave_listener()
+        if not self.shared_udp_socket:
+            self.udp_socket.close()
+        self.logger.log_event("Conexão fechada")
+
+    async def _wait_state_closed(self):
+        while self.state != self.CLOSED:
+            self.close_event.clear()
+            await self.close_event.wait()
+
+    # Fechamento so por close()/wait_closed(): na coleta o loop pode nem existir mais
+    def __del__(self):
+        pass
+
+
+# Implementacao da classe SimpleStreamWriter:
+# Interface de asyncio.StreamWriter sobre uma AsyncTCPConnection
+class SimpleStreamWriter:
+    # Construtor - inicializa o objeto
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, data):
+        self.conn._write(data)
+
+    def writelines(self, data):
+        for chunk in data:
+            self.conn._write(chunk)
+
+    def can_write_eof(self):
+        return True
+
+    # Envia o FIN depois dos dados pendentes; a leitura continua ate o EOF do peer
+    def write_eof(self):
+        self.conn._write_eof()
+
+    def get_extra_info(self, name, default=None):
+        if name == 'peername':
+            return self.conn.dst_addr
+        if name == 'sockname':
+            return self.conn.udp_socket.getsockname()
+        if name == 'socket':
+            return self.conn
+        return default
+
+    def is_closing(self):
+        return self.conn.closing
+
+    # Fecha e libera recursos (dados pendentes sao enviados antes do FIN)
+    def close(self):
+        self.conn.close()
+
+    async def wait_closed(self):
+        await self.conn.close()
+
+    async def drain(self):
+        await self.conn._drain()
+
+    def __repr__(self):
+        return f"<SimpleStreamWriter {self.conn.dst_addr} {self.conn.state}>"
+
+
+# Implementacao da classe SimpleServer:
+# Equivalente a asyncio.Server: um listener (um DatagramTransport) e uma task por conexao aceita
+class SimpleServer:
+    # Construtor - inicializa o objeto
+    def __init__(self, listener, client_connected_cb):
+        self.listener = listener
+        self.client_connected_cb = client_connected_cb
+        self.port = listener.src_port
+        self.connection_tasks = set()
+        self.accept_task = listener.loop.create_task(self._accept_loop())
+
+    async def _accept_loop(self):
+        listener = self.listener
+        while True:
+            await listener.accept_event.wait()
+            listener.accept_event.clear()
+            while listener.accept_queue:
+                with listener.lock:
+                    conn, _ = listener._pop_accepted()
+                task = listener.loop.create_task(self._serve(conn))
+                self.connection_tasks.add(task)
+                task.add_done_callback(self.connection_tasks.discard)
+
+    async def _serve(self, conn):
+        result = self.client_connected_cb(conn.reader, SimpleStreamWriter(conn))
+        if asyncio.iscoroutine(result):
+            await result
+
+    def is_serving(self):
+        return self.listener.accepting
+
+    # Para de aceitar conexoes; as existentes continuam (o transport e compartilhado com elas)
+    def close(self):
+        self.listener.accepting = False
+        self.accept_task.cancel()
+
+    # Aguarda o fim das conexoes existentes e fecha o socket UDP do listener
+    async def wait_closed(self):
+        listener = self.listener
+        while listener.connections:
+            listener.connections_changed.clear()
+            await listener.connections_changed.wait()
+        listener.state = listener.CLOSED
+        listener.running = False
+        if listener.timer:
+            listener.timer.cancel()
+            listener.timer = None
+        listener.udp_socket.close()
+
+    async def serve_forever(self):
+        try:
+            await self.accept_task
+        except asyncio.CancelledError:
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+        await self.wait_closed()
+
+
+async def _bind(endpoint, host, port):
+    loop = asyncio.get_running_loop()
+    await loop.create_datagram_endpoint(lambda: SimpleTCPProtocol(endpoint), local_addr=(host, port))
+    endpoint.src_port = endpoint.udp_socket.getsockname()[1]
+
+
+# Metodo para abrir uma conexao; retorna (StreamReader, SimpleStreamWriter) como asyncio.open_connection
+async def open_simple_connection(host='127.0.0.1', port=None, *, timeout=10.0, **kwargs):
+    conn = AsyncTCPConnection(udp_socket=_DatagramSocket(), **kwargs)
+    # O cliente e dono do proprio transport (fechado junto com a conexao). Todas as interfaces:
+    # preso a 127.0.0.1, o socket so alcancaria peers no loopback
+    conn.shared_udp_socket = False
+    await _bind(conn, '0.0.0.0', 0)
+    conn.dst_addr = (host, port)
+    conn.running = True
+    conn.logger.log_event(f"Iniciando conexão com {host}:{port}")
+    with conn.lock:
+        conn._send_syn()
+    try:
+        await asyncio.wait_for(conn.connection_event.wait(), timeout)
+    except asyncio.TimeoutError:
+        await conn.close()
+        raise ConnectionError(f"Timeout na conexão com {host}:{port}") from None
+    return conn.reader, SimpleStreamWriter(conn)
+
+
+# Metodo para iniciar um servidor; client_connected_cb(reader, writer) pode ser corrotina
+async def start_simple_server(client_connected_cb, host='127.0.0.1', port=0, *, backlog=100,
+                              syn_cookies=False, **kwargs):
+    listener = AsyncTCPConnection(udp_socket=_DatagramSocket(), **kwargs)
+    await _bind(listener, host, port)
+    sock = listener.udp_socket.transport.get_extra_info('socket')
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SERVER_RCVBUF)
+    listener._prepare_listen(backlog, syn_cookies)
+    return SimpleServer(listener, client_connected_cb)
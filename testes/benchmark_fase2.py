@@ -0,0 +1,602 @@
+"""
+Benchmarks da Fase 2 - Protocolos de Pipelining
+Mede desempenho de GBN e SR (não faz parte da suíte de testes)
+
+Uso:
+    python testes/benchmark_fase2.py            # executa todos
+    python testes/benchmark_fase2.py admissao   # executa apenas um
+"""
+
+import sys
+import os
+import asyncio
+import io
+import random
+import socket
+import statistics
+import struct
+import hashlib
+import tracemalloc
+import threading
+import time
+from contextlib import redirect_stdout
+
+# Adiciona o diretório pai ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fase2.gbn import GBNSender, GBNReceiver
+from fase2.sr import SRSender, SRReceiver
+from utils.simulator import UnreliableChannel
+from utils.packet_ring import PacketRing
+from utils.gbn_packet import GBNPacket
+from utils.buffer_pool import BufferPool, recv_view
+from utils.reorder_buffer import ReorderBuffer
+
+
+BASE_PORT = 9300
+
+
+def _silence(*endpoints):
+    for endpoint in endpoints:
+        endpoint.logger.verbose = False
+
+
+def _print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) + 2 for i, h in enumerate(headers)]
+    print("".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("-" * sum(widths))
+    for row in rows:
+        print("".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+# Canal com perdas e sem atraso: preserva a ordem FIFO do loopback
+# (os timers do UnreliableChannel reordenam pacotes, o que gera ACKs duplicados espurios)
+class LossyFifoChannel(UnreliableChannel):
+    def __init__(self, loss_rate):
+        super().__init__(loss_rate=loss_rate, corrupt_rate=0.0)
+
+    def send(self, packet, dest_socket, dest_addr):
+        self.packets_sent += 1
+        if random.random() < self.loss_rate:
+            self.packets_lost += 1
+            return
+        dest_socket.sendto(packet, dest_addr)
+
+
+# Emula a admissao antiga por polling (sleep de 10 ms) para comparacao
+class PollingGBNSender(GBNSender):
+    def _wait_for_window(self):
+        while not self._window_open():
+            if not self.running:
+                return False
+            self.lock.release()
+            try:
+                time.sleep(0.01)
+            finally:
+                self.lock.acquire()
+        return True
+
+
+def _run_gbn_transfer(port, sender_cls, window_size, num_packets, payload_size):
+    receiver = GBNReceiver(port, window_size=window_size, delivery_capacity=num_packets)
+    sender = sender_cls(('localhost', port), window_size=window_size, timeout=0.5)
+    _silence(sender, receiver)
+    sender.start()
+
+    payload = b'B' * payload_size
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(num_packets):
+        sender.send_data(payload)
+    sender.wait_for_completion(timeout=60)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    delivered = receiver.get_statistics()['data_delivered']
+    sender.close()
+    receiver.close()
+    return elapsed, cpu, delivered
+
+
+def benchmark_admissao():
+    """Admissão na janela GBN: Condition vs polling, loopback sem atraso"""
+    print("\n=== GBN: admissão na janela (loopback, atraso zero) ===")
+    num_packets = 2000
+    payload_size = 1024
+    rows = []
+    port = BASE_PORT
+    for window_size in (1, 4, 16, 64):
+        for label, cls in (("polling 10ms", PollingGBNSender), ("condition", GBNSender)):
+            elapsed, cpu, delivered = _run_gbn_transfer(port, cls, window_size, num_packets, payload_size)
+            port += 1
+            rows.append((window_size, label, f"{num_packets / elapsed:,.0f}",
+                         f"{num_packets * payload_size / elapsed / 1024:,.0f}",
+                         f"{cpu:.2f}", delivered))
+    _print_table(("Janela", "Admissão", "Pacotes/s", "KB/s", "CPU (s)", "Entregues"), rows)
+
+
+def benchmark_fast_retransmit():
+    """Fast retransmit GBN: latência de recuperação e goodput com 1% a 10% de perda"""
+    print("\n=== GBN: fast retransmit vs apenas timeout ===")
+    num_packets = 500
+    payload = b'R' * 512
+    rows = []
+    port = BASE_PORT + 20
+    for loss_rate in (0.01, 0.02, 0.05, 0.10):
+        for label, threshold in (("timeout", None), ("dupack=3", 3)):
+            channel = LossyFifoChannel(loss_rate)
+            receiver = GBNReceiver(port, window_size=16, delivery_capacity=num_packets)
+            sender = GBNSender(('localhost', port), window_size=16, timeout=0.3,
+                               channel=channel, dup_ack_threshold=threshold)
+            port += 1
+            _silence(sender, receiver)
+            with redirect_stdout(io.StringIO()):
+                sender.start()
+                start = time.perf_counter()
+                for _ in range(num_packets):
+                    sender.send_data(payload)
+                sender.wait_for_completion(timeout=120)
+                elapsed = time.perf_counter() - start
+                stats = sender.get_statistics()
+                sender.close()
+                time.sleep(0.05)
+                receiver.close()
+            rows.append((f"{loss_rate:.0%}", label, f"{elapsed:.2f}",
+                         f"{num_packets * len(payload) / elapsed / 1024:,.1f}",
+                         f"{stats['avg_recovery_time'] * 1000:.1f}",
+                         stats['timeouts'], stats['fast_retransmits'], stats['retransmissions']))
+    _print_table(("Perda", "Modo", "Tempo (s)", "Goodput KB/s", "Recup. média (ms)",
+                  "Timeouts", "Fast RTX", "Retransmissões"), rows)
+
+
+# Modelo da janela antiga: dict com insercao, remocao em loop e checagem de pertinencia
+def _dict_window_ops(window, total, payload):
+    sent = {}
+    base = next_seq = 0
+    while base < total:
+        while next_seq < base + window and next_seq < total:
+            sent[next_seq] = payload
+            next_seq += 1
+        old_base, base = base, base + 1
+        for seq in range(old_base, base):
+            if seq in sent:
+                del sent[seq]
+        if base % window == 0:
+            for seq in range(base, next_seq):
+                if seq in sent:
+                    _ = sent[seq]
+
+
+def _ring_window_ops(window, total, payload):
+    ring = PacketRing(window)
+    base = next_seq = 0
+    while base < total:
+        while next_seq < base + window and next_seq < total:
+            ring.put(next_seq, payload)
+            next_seq += 1
+        base += 1
+        if base % window == 0:
+            for _ in ring.range(base, next_seq):
+                pass
+
+
+def benchmark_ring_buffer():
+    """Janela de retransmissão GBN: dict vs ring buffer (janelas até 4096)"""
+    print("\n=== GBN: janela de retransmissão dict vs ring (microbenchmark) ===")
+    total = 200000
+    payload = b'P' * 64
+    rows = []
+    for window in (8, 64, 512, 4096):
+        start = time.perf_counter()
+        _dict_window_ops(window, total, payload)
+        t_dict = time.perf_counter() - start
+        start = time.perf_counter()
+        _ring_window_ops(window, total, payload)
+        t_ring = time.perf_counter() - start
+        rows.append((window, f"{t_dict * 1e9 / total:.0f}", f"{t_ring * 1e9 / total:.0f}",
+                     f"{t_dict / t_ring:.2f}x"))
+    _print_table(("Janela", "dict (ns/pacote)", "ring (ns/pacote)", "Ganho"), rows)
+
+    print("\n=== GBN: transferência em loopback com ring buffer ===")
+    num_packets = 20000
+    rows = []
+    port = BASE_PORT + 40
+    for window in (64, 256, 1024, 4096):
+        elapsed, cpu, delivered = _run_gbn_transfer(port, GBNSender, window, num_packets, 64)
+        port += 1
+        rows.append((window, f"{num_packets / elapsed:,.0f}", f"{cpu:.2f}", delivered))
+    _print_table(("Janela", "Pacotes/s", "CPU (s)", "Entregues"), rows)
+
+
+def benchmark_delayed_ack():
+    """ACKs atrasados no GBNReceiver: ACKs por pacote de dados e goodput do sender"""
+    print("\n=== GBN: ACKs atrasados e cumulativos ===")
+    num_packets = 20000
+    payload = b'D' * 512
+    rows = []
+    port = BASE_PORT + 60
+    for ack_every, ack_delay in ((1, 0.0), (2, 0.04), (4, 0.04), (8, 0.04)):
+        receiver = GBNReceiver(port, window_size=32, delivery_capacity=num_packets,
+                               ack_every=ack_every, ack_delay=ack_delay)
+        sender = GBNSender(('localhost', port), window_size=32, timeout=0.5)
+        port += 1
+        _silence(sender, receiver)
+        sender.start()
+        start = time.perf_counter()
+        for _ in range(num_packets):
+            sender.send_data(payload)
+        sender.wait_for_completion(timeout=120)
+        elapsed = time.perf_counter() - start
+        stats = receiver.get_statistics()
+        sender.close()
+        receiver.close()
+        rows.append((ack_every, f"{ack_delay * 1000:.0f}",
+                     f"{stats['acks_sent'] / max(1, stats['packets_received']):.3f}",
+                     f"{num_packets * len(payload) / elapsed / 1024:,.0f}"))
+    _print_table(("ACK a cada", "Atraso (ms)", "ACKs/pacote", "Goodput KB/s"), rows)
+
+
+def _sample_history(history, samples=12):
+    if len(history) <= samples:
+        return history
+    step = (len(history) - 1) / (samples - 1)
+    return [history[round(i * step)] for i in range(samples)]
+
+
+def benchmark_aimd():
+    """Janela AIMD vs janelas fixas em um gargalo de banda limitada com fila drop-tail"""
+    print("\n=== GBN: janela AIMD vs fixa (gargalo 256 KB/s, fila 16 KB) ===")
+    num_packets = 1500
+    payload = b'C' * 512
+    rows = []
+    histories = {}
+    port = BASE_PORT + 80
+    configs = (("fixa 4", 4, False), ("fixa 16", 16, False), ("fixa 64", 64, False),
+               ("AIMD <= 64", 64, True))
+    for label, window, aimd in configs:
+        # Apenas o sentido dos dados passa pelo gargalo; atraso fixo preserva a ordem
+        channel = UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.01, 0.01),
+                                    bandwidth=256 * 1024, queue_limit=16 * 1024)
+        receiver = GBNReceiver(port, window_size=window, delivery_capacity=num_packets)
+        sender = GBNSender(('localhost', port), window_size=window, timeout=0.3,
+                           channel=channel, congestion_control=aimd)
+        port += 1
+        _silence(sender, receiver)
+        with redirect_stdout(io.StringIO()):
+            sender.start()
+            start = time.perf_counter()
+            for _ in range(num_packets):
+                sender.send_data(payload)
+            sender.wait_for_completion(timeout=180)
+            elapsed = time.perf_counter() - start
+            stats = sender.get_statistics()
+            channel_stats = channel.get_statistics()
+            delivered = receiver.get_statistics()['data_delivered']
+            sender.close()
+            time.sleep(0.05)
+            receiver.close()
+        if aimd:
+            histories[label] = sender.get_cwnd_history()
+        rows.append((label, f"{elapsed:.2f}", f"{delivered * len(payload) / elapsed / 1024:,.1f}",
+                     stats['timeouts'], stats['retransmissions'],
+                     channel_stats['packets_dropped_queue'], delivered))
+    _print_table(("Janela", "Tempo (s)", "Goodput KB/s", "Timeouts", "Retransmissões",
+                  "Descartes fila", "Entregues"), rows)
+
+    # Evolucao amostrada da janela (get_cwnd_history() retorna a serie completa para graficos)
+    for label, history in histories.items():
+        print(f"\nEvolução de cwnd ({label}, {len(history)} amostras):")
+        _print_table(("t (s)", "cwnd"), [(f"{t:.3f}", f"{cwnd:.1f}") for t, cwnd in _sample_history(history)])
+
+
+# Emula o receive_data antigo: sleep de 100 ms checando a quantidade entregue
+def _polling_receive(receiver, expected_count, timeout):
+    start = time.time()
+    while len(receiver.delivery) < expected_count and time.time() - start < timeout:
+        time.sleep(0.1)
+    return receiver.get_data()
+
+
+def benchmark_latencia():
+    """Latência ponta a ponta de transferências curtas: polling vs Condition vs asyncio"""
+    print("\n=== GBN: latência de receive_data em transferências curtas ===")
+    trials = 30
+    rows = []
+    port = BASE_PORT + 100
+    modes = (
+        ("polling 100ms", lambda r, n: _polling_receive(r, n, 5)),
+        ("condition", lambda r, n: r.receive_data(n, timeout=5)),
+        ("asyncio", lambda r, n: asyncio.run(r.receive_data_async(n, timeout=5))),
+    )
+    for num_packets in (1, 5, 20):
+        for label, receive in modes:
+            receiver = GBNReceiver(port, window_size=8, ack_every=1)
+            sender = GBNSender(('localhost', port), window_size=8, timeout=0.5)
+            port += 1
+            _silence(sender, receiver)
+            sender.start()
+            payload = [b'L' * 256] * num_packets
+            latencies = []
+            for _ in range(trials):
+                start = time.perf_counter()
+                sender.send_data(payload)
+                received = receive(receiver, num_packets)
+                latencies.append(time.perf_counter() - start)
+                assert len(received) == num_packets
+                sender.wait_for_completion(timeout=5)
+            sender.close()
+            receiver.close()
+            latencies.sort()
+            rows.append((num_packets, label, f"{statistics.median(latencies) * 1000:.2f}",
+                         f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f}"))
+    _print_table(("Pacotes", "Recepção", "Mediana (ms)", "p95 (ms)"), rows)
+
+
+# Decodificador antigo: fatias bytes, concatenacao e checksum recalculado no construtor
+def _legacy_gbn_decode(packet_bytes):
+    header = packet_bytes[:GBNPacket.HEADER_SIZE]
+    packet_type, seq_num, checksum = struct.unpack(GBNPacket.HEADER_FORMAT, header)
+    data = packet_bytes[GBNPacket.HEADER_SIZE:]
+    is_valid = hashlib.md5(struct.pack('!BI', packet_type, seq_num) + data).digest()[:4] == checksum
+    packet = GBNPacket(packet_type, seq_num, data)
+    packet.checksum = checksum
+    return packet, is_valid
+
+
+def benchmark_buffer_pool():
+    """recvfrom + decodificador antigo vs recvfrom_into em slab + decodificador por memoryview"""
+    print("\n=== Recepção: alocação por pacote (tracemalloc) e custo de CPU ===")
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(('localhost', 0))
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    pool = BufferPool()
+    rows = []
+    for label, payload in (("ACK", b''), ("DATA 1 KB", b'P' * 1024)):
+        datagram = GBNPacket(GBNPacket.TYPE_DATA, 7, payload).to_bytes()
+        with pool.slab() as slab:
+            modes = (
+                ("recvfrom(2048)", lambda: _legacy_gbn_decode(rx.recvfrom(2048)[0])),
+                ("recvfrom(65535)", lambda: _legacy_gbn_decode(rx.recvfrom(65535)[0])),
+                ("pool + memoryview", lambda: GBNPacket.from_bytes(recv_view(rx, slab)[0])),
+            )
+            for mode, receive in modes:
+                count = 2000
+                peaks = []
+                tracemalloc.start()
+                for _ in range(200):
+                    tx.sendto(datagram, rx.getsockname())
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    receive()
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                tracemalloc.stop()
+                elapsed = 0.0
+                for _ in range(count):
+                    tx.sendto(datagram, rx.getsockname())
+                    start = time.perf_counter()
+                    receive()
+                    elapsed += time.perf_counter() - start
+                rows.append((label, mode, f"{statistics.median(peaks):,.0f}",
+                             f"{elapsed * 1e6 / count:.1f}"))
+    rx.close()
+    tx.close()
+    _print_table(("Pacote", "Recepção", "Pico B/pacote", "µs/pacote"), rows)
+
+
+# Emula os timers antigos do SR: um threading.Timer (uma thread) por pacote pendente
+class ThreadTimers:
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self.timers = {}
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    def arm(self, key, delay):
+        timer = threading.Timer(delay, self._fire, args=[key])
+        timer.daemon = True
+        with self.lock:
+            previous = self.timers.pop(key, None)
+            self.timers[key] = timer
+        if previous:
+            previous.cancel()
+        timer.start()
+
+    def cancel(self, key):
+        with self.lock:
+            timer = self.timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def _fire(self, key):
+        with self.lock:
+            self.timers.pop(key, None)
+        self.expirations += 1
+        self.on_expire([key])
+
+    def stop(self):
+        with self.lock:
+            timers, self.timers = list(self.timers.values()), {}
+        for timer in timers:
+            timer.cancel()
+
+
+class ThreadTimerSRSender(SRSender):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timer_wheel.stop()
+        self.timer_wheel = ThreadTimers(self._on_timeouts)
+
+
+def benchmark_timer_wheel():
+    """SR: threading.Timer por pacote vs timer wheel, com janelas de 8 a 1024 e 5% de perda"""
+    print("\n=== SR: timers por pacote vs timer wheel (5% de perda de dados) ===")
+    num_packets = 4000
+    payload = [b'T' * 512 for _ in range(num_packets)]
+    rows = []
+    for window_size in (8, 64, 256, 1024):
+        for label, sender_cls in (("threading.Timer", ThreadTimerSRSender), ("timer wheel", SRSender)):
+            port = BASE_PORT + 120 + len(rows)
+            random.seed(window_size)
+            receiver = SRReceiver(port, window_size=window_size)
+            sender = sender_cls(('localhost', port), window_size=window_size, timeout=0.2,
+                                channel=LossyFifoChannel(0.05))
+            _silence(sender, receiver)
+            received = []
+            recv_thread = threading.Thread(target=lambda: received.extend(receiver.receive_data(num_packets, timeout=120)))
+            recv_thread.start()
+            max_threads = threading.active_count()
+            def sample():
+                nonlocal max_threads
+                while recv_thread.is_alive():
+                    max_threads = max(max_threads, threading.active_count())
+                    time.sleep(0.005)
+            sampler = threading.Thread(target=sample)
+            sampler.start()
+
+            cpu_start = time.process_time()
+            start = time.perf_counter()
+            sender.send_data(payload)
+            recv_thread.join()
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            sampler.join()
+            assert len(received) == num_packets
+            rows.append((window_size, label, f"{cpu:.2f}", f"{elapsed:.2f}",
+                         f"{num_packets * 512 / elapsed / 1024:.0f}",
+                         sender.timer_wheel.expirations, max_threads))
+            sender.close()
+            receiver.close()
+    _print_table(("Janela", "Timers", "CPU (s)", "Tempo (s)", "Goodput (KB/s)", "Timeouts", "Threads máx"), rows)
+
+
+def benchmark_soak_sr(num_packets=1_000_000):
+    """SRSender.write() em fluxo: memória rastreada (tracemalloc) ao longo de 1M pacotes"""
+    print(f"\n=== SR em fluxo: {num_packets:,} pacotes, memória por fase ===")
+    port = BASE_PORT + 140
+    window_size = 64
+    receiver = SRReceiver(port, window_size=window_size)
+    sender = SRSender(('localhost', port), window_size=window_size, timeout=0.5, queue_capacity=256)
+    _silence(sender, receiver)
+    received = [0]
+    def consume():
+        while received[0] < num_packets:
+            count = len(receiver.receive_data(min(4096, num_packets - received[0]), timeout=10))
+            if not count:
+                break
+            received[0] += count
+    recv_thread = threading.Thread(target=consume)
+    recv_thread.start()
+
+    rows = []
+    phase = num_packets // 10
+    payload = b'M' * 256
+    tracemalloc.start()
+    start = time.perf_counter()
+    for written in range(phase, num_packets + 1, phase):
+        for _ in range(phase):
+            sender.write(payload)
+        sender.wait_for_completion()
+        while received[0] < written and recv_thread.is_alive():
+            time.sleep(0.01)
+        current, peak = tracemalloc.get_traced_memory()
+        rows.append((f"{written:,}", f"{time.perf_counter() - start:.1f}",
+                     f"{current / 1024:.0f}", f"{peak / 1024:.0f}"))
+    tracemalloc.stop()
+    recv_thread.join()
+    stats = sender.get_statistics()
+    sender.close()
+    receiver.close()
+    _print_table(("Pacotes", "Tempo (s)", "Memória atual (KB)", "Pico (KB)"), rows)
+    print(f"Recebidos: {received[0]:,}  retransmissões: {stats['retransmissions']}")
+
+
+# Ordem de chegada com muita reordenacao: em cada janela o pacote esperado chega por ultimo
+def _reorder_heavy_arrivals(window, total):
+    rng = random.Random(window)
+    order = []
+    for start in range(0, total, window):
+        block = list(range(start + 1, min(start + window, total)))
+        rng.shuffle(block)
+        order.extend(block)
+        order.append(start)
+    return order
+
+
+def _dict_reorder(window, arrivals, payload, keep):
+    buffer = {}
+    expected = 0
+    delivered = 0
+    for seq in arrivals:
+        if seq == expected:
+            delivered += 1
+            expected += 1
+            while expected in buffer:
+                del buffer[expected]
+                delivered += 1
+                expected += 1
+        elif expected < seq < expected + window and seq not in buffer:
+            buffer[seq] = keep(payload)
+    return delivered
+
+
+def _ring_reorder(window, arrivals, payload, keep, slot_size=None):
+    buffer = ReorderBuffer(window, slot_size)
+    expected = 0
+    delivered = 0
+    for seq in arrivals:
+        if seq == expected:
+            expected += 1
+            drained = len(buffer.drain(expected))
+            delivered += 1 + drained
+            expected += drained
+        elif expected < seq < expected + window:
+            buffer.insert(seq, keep(payload))
+    return delivered
+
+
+def benchmark_reorder():
+    """Buffer de reordenacao do SR: dict vs ring com bitmap (objetos e arena memoryview)"""
+    print("\n=== Reordenação no receptor SR (janela 1024, esperado sempre por último) ===")
+    window = 1024
+    total = 200 * window
+    arrivals = _reorder_heavy_arrivals(window, total)
+    # "bytes": payload ja decodificado; "view do slab": precisa ser copiado antes do proximo recv
+    payloads = (("bytes", b'R' * 1024, lambda p: p),
+                ("view do slab", memoryview(bytearray(1024)), bytes))
+    rows = []
+    for origin, payload, copy in payloads:
+        modes = (
+            ("dict", lambda: _dict_reorder(window, arrivals, payload, copy)),
+            ("ring + bitmap", lambda: _ring_reorder(window, arrivals, payload, copy)),
+        )
+        if origin == "view do slab":
+            # A arena copia a view direto para o slot, sem criar um objeto bytes
+            modes += (("ring + arena", lambda: _ring_reorder(window, arrivals, payload, lambda p: p, 1024)),)
+        for label, run in modes:
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                assert run() == total
+                times.append(time.perf_counter() - start)
+            rows.append((origin, label, f"{min(times) * 1e9 / total:.0f}"))
+    _print_table(("Payload", "Buffer", "ns/pacote"), rows)
+
+
+BENCHMARKS = {
+    'admissao': benchmark_admissao,
+    'fast_retransmit': benchmark_fast_retransmit,
+    'ring_buffer': benchmark_ring_buffer,
+    'delayed_ack': benchmark_delayed_ack,
+    'aimd': benchmark_aimd,
+    'latencia': benchmark_latencia,
+    'buffer_pool': benchmark_buffer_pool,
+    'timer_wheel': benchmark_timer_wheel,
+    'soak_sr': benchmark_soak_sr,
+    'reorder': benchmark_reorder,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
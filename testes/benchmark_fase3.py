@@ -0,0 +1,731 @@
+"""
+Benchmarks da Fase 3 - TCP Simplificado
+Mede desempenho do SimpleTCPSocket (não faz parte da suíte de testes)
+
+Uso:
+    python testes/benchmark_fase3.py            # executa todos
+    python testes/benchmark_fase3.py pipeline   # executa apenas um
+"""
+
+import asyncio
+import io
+import socket
+import sys
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+# Adiciona o diretório pai ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fase3.tcp import SimpleTCPSocket
+from fase3.tcp_streams import SERVER_RCVBUF, open_simple_connection, start_simple_server
+from utils.simulator import UnreliableChannel
+from utils.byte_ring import ByteRing
+from utils.tcp_segment import TCPSegment
+
+
+BASE_PORT = 9500
+
+
+def _print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) + 2 for i, h in enumerate(headers)]
+    print("".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("-" * sum(widths))
+    for row in rows:
+        print("".join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+# Emula o envio antigo: um segmento em transito por vez (janela de 1 MSS)
+class StopAndWaitTCPSocket(SimpleTCPSocket):
+    def _send_window(self):
+        return self.MSS
+
+
+# Transfere size bytes do cliente ao servidor; retorna (segundos do send ao ultimo ACK, estatisticas do cliente)
+# reverse_channel (padrao: channel) leva os ACKs; socket_kwargs (ex.: congestion_control) valem para os dois lados
+# receiver_stats: dict preenchido com as estatisticas da conexao receptora
+def _run_bulk_transfer(port, socket_cls, size, channel=None, reverse_channel=None, receiver_stats=None,
+                       **socket_kwargs):
+    payload = os.urandom(size)
+    if reverse_channel is None:
+        reverse_channel = channel
+    server = SimpleTCPSocket(port, channel=reverse_channel, verbose=False, **socket_kwargs)
+    server.listen()
+    received = bytearray()
+
+    def serve():
+        conn, _ = server.accept()
+        if conn:
+            while len(received) < size:
+                chunk = conn.recv(65536, timeout=10.0)
+                if not chunk:
+                    break
+                received.extend(chunk)
+            if receiver_stats is not None:
+                receiver_stats.update(conn.get_statistics())
+            conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    client = socket_cls(channel=channel, verbose=False, **socket_kwargs)
+    assert client.connect('localhost', port)
+
+    start = time.perf_counter()
+    client.send(payload)
+    assert client.drain(timeout=30.0)
+    elapsed = time.perf_counter() - start
+    stats = client.get_statistics()
+
+    # Fechamento ativo pelo cliente: o servidor termina de ler em CLOSE_WAIT
+    client.close()
+    thread.join(timeout=30)
+    assert bytes(received) == payload
+    server.close()
+    return elapsed, stats
+
+
+def benchmark_pipeline():
+    """Goodput de transferência em massa: 1 segmento por RTT vs janela deslizante"""
+    print("\n=== TCP: stop-and-wait vs janela deslizante (transferência em massa) ===")
+    rows = []
+    scenarios = (
+        ("loopback", 1024 * 1024, lambda: None),
+        ("atraso 5 ms", 256 * 1024,
+         lambda: UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.005, 0.005))),
+    )
+    for label, size, make_channel in scenarios:
+        for mode, socket_cls in (("stop-and-wait", StopAndWaitTCPSocket), ("janela deslizante", SimpleTCPSocket)):
+            port = BASE_PORT + len(rows)
+            # Com um segmento por vez o receptor nunca junta 2 MSS: o baseline usa ACK por segmento,
+            # como o envio antigo, em vez de esperar o timer do ACK atrasado a cada segmento
+            ack_kwargs = {'delayed_ack_timeout': 0} if socket_cls is StopAndWaitTCPSocket else {}
+            elapsed, stats = _run_bulk_transfer(port, socket_cls, size, make_channel(), **ack_kwargs)
+            rows.append((label, mode, f"{size // 1024} KB", f"{elapsed:.2f}",
+                         f"{size / elapsed / 1024:.0f}", stats['retransmissions']))
+    _print_table(("Canal", "Envio", "Dados", "Tempo (s)", "Goodput (KB/s)", "Retransmissões"), rows)
+
+
+def benchmark_congestion():
+    """Goodput de Reno, NewReno e CUBIC por taxa de perda e banda do gargalo"""
+    print("\n=== TCP: controle de congestionamento (256 KB, atraso 5 ms, fila 32 KB, mediana de 3) ===")
+    size = 256 * 1024
+    repeats = 3
+    rows = []
+    port = BASE_PORT + 10
+    for bandwidth in (256 * 1024, 1024 * 1024):
+        for loss_rate in (0.0, 0.01, 0.03):
+            for algorithm in ('reno', 'newreno', 'cubic'):
+                runs = []
+                for _ in range(repeats):
+                    # Gargalo e perdas so no sentido dos dados; os ACKs voltam por um caminho sem fila
+                    channel = UnreliableChannel(loss_rate=loss_rate, corrupt_rate=0.0, delay_range=(0.005, 0.005),
+                                                bandwidth=bandwidth, queue_limit=32 * 1024)
+                    ack_channel = UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.005, 0.005))
+                    with redirect_stdout(io.StringIO()):
+                        runs.append(_run_bulk_transfer(port, SimpleTCPSocket, size, channel, ack_channel,
+                                                       congestion_control=algorithm))
+                    port += 1
+                elapsed, stats = sorted(runs, key=lambda run: run[0])[repeats // 2]
+                rows.append((f"{bandwidth // 1024} KB/s", f"{loss_rate:.0%}", algorithm, f"{elapsed:.2f}",
+                             f"{size / elapsed / 1024:.0f}",
+                             f"{statistics.mean(run[1]['fast_retransmissions'] for run in runs):.1f}",
+                             f"{statistics.mean(run[1]['retransmissions'] for run in runs):.1f}",
+                             f"{stats['cwnd'] / SimpleTCPSocket.MSS:.1f}"))
+    _print_table(("Gargalo", "Perda", "Algoritmo", "Tempo (s)", "Goodput (KB/s)",
+                  "Fast retx (média)", "Retransmissões (média)", "cwnd final (MSS)"), rows)
+
+
+# Leitura antiga: deque de segmentos concatenados com += e sobra reinserida com appendleft
+def _legacy_deque_read(chunks, buffer_size):
+    result = b''
+    bytes_read = 0
+    while len(chunks) > 0 and bytes_read < buffer_size:
+        chunk = chunks.popleft()
+        if bytes_read + len(chunk) <= buffer_size:
+            result += chunk
+            bytes_read += len(chunk)
+        else:
+            remaining = buffer_size - bytes_read
+            result += chunk[:remaining]
+            chunks.appendleft(chunk[remaining:])
+            break
+    return result
+
+
+# Emula a recepcao antiga: segmentos em um deque, lidos por _legacy_deque_read
+class DequeRecvTCPSocket(SimpleTCPSocket):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recv_chunks = deque()
+
+    def _deliver(self, data):
+        self.recv_chunks.append(data)
+        self.next_seq_expected += len(data)
+        self.recv_cond.notify_all()
+
+    def recv(self, buffer_size=4096, timeout=None):
+        with self.lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.recv_chunks and self.state == self.ESTABLISHED:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.recv_cond.wait(remaining)
+            return _legacy_deque_read(self.recv_chunks, buffer_size)
+
+
+def benchmark_recv():
+    """CPU por MB recebido: deque + concatenação vs ring contíguo, leituras de 4 KB e 1 MB"""
+    mss = SimpleTCPSocket.MSS
+    read_sizes = (("4 KB", 4096), ("1 MB", 1024 * 1024))
+
+    # Parte 1: so a estrutura de recepcao (segmentos de 1 MSS entregues e lidos em rodadas de 64 KB)
+    print("\n=== Recepção TCP: estrutura do buffer (16 MB em segmentos de 1 MSS) ===")
+    total = 16 * 1024 * 1024
+    segment = os.urandom(mss)
+    rows = []
+    for label, read_size in read_sizes:
+        batch = max(read_size, 64 * 1024)
+        for mode in ("deque + concatenação", "ByteRing.read", "ByteRing.read_into"):
+            chunks = deque()
+            ring = ByteRing(SimpleTCPSocket.BUFFER_SIZE)
+            dest = bytearray(read_size)
+            delivered = 0
+            start = time.process_time()
+            while delivered < total:
+                for _ in range(batch // mss + 1):
+                    if mode.startswith("deque"):
+                        chunks.append(segment)
+                    else:
+                        ring.write(segment)
+                delivered += (batch // mss + 1) * mss
+                if mode.startswith("deque"):
+                    while chunks:
+                        _legacy_deque_read(chunks, read_size)
+                elif mode == "ByteRing.read":
+                    while len(ring):
+                        ring.read(read_size)
+                else:
+                    while len(ring):
+                        ring.read_into(dest)
+            cpu = time.process_time() - start
+            rows.append((label, mode, f"{cpu / (delivered / 1024 / 1024) * 1000:.2f}"))
+    _print_table(("Leitura", "Buffer", "CPU (ms/MB)"), rows)
+
+    # Parte 2: socket em loopback; o cliente recebe e mede a CPU da propria thread
+    print("\n=== Recepção TCP: SimpleTCPSocket em loopback (8 MB, CPU da thread leitora) ===")
+    size = 8 * 1024 * 1024
+    payload = os.urandom(size)
+    rows = []
+    modes = [(label, api, read_size) for label, read_size in read_sizes
+             for api in ("recv (deque)", "recv", "recv_into", "recv_view")]
+    for i, (label, api, read_size) in enumerate(modes):
+        port = BASE_PORT + 100 + i
+        server = SimpleTCPSocket(port, verbose=False)
+        server.listen()
+
+        def serve():
+            conn, _ = server.accept()
+            if conn:
+                conn.send(payload)
+                conn.close()
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        client = (DequeRecvTCPSocket if api == "recv (deque)" else SimpleTCPSocket)(verbose=False)
+        assert client.connect('localhost', port)
+        dest = bytearray(read_size)
+        received = 0
+        start = time.thread_time()
+        while received < size:
+            if api.startswith("recv ") or api == "recv":
+                n = len(client.recv(read_size, timeout=10.0))
+            elif api == "recv_into":
+                n = client.recv_into(dest, timeout=10.0)
+            else:
+                n = len(client.recv_view(read_size, timeout=10.0))
+            if not n:
+                break
+            received += n
+        cpu = time.thread_time() - start
+        client.close()
+        thread.join(timeout=30)
+        server.close()
+        assert received == size
+        rows.append((label, api, f"{cpu / (size / 1024 / 1024) * 1000:.2f}"))
+    _print_table(("Leitura", "API", "CPU leitora (ms/MB)"), rows)
+
+
+# Emula a janela antiga: sempre anuncia BUFFER_SIZE e aceita tudo (o ring cresce sem limite)
+class ConstantWindowTCPSocket(SimpleTCPSocket):
+    def _advertised_window(self):
+        return self.BUFFER_SIZE
+
+    def _fits_receive_window(self, segment):
+        return True
+
+
+def benchmark_window():
+    """Memória de recepção e goodput com janela constante vs janela dinâmica, leitor rápido e lento"""
+    print("\n=== TCP: janela anunciada constante vs dinâmica (cliente recebe em loopback) ===")
+    scenarios = (
+        # (rotulo, bytes, tamanho da leitura, pausa entre leituras)
+        ("rápido", 8 * 1024 * 1024, 65536, 0.0),
+        ("lento (4 KB / 5 ms)", 2 * 1024 * 1024, 4096, 0.005),
+    )
+    rows = []
+    port = BASE_PORT + 120
+    for label, size, read_size, pause in scenarios:
+        payload = os.urandom(size)
+        for mode, socket_cls in (("constante", ConstantWindowTCPSocket), ("dinâmica", SimpleTCPSocket)):
+            server = SimpleTCPSocket(port, verbose=False)
+            server.listen()
+            sender_stats = {}
+
+            def serve():
+                conn, _ = server.accept()
+                if conn:
+                    conn.send(payload)
+                    conn.drain(timeout=30.0)
+                    sender_stats.update(conn.get_statistics())
+                    conn.close()
+
+            thread = threading.Thread(target=serve, daemon=True)
+            thread.start()
+            client = socket_cls(verbose=False)
+            assert client.connect('localhost', port)
+            received = 0
+            peak = 0
+            start = time.perf_counter()
+            while received < size:
+                n = len(client.recv(read_size, timeout=10.0))
+                if not n:
+                    break
+                received += n
+                stats = client.get_statistics()
+                peak = max(peak, stats['recv_buffered'] + stats['out_of_order_buffered'])
+                if pause:
+                    time.sleep(pause)
+            elapsed = time.perf_counter() - start
+            client.close()
+            thread.join(timeout=30)
+            server.close()
+            assert received == size
+            rows.append((label, mode, f"{size // 1024} KB", f"{size / elapsed / 1024:.0f}",
+                         f"{peak // 1024}", f"{client.recv_ring.capacity // 1024}",
+                         sender_stats.get('window_probes', 0), sender_stats.get('retransmissions', 0)))
+            port += 1
+    _print_table(("Leitor", "Janela", "Dados", "Goodput (KB/s)", "Pico em buffer (KB)", "Ring (KB)",
+                  "Sondas", "Retransmissões"), rows)
+
+
+# Cliente com TIME_WAIT curto: o benchmark abre e fecha milhares de conexoes
+class ShortTimeWaitTCPSocket(SimpleTCPSocket):
+    TIME_WAIT_DURATION = 0.1
+
+
+def benchmark_accept():
+    """Conexões por segundo e threads do servidor com centenas/milhares de conexões simultâneas"""
+    print("\n=== TCP: listener multiplexado (conexões abertas em paralelo por 64 clientes) ===")
+    rows = []
+    for i, count in enumerate((100, 500, 1000)):
+        port = BASE_PORT + 140 + i
+        server = SimpleTCPSocket(port, verbose=False)
+        # Fila de accept maior que os 64 connect() simultaneos (com o padrao 5 o excesso de SYNs e descartado)
+        server.listen(backlog=128)
+        accepted = []
+
+        def serve():
+            while len(accepted) < count:
+                conn, _ = server.accept()
+                if conn is None:
+                    break
+                accepted.append(conn)
+
+        def open_client(_):
+            client = ShortTimeWaitTCPSocket(verbose=False)
+            assert client.connect('localhost', port)
+            return client
+
+        # O servidor so fecha depois do FIN do cliente (CLOSE_WAIT)
+        def close_server_side(conn):
+            conn.recv(1, timeout=10.0)
+            conn.close()
+
+        acceptor = threading.Thread(target=serve, daemon=True)
+        acceptor.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=64) as pool:
+            clients = list(pool.map(open_client, range(count)))
+        acceptor.join(timeout=30)
+        elapsed = time.perf_counter() - start
+        assert len(accepted) == count
+        server_threads = sum(1 for t in threading.enumerate() if t.name == f"tcp-recv-{server.src_port}")
+        table = len(server.connections)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=64) as client_pool, ThreadPoolExecutor(max_workers=64) as server_pool:
+            server_closes = [server_pool.submit(close_server_side, conn) for conn in accepted]
+            list(client_pool.map(lambda client: client.close(), clients))
+            for future in server_closes:
+                future.result()
+        close_elapsed = time.perf_counter() - start
+        remaining = len(server.connections)
+        server.close()
+        rows.append((count, f"{elapsed:.2f}", f"{count / elapsed:.0f}", table, server_threads,
+                     f"{close_elapsed:.2f}", remaining))
+    _print_table(("Conexões", "Abertura (s)", "Conexões/s", "Tabela", "Threads do servidor",
+                  "Fechamento (s)", "Restantes na tabela"), rows)
+
+
+ECHO_MESSAGE = b"x" * 63 + b"\n"
+ECHO_ROUNDS = 5
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# Retorna (tempo ate o ultimo eco, latencias dos ecos, pico de threads)
+async def _async_echo_run(port, count):
+    async def handle(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            writer.write(line)
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    latencies = []
+    peak = threading.active_count()
+
+    async def client():
+        nonlocal peak
+        reader, writer = await open_simple_connection('127.0.0.1', port, verbose=False)
+        for _ in range(ECHO_ROUNDS):
+            sent_at = time.perf_counter()
+            writer.write(ECHO_MESSAGE)
+            await writer.drain()
+            assert await reader.readexactly(len(ECHO_MESSAGE)) == ECHO_MESSAGE
+            latencies.append(time.perf_counter() - sent_at)
+            peak = max(peak, threading.active_count())
+        finished = time.perf_counter()
+        writer.close()
+        await writer.wait_closed()
+        return finished
+
+    server = await start_simple_server(handle, '127.0.0.1', port, verbose=False)
+    start = time.perf_counter()
+    finished = await asyncio.gather(*(client() for _ in range(count)))
+    server.close()
+    await server.wait_closed()
+    return max(finished) - start, latencies, peak
+
+
+def _threaded_echo_run(port, count):
+    server = SimpleTCPSocket(port, verbose=False)
+    # Mesmo buffer de recepcao do servidor asyncio: a comparacao mede o modelo de execucao
+    server.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SERVER_RCVBUF)
+    server.listen()
+
+    def echo(conn):
+        while True:
+            data = conn.recv(4096, timeout=30.0)
+            if not data:
+                break
+            conn.send(data)
+        conn.close()
+
+    def serve():
+        for _ in range(count):
+            conn, _ = server.accept()
+            if conn is None:
+                break
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    latencies = []
+    peak = [threading.active_count()]
+
+    # Abre com 64 workers (como benchmark_accept); o eco roda com todas as conexoes abertas
+    def open_client(_):
+        client = SimpleTCPSocket(verbose=False)
+        assert client.connect('localhost', port)
+        return client
+
+    def echo_rounds(client):
+        for _ in range(ECHO_ROUNDS):
+            sent_at = time.perf_counter()
+            client.send(ECHO_MESSAGE)
+            assert client.readexactly(len(ECHO_MESSAGE), timeout=30.0) == ECHO_MESSAGE
+            latencies.append(time.perf_counter() - sent_at)
+            peak[0] = max(peak[0], threading.active_count())
+        return time.perf_counter()
+
+    acceptor = threading.Thread(target=serve, daemon=True)
+    acceptor.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        clients = list(pool.map(open_client, range(count)))
+        finished = list(pool.map(echo_rounds, clients))
+        list(pool.map(lambda client: client.close(), clients))
+    acceptor.join(timeout=30)
+    server.close()
+    return max(finished) - start, latencies, peak[0]
+
+
+def benchmark_async_echo():
+    """Eco com 1.000 conexões simultâneas: streams asyncio (uma thread) vs uma thread por socket"""
+    print(f"\n=== TCP: eco com conexões simultâneas ({ECHO_ROUNDS} ecos de {len(ECHO_MESSAGE)} B por conexão) ===")
+    # Threads so ate 100 conexoes: com 1.000 sao ~3.000 threads (recepcao do cliente, eco e
+    # timers) e o leitor unico do listener fica sem CPU a ponto de o handshake expirar
+    rows = []
+    for i, (count, mode) in enumerate(((100, "threads"), (100, "asyncio"), (1000, "asyncio"))):
+        port = BASE_PORT + 160 + i
+        if mode == "threads":
+            elapsed, latencies, peak = _threaded_echo_run(port, count)
+        else:
+            elapsed, latencies, peak = asyncio.run(_async_echo_run(port, count))
+        assert len(latencies) == count * ECHO_ROUNDS
+        rows.append((count, mode, f"{elapsed:.2f}", f"{len(latencies) / elapsed:.0f}",
+                     f"{_percentile(latencies, 0.5) * 1000:.1f}", f"{_percentile(latencies, 0.99) * 1000:.1f}",
+                     peak))
+    _print_table(("Conexões", "Modelo", "Tempo (s)", "Ecos/s", "Latência p50 (ms)", "Latência p99 (ms)",
+                  "Pico de threads"), rows)
+
+
+# Fila de SYN sem limite: referencia do crescimento sob inundacao
+class UnboundedSynQueueTCPSocket(SimpleTCPSocket):
+    SYN_BACKLOG = 10 ** 9
+
+
+# Inunda o listener com SYNs de sockets distintos (ISN novo a cada rodada) ate stop ser sinalizado
+def _syn_flood(port, sockets, stop, interval=1.0):
+    round_num = 0
+    while not stop.is_set():
+        for sock in sockets:
+            syn = TCPSegment(sock.getsockname()[1], port, round_num, 0, TCPSegment.FLAG_SYN, 65535)
+            sock.sendto(syn.to_bytes(), ('localhost', port))
+        round_num += 1
+        stop.wait(interval)
+
+
+def benchmark_overload():
+    """Conexões legítimas e memória do listener sob inundação de SYNs: fila sem limite, limitada e SYN cookies"""
+    flood_size = 2000
+    legit = 20
+    flood_duration = 6.0
+    print(f"\n=== TCP: {flood_size} SYNs sem ACK final (repetidos a cada 1s por {flood_duration:.0f}s) "
+          f"+ {legit} clientes legítimos ===")
+    modes = (
+        ("sem limite", UnboundedSynQueueTCPSocket, False),
+        (f"limitada ({SimpleTCPSocket.SYN_BACKLOG})", SimpleTCPSocket, False),
+        ("SYN cookies", SimpleTCPSocket, True),
+    )
+    rows = []
+    for i, (label, socket_cls, syn_cookies) in enumerate(modes):
+        port = BASE_PORT + 170 + i
+        flood_sockets = []
+        for _ in range(flood_size):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(('localhost', 0))
+            flood_sockets.append(sock)
+        server = socket_cls(port, verbose=False)
+        server.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SERVER_RCVBUF)
+        server.listen(backlog=128, syn_cookies=syn_cookies)
+        accepted = []
+
+        def serve():
+            while server.running:
+                conn, _ = server.accept()
+                if conn is not None:
+                    accepted.append(conn)
+
+        def open_client(_):
+            client = SimpleTCPSocket(verbose=False)
+            start = time.perf_counter()
+            ok = client.connect('localhost', port)
+            return client, ok, time.perf_counter() - start
+
+        acceptor = threading.Thread(target=serve, daemon=True)
+        acceptor.start()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        stop = threading.Event()
+        flooder = threading.Thread(target=_syn_flood, args=(port, flood_sockets, stop), daemon=True)
+        flooder.start()
+        time.sleep(0.5)
+        state_bytes = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        half_open = len(server.syn_queue)
+
+        with ThreadPoolExecutor(max_workers=legit) as pool:
+            timer = threading.Timer(flood_duration - 0.5, stop.set)
+            timer.start()
+            results = list(pool.map(open_client, range(legit)))
+            timer.cancel()
+        stop.set()
+        flooder.join(timeout=5.0)
+        connect_times = [elapsed for _, ok, elapsed in results if ok]
+        stats = server.get_statistics()
+
+        with ThreadPoolExecutor(max_workers=legit) as pool:
+            list(pool.map(lambda result: result[0].close(), results))
+            list(pool.map(lambda conn: conn.close(), list(accepted)))
+        server.close()
+        for sock in flood_sockets:
+            sock.close()
+        rows.append((label, half_open, f"{state_bytes / 1024:.0f}", f"{len(connect_times)}/{legit}",
+                     f"{statistics.median(connect_times) * 1000:.0f}" if connect_times else "-",
+                     f"{max(connect_times) * 1000:.0f}" if connect_times else "-",
+                     stats['syn_drops'], stats['syn_cookies_sent']))
+    _print_table(("Fila de SYN", "Semi-abertas", "Estado (KB)", "Legítimas ok", "connect p50 (ms)",
+                  "connect máx (ms)", "SYNs descartados", "Cookies"), rows)
+
+    # Referencia: antes cada SYN criava um SimpleTCPSocket completo (ring de recepcao incluido)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    reference = SimpleTCPSocket(verbose=False, udp_socket=flood_sockets[0])
+    per_socket = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del reference
+    print(f"Referência: um socket completo por SYN custaria ~{per_socket * flood_size / 1024 / 1024:.0f} MB "
+          f"para {flood_size} SYNs ({per_socket / 1024:.0f} KB cada)")
+
+
+def benchmark_delayed_ack():
+    """Datagramas de ACK e goodput em transferência em massa: ACK por segmento vs ACK atrasado"""
+    repeats = 3
+    print(f"\n=== TCP: ACK por segmento vs ACK atrasado (transferência em massa, mediana de {repeats}) ===")
+    rows = []
+    scenarios = (
+        ("loopback", 4 * 1024 * 1024, lambda: None),
+        ("atraso 5 ms", 1024 * 1024,
+         lambda: UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.005, 0.005))),
+    )
+    for label, size, make_channel in scenarios:
+        for mode, delayed_ack_timeout in (("ACK por segmento", 0), ("ACK atrasado", SimpleTCPSocket.DELAYED_ACK_TIMEOUT)):
+            runs = []
+            for _ in range(repeats):
+                port = BASE_PORT + 180 + len(rows) * repeats + len(runs)
+                receiver = {}
+                cpu_start = time.process_time()
+                elapsed, stats = _run_bulk_transfer(port, SimpleTCPSocket, size, make_channel(), make_channel(),
+                                                    receiver_stats=receiver, delayed_ack_timeout=delayed_ack_timeout)
+                runs.append((elapsed, time.process_time() - cpu_start, stats, receiver))
+            elapsed = statistics.median(run[0] for run in runs)
+            cpu = statistics.median(run[1] for run in runs)
+            data_segments = statistics.median(run[2]['segments_sent'] + run[2]['retransmissions'] for run in runs)
+            acks = statistics.median(run[3]['acks_sent'] for run in runs)
+            rows.append((label, mode, f"{size // 1024} KB", f"{data_segments:.0f}", f"{acks:.0f}",
+                         f"{acks / data_segments:.2f}", sum(run[3]['delayed_acks'] for run in runs),
+                         f"{size / elapsed / 1024:.0f}", f"{cpu / (size / 1024 / 1024):.2f}"))
+    _print_table(("Canal", "Receptor", "Dados", "Segmentos", "ACKs", "ACKs/segmento", "Pelo timer",
+                  "Goodput (KB/s)", "CPU (s/MB)"), rows)
+
+
+# Emula o send antigo: cada escrita espera o ACK de todos os seus segmentos
+class BlockingSendTCPSocket(SimpleTCPSocket):
+    def send(self, data):
+        sent = super().send(data)
+        self.drain()
+        return sent
+
+
+# Envia total bytes em escritas de write_size; retorna (segundos ate o ultimo ACK, segundos dentro
+# de send(), estatisticas do cliente)
+def _run_write_pattern(port, socket_cls, write_size, total, **socket_kwargs):
+    server = SimpleTCPSocket(port, verbose=False)
+    server.listen()
+    received = [0]
+
+    def serve():
+        conn, _ = server.accept()
+        if conn:
+            while received[0] < total:
+                n = len(conn.recv(65536, timeout=10.0))
+                if not n:
+                    break
+                received[0] += n
+            conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    client = socket_cls(verbose=False, **socket_kwargs)
+    assert client.connect('localhost', port)
+
+    chunk = os.urandom(write_size)
+    in_send = 0.0
+    start = time.perf_counter()
+    for _ in range(total // write_size):
+        before = time.perf_counter()
+        client.send(chunk)
+        in_send += time.perf_counter() - before
+    assert client.drain(timeout=30.0)
+    elapsed = time.perf_counter() - start
+    stats = client.get_statistics()
+
+    client.close()
+    thread.join(timeout=30)
+    server.close()
+    assert received[0] == total
+    return elapsed, in_send, stats
+
+
+def benchmark_writes():
+    """Escritas de 1 B a 64 KB: send bloqueante vs buffer de envio com nodelay e com Nagle"""
+    print("\n=== TCP: padrões de escrita, send bloqueante vs buffer de envio (loopback) ===")
+    patterns = (
+        # (tamanho da escrita, bytes no total)
+        (1, 8 * 1024),
+        (64, 256 * 1024),
+        (1024, 1024 * 1024),
+        (16 * 1024, 4 * 1024 * 1024),
+        (64 * 1024, 4 * 1024 * 1024),
+    )
+    modes = (
+        ("bloqueante", BlockingSendTCPSocket, {}),
+        ("buffer + nodelay", SimpleTCPSocket, {'nodelay': True}),
+        ("buffer + Nagle", SimpleTCPSocket, {}),
+    )
+    rows = []
+    port = BASE_PORT + 200
+    for write_size, total in patterns:
+        for mode, socket_cls, socket_kwargs in modes:
+            elapsed, in_send, stats = _run_write_pattern(port, socket_cls, write_size, total, **socket_kwargs)
+            writes = total // write_size
+            segments = stats['segments_sent']
+            label = f"{write_size // 1024} KB" if write_size >= 1024 else f"{write_size} B"
+            rows.append((label, mode, writes, f"{writes / elapsed:.0f}", f"{in_send / writes * 1e6:.1f}",
+                         f"{total / elapsed / 1024:.0f}", segments, f"{total / segments:.0f}",
+                         stats['retransmissions']))
+            port += 1
+    _print_table(("Escrita", "Envio", "Escritas", "Escritas/s", "send() médio (µs)", "Goodput (KB/s)",
+                  "Segmentos", "Bytes/segmento", "Retransmissões"), rows)
+
+
+BENCHMARKS = {
+    'pipeline': benchmark_pipeline,
+    'congestion': benchmark_congestion,
+    'recv': benchmark_recv,
+    'window': benchmark_window,
+    'accept': benchmark_accept,
+    'async_echo': benchmark_async_echo,
+    'overload': benchmark_overload,
+    'delayed_ack': benchmark_delayed_ack,
+    'writes': benchmark_writes,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -9,6 +9,8 @@ sys.path.append(str(Path(__file__).parent.parent))
 from fase1.rdt20 import RDT20Sender, RDT20Receiver
 from fase1.rdt21 import RDT21Sender, RDT21Receiver
 from fase1.rdt30 import RDT30Sender, RDT30Receiver
+from utils.packet import RDT30Packet
+from utils.buffer_pool import shared_pool
 
 
 class TestRDT20(unittest.TestCase):
@@ -200,6 +202,71 @@ class TestRDT30(unittest.TestCase):
         
         sender.close()
     
+    def test_large_message_fragmentation(self):
+        """Mensagens maiores que o datagrama são fragmentadas e remontadas"""
+        sender = RDT30Sender(('localhost', 9102), timeout=1.0, use_simulator=False)
+        
+        messages = [b"A" * 3000, bytes(range(256)) * 200, b"pequena", b""]
+        for msg in messages:
+            sender.send_message(msg)
+        
+        time.sleep(0.5)
+        received = self.receiver.get_messages()
+        stats = sender.get_statistics()
+        
+        self.assertEqual(received, messages)
+        self.assertEqual(stats['messages_sent'], len(messages))
+        # Apos o primeiro ACK o sender usa o datagrama anunciado pelo receptor
+        self.assertEqual(sender.peer_max_datagram, self.receiver.max_datagram)
+        # Sem fragmentacao pelo chamador seriam ~55 pacotes de 1 KB
+        self.assertLess(stats['packets_sent'], 15)
+        
+        sender.close()
+    
+    def test_receiver_smaller_than_default_datagram(self):
+        """Receptor com datagrama menor que o padrão: o sender refragmenta após o primeiro ACK"""
+        receiver = RDT30Receiver(9103, max_datagram=256)
+        receiver.start()
+        time.sleep(0.3)
+        sender = RDT30Sender(('localhost', 9103), timeout=1.0, use_simulator=False)
+        
+        messages = [bytes(range(256)) * 20, b"pequena"]
+        for msg in messages:
+            sender.send_message(msg)
+        
+        time.sleep(0.5)
+        received = receiver.get_messages()
+        
+        self.assertEqual(received, messages)
+        self.assertEqual(sender.peer_max_datagram, 256)
+        
+        sender.close()
+        receiver.close()
+    
+    def test_receiver_rejects_datagram_above_slab(self):
+        """max_datagram maior que o slab de recepção é recusado no construtor"""
+        with self.assertRaises(ValueError):
+            RDT30Receiver(9104, max_datagram=shared_pool.slab_size + 1)
+        with self.assertRaises(ValueError):
+            RDT30Receiver(9104, max_datagram=RDT30Packet.HEADER_SIZE)
+        receiver = RDT30Receiver(9104, max_datagram=shared_pool.slab_size)
+        receiver.close()
+    
+    def test_fragmentation_with_loss(self):
+        """Fragmentação com perdas: mensagem chega íntegra"""
+        sender = RDT30Sender(('localhost', 9102), timeout=0.5, use_simulator=True,
+                            loss_rate=0.15, corrupt_rate=0.05)
+        
+        message = bytes(range(256)) * 100
+        sender.send_message(message)
+        
+        time.sleep(0.5)
+        received = self.receiver.get_messages()
+        
+        self.assertEqual(received, [message])
+        
+        sender.close()
+    
     def test_throughput(self):
         """Teste de throughput"""
         sender = RDT30Sender(('localhost', 9102), timeout=1.0, use_simulator=True,
@@ -8,11 +8,14 @@ Inclui:
 """
 
 import unittest
+import asyncio
 import socket
 import threading
 import time
 import sys
 import os
+import tempfile
+import tracemalloc
 
 # Adiciona o diretório pai ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,6 +24,14 @@ from fase1.rdt30 import RDT30Sender, RDT30Receiver
 from fase2.gbn import GBNSender, GBNReceiver
 from fase2.sr import SRSender, SRReceiver
 from utils.simulator import UnreliableChannel
+from utils.gbn_packet import GBNPacket
+from utils.delivery_queue import DeliveryQueue
+from utils.packet_ring import PacketRing
+from utils.sr_packet import SRPacket
+from utils.flow_endpoint import FlowEndpoint
+from utils.buffer_pool import BufferPool, recv_view
+from utils.timer_wheel import TimerWheel
+from utils.reorder_buffer import ReorderBuffer
 
 
 class TestGBN(unittest.TestCase):
@@ -141,6 +152,250 @@ class TestGBN(unittest.TestCase):
         receiver.close()
         print("✓ GBN Janela Deslizante: PASSOU")
 
+    
+    def test_gbn_try_send_window_admission(self):
+        """try_send não bloqueia com janela cheia e send_data acorda quando a base avança"""
+        print("\n[TEST GBN] Admissão na Janela")
+        
+        sender = GBNSender(('localhost', 9034), window_size=3, timeout=5.0)
+        sender.start()
+        
+        # Sem receptor: a janela enche e nao desliza
+        for i in range(3):
+            self.assertTrue(sender.try_send(f"T{i}".encode()))
+        # Recusa sem bloquear: retorna False e a janela fica como estava
+        self.assertFalse(sender.try_send(b"T3"), "Janela cheia deve recusar")
+        self.assertEqual((sender.base, sender.next_seq_num), (0, 3))
+        sender.close()
+        
+        receiver = GBNReceiver(9035, window_size=3)
+        sender = GBNSender(('localhost', 9035), window_size=3, timeout=0.8)
+        sender.start()
+        
+        test_data = [f"Q{i}".encode() for i in range(12)]
+        sender.send_data(test_data)
+        self.assertTrue(sender.wait_for_completion(timeout=5))
+        self.assertEqual(receiver.receive_data(12, timeout=5), test_data)
+        self.assertEqual(sender.get_statistics()['retransmissions'], 0)
+        
+        sender.close()
+        receiver.close()
+        print("✓ GBN Admissão na Janela: PASSOU")
+    
+    def test_gbn_fast_retransmit(self):
+        """ACKs duplicados disparam retransmissão antes do timeout"""
+        print("\n[TEST GBN] Fast Retransmit")
+        
+        # Perde apenas a primeira transmissao do pacote seq=2 (sem reordenacao)
+        class DropOnceChannel(UnreliableChannel):
+            def __init__(self):
+                super().__init__(loss_rate=0.0, corrupt_rate=0.0)
+                self.dropped = False
+            def send(self, packet, dest_socket, dest_addr):
+                parsed, _ = GBNPacket.from_bytes(packet)
+                if not self.dropped and parsed.packet_type == GBNPacket.TYPE_DATA and parsed.seq_num == 2:
+                    self.dropped = True
+                    return
+                dest_socket.sendto(packet, dest_addr)
+        
+        receiver = GBNReceiver(9036, window_size=8)
+        sender = GBNSender(('localhost', 9036), window_size=8, timeout=5.0,
+                           channel=DropOnceChannel(), dup_ack_threshold=3)
+        sender.start()
+        
+        test_data = [f"F{i}".encode() for i in range(10)]
+        start = time.time()
+        sender.send_data(test_data)
+        self.assertTrue(sender.wait_for_completion(timeout=4))
+        elapsed = time.time() - start
+        
+        stats = sender.get_statistics()
+        self.assertEqual(receiver.receive_data(10, timeout=2), test_data)
+        self.assertEqual(stats['fast_retransmits'], 1)
+        self.assertEqual(stats['timeouts'], 0)
+        self.assertLess(elapsed, 2.0, "Recuperação não deve esperar o timer de 5s")
+        
+        sender.close()
+        receiver.close()
+        print(f"✓ GBN Fast Retransmit: PASSOU ({elapsed:.3f}s)")
+    
+    def test_gbn_retransmit_ring(self):
+        """Janela de retransmissão em ring buffer de capacidade fixa"""
+        print("\n[TEST GBN] Ring de Retransmissão")
+        
+        ring = PacketRing(4)
+        for seq in range(6):
+            ring.put(seq, seq)
+        # Intervalo [3, 6) atravessa o fim do ring
+        self.assertEqual(ring.range(3, 6), [3, 4, 5])
+        self.assertEqual(ring.range(2, 6), [2, 3, 4, 5])
+        with self.assertRaises(ValueError):
+            ring.range(0, 5)
+        
+        channel = UnreliableChannel(loss_rate=0.1, corrupt_rate=0.0, delay_range=(0.001, 0.003))
+        receiver = GBNReceiver(9037, window_size=4)
+        sender = GBNSender(('localhost', 9037), window_size=4, timeout=0.3, channel=channel)
+        sender.start()
+        
+        test_data = [f"R{i}".encode() for i in range(30)]
+        sender.send_data(test_data)
+        self.assertTrue(sender.wait_for_completion(timeout=20))
+        
+        self.assertEqual(receiver.receive_data(30, timeout=5), test_data)
+        self.assertEqual(len(sender.sent_packets.slots), 4, "Ring não deve crescer")
+        
+        sender.close()
+        receiver.close()
+        print("✓ GBN Ring de Retransmissão: PASSOU")
+    
+    def test_gbn_delayed_acks(self):
+        """ACKs cumulativos atrasados: um ACK a cada N pacotes ou após T"""
+        print("\n[TEST GBN] ACKs Atrasados")
+        
+        receiver = GBNReceiver(9038, window_size=8, ack_every=4, ack_delay=0.05)
+        sender = GBNSender(('localhost', 9038), window_size=8, timeout=1.0)
+        sender.start()
+        
+        test_data = [f"A{i}".encode() for i in range(10)]
+        sender.send_data(test_data)
+        # Os 2 ultimos pacotes dependem do timer de ACK atrasado
+        self.assertTrue(sender.wait_for_completion(timeout=2))
+        
+        self.assertEqual(receiver.receive_data(10, timeout=2), test_data)
+        stats = receiver.get_statistics()
+        self.assertLess(stats['acks_sent'], len(test_data))
+        self.assertEqual(sender.get_statistics()['timeouts'], 0)
+        
+        sender.close()
+        receiver.close()
+        print(f"✓ GBN ACKs Atrasados: PASSOU ({stats['acks_sent']} ACKs para 10 pacotes)")
+
+    def test_gbn_congestion_window(self):
+        """Janela AIMD: slow start a partir de 1 e volta a 1 no timeout"""
+        print("\n[TEST GBN] Janela de Congestionamento AIMD")
+        
+        # Perde apenas a primeira transmissao do pacote seq=20 (sem fast retransmit)
+        class DropOnceChannel(UnreliableChannel):
+            def __init__(self):
+                super().__init__(loss_rate=0.0, corrupt_rate=0.0)
+                self.dropped = False
+            def send(self, packet, dest_socket, dest_addr):
+                parsed, _ = GBNPacket.from_bytes(packet)
+                if not self.dropped and parsed.packet_type == GBNPacket.TYPE_DATA and parsed.seq_num == 20:
+                    self.dropped = True
+                    return
+                dest_socket.sendto(packet, dest_addr)
+        
+        receiver = GBNReceiver(9039, window_size=16)
+        sender = GBNSender(('localhost', 9039), window_size=16, timeout=0.3,
+                           channel=DropOnceChannel(), dup_ack_threshold=None,
+                           congestion_control=True)
+        sender.start()
+        self.assertEqual(sender.get_statistics()['cwnd'], 1.0)
+        
+        test_data = [f"C{i}".encode() for i in range(40)]
+        sender.send_data(test_data)
+        self.assertTrue(sender.wait_for_completion(timeout=5))
+        
+        self.assertEqual(receiver.receive_data(40, timeout=2), test_data)
+        
+        history = [cwnd for _, cwnd in sender.get_cwnd_history()]
+        self.assertEqual(history[0], 1.0)
+        peak = history.index(max(history))
+        self.assertGreater(max(history), 4.0)
+        self.assertLessEqual(max(history), 16.0)
+        self.assertIn(1.0, history[peak:], "Timeout deve reduzir cwnd para 1")
+        self.assertEqual(sender.get_statistics()['timeouts'], 1)
+        
+        sender.close()
+        receiver.close()
+        print(f"✓ GBN AIMD: PASSOU (pico cwnd={max(history):.1f}, {len(history)} amostras)")
+
+    def test_gbn_send_file(self):
+        """send_file/receive_file: arquivo mapeado em memória gravado direto no disco"""
+        print("\n[TEST GBN] Transferência de Arquivo")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "origem.bin")
+            dst = os.path.join(tmp, "destino.bin")
+            content = os.urandom(300 * 1024 + 123)
+            with open(src, 'wb') as f:
+                f.write(content)
+            
+            receiver = GBNReceiver(9045, window_size=16, delivery_capacity=32)
+            sender = GBNSender(('localhost', 9045), window_size=16, timeout=0.5)
+            sender.start()
+            
+            result = {}
+            recv_thread = threading.Thread(target=lambda: result.update(written=receiver.receive_file(dst, timeout=5)))
+            recv_thread.start()
+            
+            self.assertEqual(sender.send_file(src, chunk_size=1000), len(content))
+            self.assertTrue(sender.wait_for_completion(timeout=10))
+            recv_thread.join(timeout=10)
+            
+            self.assertEqual(result['written'], len(content))
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), content)
+            
+            sender.close()
+            receiver.close()
+        print("✓ GBN Transferência de Arquivo: PASSOU")
+    
+    def test_gbn_send_file_rejects_oversized_chunk(self):
+        """chunk_size maior que o datagrama do receptor é recusado antes de enviar"""
+        print("\n[TEST GBN] send_file com chunk_size excessivo")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "origem.bin")
+            with open(src, 'wb') as f:
+                f.write(os.urandom(8192))
+            
+            sender = GBNSender(('localhost', 9060), window_size=4, timeout=0.5)
+            self.assertEqual(sender.max_payload(), GBNReceiver.MAX_DATAGRAM - GBNPacket.HEADER_SIZE)
+            with self.assertRaises(ValueError):
+                sender.send_file(src, chunk_size=4096)
+            self.assertEqual(sender.next_seq_num, 0)
+            sender.close()
+        print("✓ chunk_size excessivo recusado: PASSOU")
+
+    def test_gbn_receive_data_wakes_immediately(self):
+        """receive_data e receive_data_async acordam na entrega, sem esperar o timeout"""
+        print("\n[TEST GBN] receive_data sem polling")
+        
+        receiver = GBNReceiver(9047, window_size=4)
+        sender = GBNSender(('localhost', 9047), window_size=4, timeout=1.0)
+        sender.start()
+        
+        # Leitor ja bloqueado antes do envio: o evento so dispara se a entrega o acordar
+        result = {}
+        woke = threading.Event()
+        def read():
+            result['data'] = receiver.receive_data(3, timeout=30)
+            woke.set()
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        
+        sender.send_data([b"E0", b"E1", b"E2"])
+        self.assertTrue(woke.wait(timeout=5), "receive_data deve acordar na entrega, não no timeout")
+        self.assertEqual(result['data'], [b"E0", b"E1", b"E2"])
+        reader.join(timeout=1)
+        
+        async def consume():
+            pending = asyncio.ensure_future(receiver.receive_data_async(2, timeout=30))
+            await asyncio.sleep(0.05)
+            self.assertFalse(pending.done())
+            sender.send_data([b"E3", b"E4"])
+            return await asyncio.wait_for(pending, timeout=5)
+        self.assertEqual(asyncio.run(consume()), [b"E3", b"E4"])
+        
+        # Timeout: retorna o que houver, sem bloquear o event loop
+        self.assertEqual(asyncio.run(receiver.receive_data_async(1, timeout=0.1)), [])
+        
+        sender.close()
+        receiver.close()
+        print("✓ GBN receive_data sem polling: PASSOU")
+
 
 class TestSR(unittest.TestCase):
     """Testes para o protocolo Selective Repeat"""
@@ -242,6 +497,43 @@ class TestSR(unittest.TestCase):
         receiver.close()
         print("✓ SR Bufferização: PASSOU")
     
+    def test_sr_buffered_drain_respects_delivery_space(self):
+        """Buffer de reordenação esvaziado em lote até o espaço livre da fila, sem cópia do payload"""
+        print("\n[TEST SR] Drenagem do Buffer Limitada pela Fila")
+        
+        receiver = SRReceiver(9059, window_size=8, delivery_capacity=3)
+        receiver.logger.verbose = False
+        peer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        peer.bind(('localhost', 0))
+        addr = peer.getsockname()
+        
+        def deliver(seq):
+            raw = SRPacket(SRPacket.TYPE_DATA, seq, f"R{seq}".encode()).to_bytes()
+            receiver._process_datagram(raw, addr)
+        
+        self.assertIsNone(receiver.buffer.slot_size)
+        for seq in range(1, 6):
+            deliver(seq)
+        self.assertEqual(len(receiver.buffer), 5)
+        
+        # seq 0 libera a sequencia contigua, mas so cabem 3 itens na fila
+        deliver(0)
+        self.assertEqual(receiver.expected_seq, 3)
+        self.assertEqual(len(receiver.buffer), 3)
+        
+        # Slots reusados por novas seqs nao alteram o que ja foi entregue
+        first = receiver.read(timeout=1)
+        deliver(9)
+        deliver(10)
+        rest = receiver.receive_data(5, timeout=1)
+        self.assertEqual([first] + rest, [f"R{seq}".encode() for seq in range(6)])
+        self.assertTrue(all(isinstance(item, bytes) for item in rest))
+        self.assertEqual(receiver.expected_seq, 6)
+        
+        peer.close()
+        receiver.close()
+        print("✓ Drenagem em lote do buffer: PASSOU")
+    
     def test_sr_individual_acks(self):
         """Teste que SR envia ACKs individuais"""
         print("\n[TEST SR] ACKs Individuais")
@@ -268,13 +560,579 @@ class TestSR(unittest.TestCase):
         recv_thread.join(timeout=5)
         
         # Verifica que ACKs individuais foram recebidos
-        self.assertEqual(len(sender.acked), 5, "Should have 5 individual ACKs")
+        self.assertEqual(sender.acks_received, 5, "Should have 5 individual ACKs")
         
         sender.close()
         receiver.close()
         print("✓ SR ACKs Individuais: PASSOU")
 
 
+    def test_sr_send_file(self):
+        """send_file no SR mantém estado apenas da janela"""
+        print("\n[TEST SR] Transferência de Arquivo")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "origem.bin")
+            dst = os.path.join(tmp, "destino.bin")
+            content = os.urandom(100 * 1024 + 7)
+            with open(src, 'wb') as f:
+                f.write(content)
+            
+            receiver = SRReceiver(9046, window_size=8)
+            sender = SRSender(('localhost', 9046), window_size=8, timeout=0.5)
+            
+            result = {}
+            recv_thread = threading.Thread(target=lambda: result.update(written=receiver.receive_file(dst, timeout=10)))
+            recv_thread.start()
+            
+            max_pending = []
+            def sample():
+                while recv_thread.is_alive():
+                    max_pending.append(sender.next_seq_num - sender.base)
+                    time.sleep(0.005)
+            sampler = threading.Thread(target=sample)
+            sampler.start()
+            
+            self.assertEqual(sender.send_file(src, chunk_size=1024), len(content))
+            recv_thread.join(timeout=10)
+            sampler.join(timeout=1)
+            
+            self.assertEqual(result['written'], len(content))
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), content)
+            self.assertLessEqual(max(max_pending), 8, "Estado do sender deve ser O(janela)")
+            self.assertEqual(sender.packets.slots, [None] * 8, "Slots liberados quando a base avança")
+            
+            sender.close()
+            receiver.close()
+        print("✓ SR Transferência de Arquivo: PASSOU")
+    
+    def test_sr_send_file_chunk_limit(self):
+        """chunk_size até o payload máximo chega íntegro; acima dele é recusado"""
+        print("\n[TEST SR] send_file no limite do datagrama")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "origem.bin")
+            dst = os.path.join(tmp, "destino.bin")
+            content = os.urandom(5 * 2039 + 11)
+            with open(src, 'wb') as f:
+                f.write(content)
+            
+            receiver = SRReceiver(9061, window_size=8)
+            sender = SRSender(('localhost', 9061), window_size=8, timeout=0.5)
+            max_payload = sender.max_payload()
+            self.assertEqual(max_payload, SRReceiver.MAX_DATAGRAM - SRPacket.HEADER_SIZE)
+            
+            with self.assertRaises(ValueError):
+                sender.send_file(src, chunk_size=max_payload + 1)
+            self.assertEqual(sender.next_seq_num, 0)
+            
+            result = {}
+            recv_thread = threading.Thread(target=lambda: result.update(written=receiver.receive_file(dst, timeout=10)))
+            recv_thread.start()
+            self.assertEqual(sender.send_file(src, chunk_size=max_payload), len(content))
+            recv_thread.join(timeout=10)
+            
+            self.assertEqual(result['written'], len(content))
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), content)
+            
+            sender.close()
+            receiver.close()
+        print("✓ Limite de chunk_size: PASSOU")
+    
+    def test_sr_streaming_write_bounded_memory(self):
+        """write() contínuo com fila limitada: memória não cresce com o número de pacotes"""
+        print("\n[TEST SR] Escrita em Fluxo com Memória O(janela)")
+        
+        num_packets = 30000
+        receiver = SRReceiver(9053, window_size=32)
+        sender = SRSender(('localhost', 9053), window_size=32, timeout=0.5, queue_capacity=64)
+        receiver.logger.verbose = False
+        sender.logger.verbose = False
+        
+        received = [0]
+        def consume():
+            while received[0] < num_packets:
+                count = len(receiver.receive_data(min(1000, num_packets - received[0]), timeout=10))
+                if not count:
+                    break
+                received[0] += count
+        recv_thread = threading.Thread(target=consume)
+        recv_thread.start()
+        
+        # Amostra a memória em pontos ociosos (tudo confirmado e consumido) a cada fase
+        samples = []
+        tracemalloc.start()
+        try:
+            for phase in range(6):
+                for _ in range(num_packets // 6):
+                    self.assertTrue(sender.write(b'S' * 64))
+                self.assertTrue(sender.wait_for_completion(timeout=30))
+                deadline = time.time() + 10
+                while received[0] < sender.written and time.time() < deadline:
+                    time.sleep(0.01)
+                samples.append(tracemalloc.get_traced_memory()[0])
+        finally:
+            tracemalloc.stop()
+        recv_thread.join(timeout=10)
+        
+        self.assertEqual(received[0], num_packets)
+        stats = sender.get_statistics()
+        self.assertEqual((stats['in_flight'], stats['queued']), (0, 0))
+        self.assertEqual(len(sender.packets.slots), 32)
+        growth = samples[-1] - samples[1]
+        self.assertLess(growth, 64 * 1024, "Memória deve ficar estável após o aquecimento")
+        
+        sender.close()
+        receiver.close()
+        print(f"✓ {num_packets} pacotes, crescimento de memória {growth} B: PASSOU")
+    
+    def test_sr_receiver_acks_without_reader(self):
+        """Thread de recepção do SR confirma e enfileira mesmo sem receive_data em andamento"""
+        print("\n[TEST SR] Recepção em Segundo Plano")
+        
+        receiver = SRReceiver(9054, window_size=16, delivery_capacity=256)
+        sender = SRSender(('localhost', 9054), window_size=16, timeout=0.5)
+        
+        test_data = [f"B{i}".encode() for i in range(200)]
+        # Ninguem le o receiver durante o envio: antes os dados ficavam no buffer do kernel
+        sender.send_data(test_data)
+        self.assertEqual(sender.get_statistics()['retransmissions'], 0)
+        self.assertEqual(receiver.get_statistics()['data_delivered'], 200)
+        
+        self.assertEqual(receiver.receive_data(100, timeout=1), test_data[:100])
+        self.assertEqual(receiver.read(timeout=1), test_data[100])
+        
+        items = []
+        for data in receiver:
+            items.append(data)
+            if len(items) == 99:
+                break
+        self.assertEqual(items, test_data[101:])
+        self.assertIsNone(receiver.read(timeout=0.1))
+        
+        sender.close()
+        receiver.close()
+        self.assertIsNone(receiver.read())
+        print("✓ SR Recepção em Segundo Plano: PASSOU")
+    
+    def test_sr_large_window_single_timer_thread(self):
+        """Janela de 512 com perdas: timers na roda, sem uma thread por pacote"""
+        print("\n[TEST SR] Janela Grande com Timer Wheel")
+        
+        # Perde 1 em cada 20 ACKs sem atraso (o atraso do UnreliableChannel usa threads)
+        class DropEveryNthChannel(UnreliableChannel):
+            def send(self, packet, dest_socket, dest_addr):
+                self.packets_sent += 1
+                if self.packets_sent % 20 == 0:
+                    self.packets_lost += 1
+                    return
+                dest_socket.sendto(packet, dest_addr)
+        
+        receiver = SRReceiver(9052, window_size=512, channel=DropEveryNthChannel(loss_rate=0.0))
+        sender = SRSender(('localhost', 9052), window_size=512, timeout=0.2)
+        
+        test_data = [f"W{i}".encode() for i in range(2000)]
+        received_data = []
+        recv_thread = threading.Thread(target=lambda: received_data.extend(receiver.receive_data(2000, timeout=30)))
+        recv_thread.start()
+        time.sleep(0.1)
+        
+        max_threads = []
+        def sample():
+            while recv_thread.is_alive():
+                max_threads.append(threading.active_count())
+                time.sleep(0.005)
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        
+        sender.send_data(test_data)
+        recv_thread.join(timeout=30)
+        sampler.join(timeout=1)
+        
+        self.assertEqual(received_data, test_data)
+        self.assertLess(max(max_threads), 20, "Timers nao devem criar threads por pacote")
+        self.assertGreater(sender.timer_wheel.expirations, 0, "Perdas devem disparar timeouts")
+        
+        sender.close()
+        receiver.close()
+        print(f"✓ Threads máx={max(max_threads)}, timeouts={sender.timer_wheel.expirations} "
+              f"em {sender.timer_wheel.batches} lotes: PASSOU")
+
+
+class TestDeliveryQueue(unittest.TestCase):
+    """Testes para a fila de entrega limitada"""
+    
+    def test_bounded_offer_and_cursors(self):
+        """Fila cheia recusa novos itens e reaproveita os slots"""
+        queue = DeliveryQueue(capacity=3)
+        
+        for i in range(3):
+            self.assertTrue(queue.offer(f"M{i}".encode()))
+        self.assertFalse(queue.offer(b"M3"), "Fila cheia deve aplicar backpressure")
+        
+        self.assertEqual(queue.read(timeout=0.1), b"M0")
+        self.assertTrue(queue.offer(b"M3"))
+        self.assertEqual(queue.drain(), [b"M1", b"M2", b"M3"])
+        self.assertEqual(queue.total_delivered, 4)
+        self.assertEqual(len(queue.slots), 3)
+    
+    def test_concurrent_put_never_loses_items(self):
+        """put() concorrente só retorna False em timeout: espera e push sob o mesmo lock"""
+        class SlowOfferQueue(DeliveryQueue):
+            # Alarga a janela entre a espera por vaga e a entrega
+            def offer(self, data):
+                time.sleep(0.05)
+                return super().offer(data)
+        
+        queue = SlowOfferQueue(capacity=1)
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(queue.put(bytes([i]), timeout=5)))
+                   for i in range(2)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        received = [queue.read(timeout=5), queue.read(timeout=5)]
+        for t in threads:
+            t.join(timeout=5)
+        
+        self.assertEqual(results, [True, True])
+        self.assertEqual(sorted(received), [b"\x00", b"\x01"])
+    
+    def test_read_into_partial(self):
+        """read_into copia para o buffer da aplicação e mantém o restante"""
+        queue = DeliveryQueue(capacity=2)
+        queue.offer(b"ABCDEFGH")
+        
+        buffer = bytearray(5)
+        n = queue.read_into(buffer, timeout=0.1)
+        self.assertEqual(bytes(buffer[:n]), b"ABCDE")
+        self.assertEqual(queue.read(timeout=0.1), b"FGH")
+        self.assertIsNone(queue.read(timeout=0.05))
+    
+    def test_callback_and_iterator(self):
+        """Consumidor por callback e por iterador"""
+        queue = DeliveryQueue(capacity=2)
+        queue.offer(b"pendente")
+        
+        consumed = []
+        queue.subscribe(consumed.append)
+        for i in range(5):
+            self.assertTrue(queue.offer(f"C{i}".encode()))
+        self.assertEqual(consumed, [b"pendente"] + [f"C{i}".encode() for i in range(5)])
+        
+        queue.unsubscribe()
+        queue.offer(b"I0")
+        queue.offer(b"I1")
+        queue.close()
+        self.assertEqual(list(queue), [b"I0", b"I1"])
+    
+    def test_gbn_backpressure_slow_consumer(self):
+        """Aplicação lenta: a fila nunca excede a capacidade e nada se perde"""
+        receiver = GBNReceiver(9033, window_size=4, delivery_capacity=4)
+        sender = GBNSender(('localhost', 9033), window_size=4, timeout=0.3)
+        sender.start()
+        
+        test_data = [f"BP{i:02d}".encode() for i in range(20)]
+        send_thread = threading.Thread(target=sender.send_data, args=(test_data,))
+        send_thread.start()
+        
+        received = []
+        max_pending = 0
+        while len(received) < len(test_data):
+            max_pending = max(max_pending, len(receiver.delivery))
+            item = receiver.read(timeout=10)
+            if item is None:
+                break
+            received.append(item)
+            time.sleep(0.02)
+        
+        send_thread.join(timeout=10)
+        
+        self.assertEqual(received, test_data)
+        self.assertLessEqual(max_pending, 4)
+        
+        sender.close()
+        receiver.close()
+
+
+class TestFlowEndpoint(unittest.TestCase):
+    """Testes de multiplexação de fluxos GBN/SR por flow-ID em um único socket"""
+    
+    def test_flow_id_header(self):
+        """Flow-ID opcional: cabeçalho antigo inalterado, novo protegido pelo checksum"""
+        legacy = GBNPacket(GBNPacket.TYPE_DATA, 7, b"x").to_bytes()
+        self.assertEqual(len(legacy), GBNPacket.HEADER_SIZE + 1)
+        self.assertIsNone(FlowEndpoint.peek_flow_id(legacy))
+        
+        raw = GBNPacket(GBNPacket.TYPE_ACK, 7, flow_id=4242).to_bytes()
+        packet, is_valid = GBNPacket.from_bytes(raw)
+        self.assertTrue(is_valid)
+        self.assertEqual((packet.packet_type, packet.flow_id, packet.seq_num), (GBNPacket.TYPE_ACK, 4242, 7))
+        self.assertEqual(FlowEndpoint.peek_flow_id(raw), 4242)
+        
+        tampered = bytearray(raw)
+        tampered[4] ^= 0x01
+        self.assertFalse(GBNPacket.from_bytes(bytes(tampered))[1])
+        
+        sr = SRPacket.from_bytes(SRPacket(SRPacket.TYPE_DATA, 3, b"y", flow_id=9).to_bytes())
+        self.assertEqual((sr.flow_id, sr.seq_num, sr.data), (9, 3, b"y"))
+    
+    def test_many_flows_one_socket(self):
+        """Dezenas de fluxos GBN e SR compartilham um socket e uma thread por endpoint"""
+        print("\n[TEST ENDPOINT] Fluxos Multiplexados")
+        
+        endpoint_a = FlowEndpoint(9048)
+        endpoint_b = FlowEndpoint(9049)
+        endpoint_a.logger.verbose = endpoint_b.logger.verbose = False
+        dest = ('localhost', 9049)
+        
+        flows = []
+        for flow_id in range(40):
+            receiver = GBNReceiver(None, window_size=4, endpoint=endpoint_b, flow_id=flow_id, ack_every=2)
+            sender = GBNSender(dest, window_size=4, timeout=0.5, endpoint=endpoint_a, flow_id=flow_id)
+            sender.start()
+            flows.append((sender, receiver))
+        for flow_id in range(40, 50):
+            receiver = SRReceiver(None, window_size=4, endpoint=endpoint_b, flow_id=flow_id)
+            sender = SRSender(dest, window_size=4, timeout=0.5, endpoint=endpoint_a, flow_id=flow_id)
+            flows.append((sender, receiver))
+        for sender, receiver in flows:
+            sender.logger.verbose = receiver.logger.verbose = False
+        
+        self.assertTrue(all(s.socket is endpoint_a.socket and r.socket is endpoint_b.socket for s, r in flows))
+        # Senders SR do endpoint: uma unica timer wheel
+        self.assertTrue(all(s.timer_wheel is endpoint_a.timers for s, _ in flows[40:]))
+        
+        def run(flow_id, sender):
+            sender.send_data([f"f{flow_id}-{i}".encode() for i in range(12)])
+        threads = [threading.Thread(target=run, args=(i, s)) for i, (s, _) in enumerate(flows)]
+        for t in threads:
+            t.start()
+        
+        for flow_id, (sender, receiver) in enumerate(flows):
+            expected = [f"f{flow_id}-{i}".encode() for i in range(12)]
+            self.assertEqual(receiver.receive_data(12, timeout=10), expected)
+        for t in threads:
+            t.join(timeout=10)
+        
+        stats = endpoint_b.get_statistics()
+        self.assertEqual(stats['receivers'], 50)
+        self.assertEqual(stats['unknown_flow'], 0)
+        
+        for sender, receiver in flows:
+            sender.close()
+            receiver.close()
+        self.assertEqual(endpoint_a.get_statistics()['senders'], 0)
+        endpoint_a.close()
+        endpoint_b.close()
+        print("✓ Endpoint: 50 fluxos em 2 sockets: PASSOU")
+    
+    def test_gbn_endpoint_timers_without_threads(self):
+        """Timer de retransmissão GBN no loop do endpoint: perdas recuperadas sem threads por fluxo"""
+        print("\n[TEST ENDPOINT] Timers GBN no Endpoint")
+        
+        # Canal sincrono (sem threads de atraso) que perde o primeiro pacote de dados de cada fluxo
+        class DropFirstChannel(UnreliableChannel):
+            dropped = False
+            def send(self, packet, dest_socket, dest_addr):
+                if not self.dropped:
+                    self.dropped = True
+                    return
+                dest_socket.sendto(packet, dest_addr)
+        
+        endpoint_a = FlowEndpoint(9055)
+        endpoint_b = FlowEndpoint(9056)
+        endpoint_a.logger.verbose = endpoint_b.logger.verbose = False
+        baseline = threading.active_count()
+        
+        flows = []
+        for flow_id in range(30):
+            receiver = GBNReceiver(None, window_size=4, endpoint=endpoint_b, flow_id=flow_id)
+            sender = GBNSender(('localhost', 9056), window_size=4, timeout=0.3, channel=DropFirstChannel(),
+                               endpoint=endpoint_a, flow_id=flow_id)
+            sender.logger.verbose = receiver.logger.verbose = False
+            sender.start()
+            flows.append((sender, receiver))
+        
+        for flow_id, (sender, _) in enumerate(flows):
+            sender.send_data([f"t{flow_id}-{i}".encode() for i in range(3)])
+        peak = threading.active_count()
+        
+        for flow_id, (sender, receiver) in enumerate(flows):
+            self.assertTrue(sender.wait_for_completion(timeout=10))
+            self.assertEqual(receiver.receive_data(3, timeout=5), [f"t{flow_id}-{i}".encode() for i in range(3)])
+            self.assertGreaterEqual(sender.get_statistics()['timeouts'], 1)
+            peak = max(peak, threading.active_count())
+        
+        # Um threading.Timer por fluxo somaria 30 threads
+        self.assertLessEqual(peak, baseline)
+        
+        for sender, receiver in flows:
+            sender.close()
+            receiver.close()
+        endpoint_a.close()
+        endpoint_b.close()
+        print(f"✓ Endpoint: 30 fluxos GBN recuperados por timeout com {peak} threads: PASSOU")
+    
+    def test_sr_flows_without_threads_per_sender(self):
+        """200 fluxos SR num endpoint: envio puxado por write()/ACKs e uma timer wheel compartilhada"""
+        print("\n[TEST ENDPOINT] Fluxos SR sem Threads por Sender")
+        
+        endpoint_a = FlowEndpoint(9057)
+        endpoint_b = FlowEndpoint(9058)
+        endpoint_a.logger.verbose = endpoint_b.logger.verbose = False
+        baseline = threading.active_count()
+        
+        flows = []
+        for flow_id in range(200):
+            receiver = SRReceiver(None, window_size=4, endpoint=endpoint_b, flow_id=flow_id)
+            sender = SRSender(('localhost', 9058), window_size=4, timeout=0.5, endpoint=endpoint_a,
+                              flow_id=flow_id, queue_capacity=8)
+            sender.logger.verbose = receiver.logger.verbose = False
+            flows.append((sender, receiver))
+        
+        for flow_id, (sender, _) in enumerate(flows):
+            for i in range(6):
+                self.assertTrue(sender.write(f"s{flow_id}-{i}".encode(), timeout=5))
+        threads = threading.active_count()
+        
+        for flow_id, (sender, receiver) in enumerate(flows):
+            self.assertTrue(sender.wait_for_completion(timeout=10))
+            self.assertEqual(receiver.receive_data(6, timeout=5), [f"s{flow_id}-{i}".encode() for i in range(6)])
+        
+        # So a thread da timer wheel do endpoint (antes: 2 threads por sender)
+        self.assertLessEqual(threads, baseline + 1)
+        
+        for sender, receiver in flows:
+            sender.close()
+            receiver.close()
+        endpoint_a.close()
+        endpoint_b.close()
+        print(f"✓ Endpoint: 200 fluxos SR com {threads} threads: PASSOU")
+
+
+class TestBufferPool(unittest.TestCase):
+    """Testes do pool de buffers de recepção (recvfrom_into + decodificação por memoryview)"""
+    
+    def test_pool_reuses_slabs(self):
+        pool = BufferPool(slab_size=2048, max_free=2)
+        with pool.slab() as first:
+            pass
+        with pool.slab() as second:
+            self.assertIs(first, second)
+        self.assertEqual(pool.allocated, 1)
+    
+    def test_allocations_per_packet(self):
+        """tracemalloc: pico de memória por ACK recebido cai com o slab reutilizado"""
+        print("\n[TEST POOL] Alocações por Pacote")
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(('localhost', 0))
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        ack = GBNPacket(GBNPacket.TYPE_ACK, 42).to_bytes()
+        pool = BufferPool()
+        
+        def median_peak(receive, count=50):
+            peaks = []
+            tracemalloc.start()
+            try:
+                for _ in range(count):
+                    tx.sendto(ack, rx.getsockname())
+                    time.sleep(0.001)
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    packet, is_valid = receive()
+                    self.assertTrue(is_valid and packet.seq_num == 42)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            finally:
+                tracemalloc.stop()
+            return sorted(peaks)[len(peaks) // 2]
+        
+        legacy = median_peak(lambda: GBNPacket.from_bytes(rx.recvfrom(65535)[0]))
+        with pool.slab() as slab:
+            pooled = median_peak(lambda: GBNPacket.from_bytes(recv_view(rx, slab)[0]))
+        
+        rx.close()
+        tx.close()
+        self.assertGreater(legacy, 60000, "recvfrom(65535) aloca o buffer inteiro")
+        self.assertLess(pooled, 2048)
+        print(f"✓ Pico por ACK: recvfrom={legacy} B, pool={pooled} B: PASSOU")
+
+
+class TestTimerWheel(unittest.TestCase):
+    """Testes da timer wheel usada pelo SR"""
+    
+    def test_arm_cancel_and_batch(self):
+        expired = []
+        done = threading.Event()
+        def on_expire(keys):
+            expired.extend(keys)
+            if len(expired) >= 100:
+                done.set()
+        wheel = TimerWheel(on_expire, tick=0.005, slots=8)
+        
+        start = time.monotonic()
+        for key in range(150):
+            wheel.arm(key, 0.05)
+        for key in range(100, 150):
+            wheel.cancel(key)
+        # Rearmar substitui o prazo anterior (sem expiracao duplicada)
+        wheel.arm(0, 0.08)
+        
+        self.assertTrue(done.wait(2.0))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        time.sleep(0.05)
+        wheel.stop()
+        
+        self.assertEqual(sorted(expired), list(range(100)))
+        self.assertLess(wheel.batches, 10, "Prazos iguais devem expirar em lote")
+        self.assertEqual(len(wheel), 0)
+    
+    def test_deadline_beyond_one_revolution(self):
+        expired = []
+        wheel = TimerWheel(expired.extend, tick=0.005, slots=4)
+        wheel.arm('longo', 0.1)
+        time.sleep(0.05)
+        self.assertEqual(expired, [], "Prazo alem de uma volta nao expira cedo")
+        time.sleep(0.1)
+        wheel.stop()
+        self.assertEqual(expired, ['longo'])
+
+
+class TestReorderBuffer(unittest.TestCase):
+    """Testes do buffer de reordenação circular do SR"""
+    
+    def test_insert_and_contiguous_drain(self):
+        buffer = ReorderBuffer(8)
+        for seq in (13, 11, 10, 15):
+            self.assertTrue(buffer.insert(seq, f"P{seq}".encode()))
+        self.assertFalse(buffer.insert(11, b"dup"), "Slot ocupado não é sobrescrito")
+        self.assertEqual(len(buffer), 4)
+        self.assertIn(13, buffer)
+        self.assertNotIn(12, buffer)
+        
+        self.assertEqual(buffer.drain(10), [b"P10", b"P11"])
+        self.assertEqual(buffer.drain(12), [])
+        buffer.insert(12, b"P12")
+        self.assertEqual(buffer.drain(12, max_items=1), [b"P12"])
+        self.assertEqual(buffer.drain(13), [b"P13"])
+        # Seq que dá a volta no ring reutiliza o slot liberado
+        self.assertTrue(buffer.insert(18, b"P18"))
+        self.assertEqual(len(buffer), 2)
+    
+    def test_arena_slots_return_memoryview(self):
+        buffer = ReorderBuffer(4, slot_size=16)
+        buffer.insert(1, memoryview(b"abc"))
+        buffer.insert(2, b"")
+        view = buffer.get(1)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(view), b"abc")
+        self.assertEqual([bytes(v) for v in buffer.drain(1)], [b"abc", b""])
+        with self.assertRaises(ValueError):
+            buffer.insert(3, b"x" * 17)
+
+
 class TestComparison(unittest.TestCase):
     """Testes comparativos entre GBN e SR"""
     
@@ -786,6 +1644,11 @@ def run_tests():
     # Adiciona testes básicos
     suite.addTests(loader.loadTestsFromTestCase(TestGBN))
     suite.addTests(loader.loadTestsFromTestCase(TestSR))
+    suite.addTests(loader.loadTestsFromTestCase(TestDeliveryQueue))
+    suite.addTests(loader.loadTestsFromTestCase(TestFlowEndpoint))
+    suite.addTests(loader.loadTestsFromTestCase(TestBufferPool))
+    suite.addTests(loader.loadTestsFromTestCase(TestTimerWheel))
+    suite.addTests(loader.loadTestsFromTestCase(TestReorderBuffer))
     suite.addTests(loader.loadTestsFromTestCase(TestComparison))
     
     # Adiciona testes obrigatórios
@@ -6,6 +6,9 @@ Inclui:
 - Testes Obrigatórios: Conforme especificação 3.3.3 do EFC 02
 """
 
+import asyncio
+import contextlib
+import io
 import unittest
 import threading
 import time
@@ -16,8 +19,17 @@ import socket as real_socket
 # Adicionar diretório pai ao path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from fase3.tcp import SimpleTCPSocket
+from fase3.tcp import SimpleTCPSocket, IncompleteReadError
+from fase3.tcp_streams import open_simple_connection, start_simple_server
+from fase3.congestion_control import (
+    RenoCongestionControl,
+    NewRenoCongestionControl,
+    CubicCongestionControl,
+    create_congestion_control,
+)
 from utils.simulator import UnreliableChannel
+from utils.tcp_segment import TCPSegment
+from utils.byte_ring import ByteRing
 
 
 class TestTCPBasic(unittest.TestCase):
@@ -36,12 +48,15 @@ class TestTCPBasic(unittest.TestCase):
         # Criar servidor
         server = SimpleTCPSocket(5000, verbose=False)
         server.listen()
+        # O servidor so fecha depois da verificacao do cliente (senao o cliente ja estaria em CLOSE_WAIT)
+        client_checked = threading.Event()
         
         # Função do servidor
         def server_thread():
             conn, addr = server.accept()
             if conn:
                 self.assertEqual(conn.state, SimpleTCPSocket.ESTABLISHED)
+                client_checked.wait(timeout=5.0)
                 conn.close()
         
         # Iniciar servidor em thread
@@ -57,6 +72,7 @@ class TestTCPBasic(unittest.TestCase):
         
         self.assertTrue(success)
         self.assertEqual(client.state, SimpleTCPSocket.ESTABLISHED)
+        client_checked.set()
         
         # Aguardar servidor
         thread.join(timeout=2.0)
@@ -424,6 +440,7 @@ class TestTCPFlowControl(unittest.TestCase):
         
         start_time = time.time()
         bytes_sent = client.send(test_data)
+        self.assertTrue(client.drain(timeout=10.0))
         elapsed = time.time() - start_time
         
         thread.join(timeout=10.0)
@@ -439,8 +456,1444 @@ class TestTCPFlowControl(unittest.TestCase):
         server.close()
         
         print(f"✓ 10 KB transferidos em {elapsed:.2f}s ({throughput:.1f} KB/s)")
+    
+    def test_pipelined_send_window(self):
+        """Testa janela deslizante: vários segmentos em trânsito limitados por min(cwnd, rwnd)"""
+        print("\n=== Teste: Janela de Envio com Pipelining (64 KB, atraso 10 ms) ===")
+        
+        test_data = os.urandom(64 * 1024)
+        received_data = []
+        channel = UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.01, 0.01))
+        
+        server = SimpleTCPSocket(5008, channel=channel, verbose=False)
+        server.listen()
+        
+        def server_thread():
+            conn, addr = server.accept()
+            if conn:
+                data = b''
+                while len(data) < len(test_data):
+                    chunk = conn.recv(65536, timeout=5.0)
+                    if not chunk:
+                        break
+                    data += chunk
+                received_data.append(data)
+                conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        
+        time.sleep(0.1)
+        
+        client = SimpleTCPSocket(channel=channel, verbose=False)
+        client.connect('localhost', 5008)
+        
+        max_in_flight = []
+        sending = threading.Event()
+        def sample():
+            while not sending.is_set():
+                max_in_flight.append(client.get_statistics()['bytes_in_flight'])
+                time.sleep(0.002)
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        
+        start_time = time.time()
+        self.assertEqual(client.send(test_data), len(test_data))
+        self.assertTrue(client.drain(timeout=10.0))
+        elapsed = time.time() - start_time
+        sending.set()
+        sampler.join(timeout=1.0)
+        
+        thread.join(timeout=10.0)
+        
+        self.assertEqual(received_data, [test_data])
+        self.assertGreater(max(max_in_flight), SimpleTCPSocket.MSS, "Mais de um segmento em trânsito")
+        # cwnd pode encolher com bytes ja em transito: o limite e o maior cwnd alcancado
+        # (rwnd varia com a leitura do servidor; o maximo anunciavel e BUFFER_SIZE)
+        peak_cwnd = max(cwnd for _, cwnd in client.get_cwnd_history())
+        self.assertLessEqual(max(max_in_flight), min(peak_cwnd, SimpleTCPSocket.BUFFER_SIZE))
+        self.assertEqual(len(client.unacked), 0)
+        # 45 segmentos em stop-and-wait levariam ~0.9s (RTT de 20 ms)
+        self.assertLess(elapsed, 0.9)
+        
+        client.close()
+        server.close()
+        
+        print(f"✓ 64 KB em {elapsed:.2f}s, até {max(max_in_flight)} bytes em trânsito")
+    
+    def test_zero_window_slow_consumer(self):
+        """Testa janela anunciada dinâmica: leitor parado fecha a janela, sondas e atualizações a reabrem"""
+        print("\n=== Teste: Janela Zero com Leitor Lento (512 KB) ===")
+        
+        test_data = os.urandom(512 * 1024)
+        results = {}
+        
+        server = SimpleTCPSocket(5016, verbose=False)
+        server.listen()
+        
+        def server_thread():
+            conn, addr = server.accept()
+            if conn:
+                results['sent'] = conn.send(test_data)
+                conn.drain(timeout=30.0)
+                results['stats'] = conn.get_statistics()
+                conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        
+        time.sleep(0.1)
+        
+        client = SimpleTCPSocket(verbose=False)
+        client.connect('localhost', 5016)
+        
+        # Leitor parado: o buffer enche ate a janela fechar e o emissor passa a sondar
+        time.sleep(1.5)
+        stalled = client.get_statistics()
+        self.assertLessEqual(stalled['recv_buffered'] + stalled['out_of_order_buffered'], SimpleTCPSocket.BUFFER_SIZE)
+        self.assertEqual(stalled['advertised_window'], 0)
+        
+        received = bytearray()
+        peak_buffered = 0
+        while len(received) < len(test_data):
+            chunk = client.recv(4096, timeout=5.0)
+            if not chunk:
+                break
+            received += chunk
+            peak_buffered = max(peak_buffered, client.get_statistics()['recv_buffered'])
+        
+        thread.join(timeout=10.0)
+        client.close()
+        server.close()
+        
+        self.assertEqual(bytes(received), test_data)
+        self.assertEqual(results['sent'], len(test_data))
+        self.assertLessEqual(peak_buffered, SimpleTCPSocket.BUFFER_SIZE)
+        self.assertEqual(client.recv_ring.grows, 0, "Ring de recepção não deve crescer")
+        self.assertGreaterEqual(results['stats']['window_probes'], 1)
+        self.assertGreater(client.get_statistics()['window_updates'], 0)
+        
+        print(f"✓ 512 KB íntegros com até {peak_buffered} bytes em buffer; "
+              f"{results['stats']['window_probes']} sondas de janela zero")
+
+
+class TestCongestionControl(unittest.TestCase):
+    """Testes dos módulos de controle de congestionamento (sem rede)"""
+    
+    MSS = 1000
+    
+    def test_slow_start_and_initial_window(self):
+        """Testa janela inicial configurável e crescimento exponencial no slow start"""
+        print("\n=== Teste: Slow Start ===")
+        
+        cc = RenoCongestionControl(self.MSS, initial_window=2)
+        self.assertEqual(cc.cwnd, 2 * self.MSS)
+        
+        # Uma janela inteira confirmada (um ACK por segmento) dobra cwnd
+        for _ in range(2):
+            cc.on_ack(self.MSS, 0, 0.0)
+        self.assertEqual(cc.cwnd, 4 * self.MSS)
+        
+        # ACK atrasado cobrindo dois segmentos: 2 MSS (ABC, RFC 3465), limitado a 2 MSS por ACK
+        cc.on_ack(2 * self.MSS, 0, 0.0)
+        self.assertEqual(cc.cwnd, 6 * self.MSS)
+        cc.on_ack(4 * self.MSS, 0, 0.0)
+        self.assertEqual(cc.cwnd, 8 * self.MSS)
+        
+        with self.assertRaises(ValueError):
+            create_congestion_control('vegas', self.MSS)
+        with self.assertRaises(ValueError):
+            RenoCongestionControl(self.MSS, initial_window=0)
+        
+        print("✓ Slow start dobra cwnd por RTT a partir da janela inicial")
+    
+    def test_reno_fast_recovery_and_timeout(self):
+        """Testa Reno: metade da janela em 3 ACKs duplicados, 1 MSS no timeout"""
+        print("\n=== Teste: Reno ===")
+        
+        cc = RenoCongestionControl(self.MSS, initial_window=10)
+        cc.on_loss(10 * self.MSS, recover=50000, now=0.0)
+        self.assertTrue(cc.in_recovery)
+        self.assertEqual(cc.ssthresh, 5 * self.MSS)
+        self.assertEqual(cc.cwnd, 8 * self.MSS)
+        
+        cc.on_dup_ack()
+        self.assertEqual(cc.cwnd, 9 * self.MSS)
+        
+        # Reno sai da recuperacao no primeiro ACK novo, mesmo parcial
+        self.assertFalse(cc.on_ack(self.MSS, 1000, 0.1))
+        self.assertFalse(cc.in_recovery)
+        self.assertEqual(cc.cwnd, 5 * self.MSS)
+        
+        # Prevencao de congestionamento: ~1 MSS por janela
+        for _ in range(5):
+            cc.on_ack(self.MSS, 0, 0.2)
+        self.assertAlmostEqual(cc.cwnd, 6 * self.MSS, delta=0.1 * self.MSS)
+        
+        cc.on_timeout(6 * self.MSS, now=0.3)
+        self.assertEqual(cc.cwnd, self.MSS)
+        self.assertEqual(cc.ssthresh, 3 * self.MSS)
+        
+        print("✓ Reno: fast recovery e timeout")
+    
+    def test_newreno_partial_ack(self):
+        """Testa NewReno: ACK parcial pede retransmissão e mantém a recuperação"""
+        print("\n=== Teste: NewReno ===")
+        
+        cc = NewRenoCongestionControl(self.MSS, initial_window=10)
+        cc.on_loss(10 * self.MSS, recover=10000, now=0.0)
+        
+        self.assertTrue(cc.on_ack(2 * self.MSS, 2000, 0.1))
+        self.assertTrue(cc.in_recovery)
+        
+        self.assertFalse(cc.on_ack(8 * self.MSS, 10000, 0.2))
+        self.assertFalse(cc.in_recovery)
+        self.assertEqual(cc.cwnd, cc.ssthresh)
+        
+        print("✓ NewReno: recuperação só termina no ACK de recover")
+    
+    def test_cubic_reduction_and_regrowth(self):
+        """Testa CUBIC: redução para 0.7 * cwnd e retorno a W_max ao longo da curva"""
+        print("\n=== Teste: CUBIC ===")
+        
+        cc = CubicCongestionControl(self.MSS, initial_window=100)
+        cc.ssthresh = 50 * self.MSS
+        cc.on_loss(100 * self.MSS, recover=1, now=0.0)
+        self.assertEqual(cc.ssthresh, 70 * self.MSS)
+        self.assertEqual(cc.w_max, 100)
+        cc.on_ack(self.MSS, 1, 0.0)
+        self.assertEqual(cc.cwnd, 70 * self.MSS)
+        
+        # K = cbrt(30 / 0.4) ~ 4.2 s: antes de K a janela fica abaixo de W_max, depois passa
+        now = 0.0
+        while now < 4.0:
+            now += 0.01
+            cc.on_ack(self.MSS, 1, now)
+        self.assertLess(cc.cwnd, 100 * self.MSS)
+        self.assertGreater(cc.cwnd, 90 * self.MSS)
+        while now < 8.0:
+            now += 0.01
+            cc.on_ack(self.MSS, 1, now)
+        self.assertGreater(cc.cwnd, 100 * self.MSS)
+        
+        print(f"✓ CUBIC: W_max=100 segmentos, K={cc.k:.2f}s, cwnd final={cc.cwnd / self.MSS:.1f} segmentos")
+
+
+class TestTCPCongestionControl(unittest.TestCase):
+    """Testes do controle de congestionamento no SimpleTCPSocket"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_fast_retransmit_per_algorithm(self):
+        """Testa perda isolada recuperada por fast retransmit com cada algoritmo"""
+        print("\n=== Teste: Fast Retransmit (Reno, NewReno, CUBIC) ===")
+        
+        # Descarta uma vez o 30o segmento de dados (ACKs e handshake passam)
+        class DropOnceChannel(UnreliableChannel):
+            def send(self, packet, dest_socket, dest_addr):
+                if len(packet) > 100:
+                    self.packets_sent += 1
+                    if self.packets_sent == 30:
+                        self.packets_lost += 1
+                        return
+                dest_socket.sendto(packet, dest_addr)
+        
+        test_data = os.urandom(128 * 1024)
+        for port, algorithm in ((5009, 'reno'), (5010, 'newreno'), (5011, 'cubic')):
+            with self.subTest(algorithm=algorithm):
+                channel = DropOnceChannel(loss_rate=0.0)
+                server = SimpleTCPSocket(port, channel=channel, verbose=False, congestion_control=algorithm)
+                server.listen()
+                received_data = []
+                
+                def server_thread():
+                    conn, addr = server.accept()
+                    if conn:
+                        data = b''
+                        while len(data) < len(test_data):
+                            chunk = conn.recv(65536, timeout=5.0)
+                            if not chunk:
+                                break
+                            data += chunk
+                        received_data.append(data)
+                        conn.close()
+                
+                thread = threading.Thread(target=server_thread, daemon=True)
+                thread.start()
+                time.sleep(0.1)
+                
+                client = SimpleTCPSocket(channel=channel, verbose=False,
+                                         congestion_control=algorithm, initial_window=4)
+                client.connect('localhost', port)
+                self.assertEqual(client.send(test_data), len(test_data))
+                self.assertTrue(client.drain(timeout=30.0))
+                stats = client.get_statistics()
+                history = [cwnd for _, cwnd in client.get_cwnd_history()]
+                peak = history.index(max(history))
+                
+                # Fechamento ativo pelo cliente: o servidor le o restante em CLOSE_WAIT
+                client.close()
+                thread.join(timeout=10.0)
+                server.close()
+                
+                self.assertEqual(received_data, [test_data])
+                self.assertEqual(stats['congestion_control'], algorithm)
+                self.assertEqual(history[0], 4 * SimpleTCPSocket.MSS)
+                # >= 1: reordenacao entre as threads de leitura do listener pode gerar outro
+                self.assertGreaterEqual(stats['fast_retransmissions'], 1)
+                self.assertLess(stats['ssthresh'], max(history))
+                self.assertLess(min(history[peak:]), max(history), "Perda deve reduzir cwnd")
+                
+                print(f"✓ {algorithm}: pico cwnd={max(history) / SimpleTCPSocket.MSS:.1f} MSS, "
+                      f"ssthresh={stats['ssthresh'] / SimpleTCPSocket.MSS:.1f} MSS, "
+                      f"{stats['retransmissions']} retransmissões")
+
+
+class TestTCPRTTEstimation(unittest.TestCase):
+    """Testes da estimativa de RTT com amostras reais (RFC 6298 + Karn)"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def _connect_pair(self, port, channel):
+        server = SimpleTCPSocket(port, channel=channel, verbose=False)
+        server.listen()
+        received = []
+        
+        def server_thread():
+            conn, addr = server.accept()
+            if conn:
+                received.append(conn)
+                while True:
+                    chunk = conn.recv(65536, timeout=5.0)
+                    if not chunk:
+                        break
+                conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        
+        client = SimpleTCPSocket(channel=channel, verbose=False)
+        self.assertTrue(client.connect('localhost', port))
+        return server, client, thread, received
+    
+    def test_rtt_converges_to_channel_delay(self):
+        """Testa convergência de estimated_rtt e timeout_interval em canais de atraso conhecido"""
+        print("\n=== Teste: Convergência do RTT (atraso 10 ms e 50 ms) ===")
+        
+        for port, delay in ((5012, 0.01), (5013, 0.05)):
+            with self.subTest(delay=delay):
+                channel = UnreliableChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(delay, delay))
+                server, client, thread, accepted = self._connect_pair(port, channel)
+                
+                # Amostra do handshake ja substitui o RTO inicial de 1 s
+                self.assertEqual(client.rtt_samples, 1)
+                self.assertLess(client.timeout_interval, SimpleTCPSocket.INITIAL_TIMEOUT)
+                
+                self.assertEqual(client.send(os.urandom(64 * 1024)), 64 * 1024)
+                self.assertTrue(client.drain(timeout=10.0))
+                stats = client.get_statistics()
+                server_stats = accepted[0].get_statistics()
+                
+                client.close()
+                thread.join(timeout=10.0)
+                server.close()
+                
+                rtt = 2 * delay
+                # Uma amostra por ACK; com ACK atrasado, um ACK a cada dois segmentos
+                self.assertGreater(stats['rtt_samples'], 5)
+                self.assertGreaterEqual(stats['estimated_rtt'], rtt * 0.9)
+                self.assertLess(stats['estimated_rtt'], rtt + 0.02)
+                self.assertGreaterEqual(stats['timeout_interval'], stats['estimated_rtt'])
+                self.assertLessEqual(stats['timeout_interval'], max(SimpleTCPSocket.MIN_TIMEOUT, rtt * 2))
+                # Servidor: amostra SYN-ACK -> ACK final
+                self.assertEqual(server_stats['rtt_samples'], 1)
+                self.assertLess(abs(server_stats['estimated_rtt'] - rtt), 0.02)
+                
+                print(f"✓ atraso {delay * 1000:.0f} ms: estimated_rtt={stats['estimated_rtt'] * 1000:.1f} ms, "
+                      f"timeout={stats['timeout_interval'] * 1000:.0f} ms, {stats['rtt_samples']} amostras")
+    
+    def test_karn_excludes_retransmitted_segments(self):
+        """Testa regra de Karn: ACK de segmento retransmitido não gera amostra e o RTO dobra"""
+        print("\n=== Teste: Regra de Karn ===")
+        
+        # Descarta uma vez o primeiro segmento de dados: so o timeout o recupera
+        class DropFirstDataChannel(UnreliableChannel):
+            dropped = False
+            def send(self, packet, dest_socket, dest_addr):
+                if len(packet) > 100 and not self.dropped:
+                    self.dropped = True
+                    return
+                super().send(packet, dest_socket, dest_addr)
+        
+        channel = DropFirstDataChannel(loss_rate=0.0, corrupt_rate=0.0, delay_range=(0.01, 0.01))
+        server, client, thread, accepted = self._connect_pair(5014, channel)
+        
+        samples = []
+        update_rtt = client._update_rtt
+        def record(sample_rtt):
+            samples.append(sample_rtt)
+            update_rtt(sample_rtt)
+        client._update_rtt = record
+        
+        self.assertEqual(client.send(b'K' * 1000), 1000)
+        self.assertTrue(client.drain(timeout=5.0))
+        self.assertEqual(client.retransmissions, 1)
+        self.assertEqual(samples, [], "ACK do segmento retransmitido é ambíguo")
+        self.assertEqual(client.timeout_interval, 2 * SimpleTCPSocket.MIN_TIMEOUT, "Backoff após timeout")
+        
+        self.assertEqual(client.send(b'L' * 1000), 1000)
+        self.assertTrue(client.drain(timeout=5.0))
+        self.assertEqual(len(samples), 1)
+        self.assertLess(samples[0], 0.1)
+        self.assertEqual(client.timeout_interval, SimpleTCPSocket.MIN_TIMEOUT)
+        
+        client.close()
+        thread.join(timeout=10.0)
+        server.close()
+        
+        print(f"✓ amostra retransmitida descartada; próxima amostra={samples[0] * 1000:.1f} ms")
+
+
+class TestByteRing(unittest.TestCase):
+    """Testes do ring de bytes do caminho de recepção"""
+    
+    def test_wraparound_read_paths(self):
+        """Testa escrita/leitura que dão a volta no ring por read, read_into e peek/consume"""
+        ring = ByteRing(8)
+        ring.write(b"abcdef")
+        self.assertEqual(ring.read(4), b"abcd")
+        # 'ghij' ocupa o fim e o inicio da arena
+        ring.write(b"ghij")
+        self.assertEqual(len(ring), 6)
+        self.assertEqual(ring.free_space(), 2)
+        
+        view = ring.peek(10)
+        self.assertIsInstance(view, memoryview)
+        self.assertEqual(bytes(view), b"efgh", "peek só devolve a parte contígua")
+        ring.consume(1)
+        
+        dest = bytearray(4)
+        self.assertEqual(ring.read_into(dest), 4)
+        self.assertEqual(dest, b"fghi")
+        self.assertEqual(ring.read(10), b"j")
+        self.assertEqual(ring.head, 0, "Ring vazio volta ao início")
+        with self.assertRaises(ValueError):
+            ring.consume(1)
+    
+    def test_grows_when_full(self):
+        """Testa crescimento preservando a ordem e views antigas"""
+        ring = ByteRing(4)
+        ring.write(b"xyab")
+        ring.read(2)
+        old_view = ring.peek(2)
+        ring.write(b"cdefgh")
+        self.assertEqual(ring.grows, 1)
+        self.assertEqual(ring.capacity, 8)
+        self.assertEqual(bytes(old_view), b"ab")
+        self.assertEqual(ring.read(8), b"abcdefgh")
+
+
+class TestTCPReceivePath(unittest.TestCase):
+    """Testes das APIs de recepção sem cópia (recv_into, recv_view, readexactly)"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_recv_into_view_and_readexactly(self):
+        """Testa recv_into, recv_view e readexactly sobre uma transferência de 256 KB"""
+        print("\n=== Teste: recv_into / recv_view / readexactly ===")
+        
+        test_data = os.urandom(256 * 1024)
+        server = SimpleTCPSocket(5015, verbose=False)
+        server.listen()
+        results = {}
+        
+        def server_thread():
+            conn, addr = server.accept()
+            if not conn:
+                return
+            header = conn.readexactly(10, timeout=5.0)
+            buffer = bytearray(64 * 1024)
+            body = bytearray()
+            while len(body) < 128 * 1024:
+                n = conn.recv_into(memoryview(buffer)[:128 * 1024 - len(body)], timeout=5.0)
+                if not n:
+                    break
+                body += buffer[:n]
+            views = bytearray()
+            while len(views) < len(test_data) - 10 - len(body):
+                view = conn.recv_view(min(4096, len(test_data) - 10 - len(body) - len(views)), timeout=5.0)
+                if not view:
+                    break
+                self.assertIsInstance(view, memoryview)
+                views += view
+            conn.release_view()
+            results['parts'] = (header, bytes(body), bytes(views))
+            # Peer fecha sem enviar o restante pedido
+            try:
+                conn.readexactly(100, timeout=5.0)
+            except IncompleteReadError as e:
+                results['incomplete'] = e
+            conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        
+        client = SimpleTCPSocket(verbose=False)
+        client.connect('localhost', 5015)
+        client.send(test_data)
+        client.send(b"tail")
+        client.close()
+        thread.join(timeout=10.0)
+        server.close()
+        
+        header, body, views = results['parts']
+        self.assertEqual(header + body + views, test_data)
+        self.assertEqual(len(body), 128 * 1024)
+        self.assertEqual(results['incomplete'].partial, b"tail")
+        self.assertEqual(results['incomplete'].expected, 100)
+        
+        print(f"✓ {len(test_data)} bytes lidos por readexactly + recv_into + recv_view; fim parcial: {results['incomplete']}")
+
+
+class TestTCPMultiplexedListener(unittest.TestCase):
+    """Testes do listener com uma única thread de recepção e tabela de conexões"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_concurrent_connections_single_reader(self):
+        """Testa 20 conexões simultâneas em eco, demultiplexadas pela 4-tupla numa única thread"""
+        print("\n=== Teste: Listener Multiplexado (20 conexões em eco) ===")
+        
+        num_clients = 20
+        server = SimpleTCPSocket(5017, verbose=False)
+        server.listen()
+        accepted = []
+        
+        def echo(conn):
+            data = conn.recv(4096, timeout=5.0)
+            conn.send(data)
+            # Aguarda o FIN do cliente antes de fechar
+            conn.recv(4096, timeout=5.0)
+            conn.close()
+        
+        def server_thread():
+            workers = []
+            for _ in range(num_clients):
+                conn, addr = server.accept()
+                if not conn:
+                    break
+                accepted.append(conn)
+                worker = threading.Thread(target=echo, args=(conn,), daemon=True)
+                worker.start()
+                workers.append(worker)
+            for worker in workers:
+                worker.join(timeout=10.0)
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        
+        time.sleep(0.1)
+        
+        results = {}
+        clients = []
+        
+        def client_thread(i):
+            client = SimpleTCPSocket(verbose=False)
+            clients.append(client)
+            if client.connect('localhost', 5017):
+                message = f"cliente {i} ".encode() * (i + 1)
+                client.send(message)
+                results[i] = client.recv(4096, timeout=5.0) == message
+        
+        client_threads = [threading.Thread(target=client_thread, args=(i,), daemon=True) for i in range(num_clients)]
+        for t in client_threads:
+            t.start()
+        for t in client_threads:
+            t.join(timeout=15.0)
+        
+        # Todas as conexoes vivas na tabela, atendidas pela thread do listener
+        self.assertEqual(len(server.connections), num_clients)
+        listener_threads = [t for t in threading.enumerate() if t.name == f"tcp-recv-{server.src_port}"]
+        self.assertEqual(len(listener_threads), 1)
+        self.assertTrue(all(conn.recv_thread is None for conn in accepted))
+        self.assertEqual(len({conn.connection_key for conn in accepted}), num_clients)
+        
+        # Fechamentos em paralelo (cada cliente passa 2s em TIME_WAIT)
+        closers = [threading.Thread(target=client.close, daemon=True) for client in clients]
+        for t in closers:
+            t.start()
+        for t in closers:
+            t.join(timeout=15.0)
+        thread.join(timeout=15.0)
+        
+        self.assertEqual(results, {i: True for i in range(num_clients)})
+        # Conexoes encerradas saem da tabela
+        self.assertTrue(all(conn.state == SimpleTCPSocket.CLOSED for conn in accepted))
+        self.assertEqual(len(server.connections), 0)
+        server.close()
+        
+        print(f"✓ {num_clients} conexões em eco com 1 thread de recepção no servidor")
+
+
+class TestTCPAsyncStreams(unittest.TestCase):
+    """Testes da API de streams asyncio (mesma máquina de estados, sem threads)"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_async_echo_without_threads(self):
+        """Testa 50 conexões simultâneas em eco por readline no mesmo loop, sem criar threads"""
+        print("\n=== Teste: Streams asyncio (50 conexões em eco) ===")
+        
+        num_clients = 50
+        threads_before = threading.active_count()
+        
+        async def handle(reader, writer):
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(line)
+                await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        
+        async def client(port, i):
+            reader, writer = await open_simple_connection('127.0.0.1', port, verbose=False)
+            lines = [f"cliente {i} linha {n}\n".encode() for n in range(3)]
+            received = []
+            for line in lines:
+                writer.write(line)
+                await writer.drain()
+                received.append(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+            return received == lines
+        
+        async def main():
+            server = await start_simple_server(handle, '127.0.0.1', 5018, verbose=False)
+            results = await asyncio.gather(*(client(server.port, i) for i in range(num_clients)))
+            threads = threading.active_count()
+            server.close()
+            await server.wait_closed()
+            return results, threads, len(server.listener.connections)
+        
+        results, threads, remaining = asyncio.run(main())
+        
+        self.assertEqual(results, [True] * num_clients)
+        self.assertEqual(threads, threads_before)
+        self.assertEqual(remaining, 0)
+        
+        print(f"✓ {num_clients} conexões em eco numa única thread (threads: {threads})")
+    
+    def test_async_bulk_transfer_slow_reader(self):
+        """Testa 1 MB para um leitor que só começa a ler depois de 0.5s (janela zero e EOF no close)"""
+        print("\n=== Teste: Streams asyncio (1 MB para leitor lento) ===")
+        
+        payload = os.urandom(1024 * 1024)
+        server_eof = []
+        
+        async def handle(reader, writer):
+            await asyncio.sleep(0.5)
+            data = await reader.readexactly(len(payload))
+            writer.write(b"ok" if data == payload else b"erro")
+            await writer.drain()
+            # FIN do cliente chega como EOF no StreamReader
+            server_eof.append(await reader.read())
+            writer.close()
+            await writer.wait_closed()
+        
+        async def main():
+            server = await start_simple_server(handle, '127.0.0.1', 5019, verbose=False)
+            reader, writer = await open_simple_connection('127.0.0.1', server.port, verbose=False)
+            conn = writer.get_extra_info('socket')
+            writer.write(payload)
+            await writer.drain()
+            reply = await reader.readexactly(2)
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+            return reply, conn.get_statistics()
+        
+        reply, stats = asyncio.run(main())
+        
+        self.assertEqual(reply, b"ok")
+        self.assertEqual(server_eof, [b""])
+        self.assertGreater(stats['window_probes'] + stats['window_updates'], 0)
+        
+        print(f"✓ 1 MB entregue com janela anunciada pelo StreamReader (sondas: {stats['window_probes']})")
+    
+    def test_async_write_eof_and_buffer_limits(self):
+        """Testa drain() com high/low-water marks e meio-fechamento por write_eof()"""
+        print("\n=== Teste: Streams asyncio (water marks e write_eof) ===")
+        
+        payload = os.urandom(256 * 1024)
+        
+        async def handle(reader, writer):
+            # Leitor lento: o buffer de escrita do cliente passa do high-water mark
+            await asyncio.sleep(0.3)
+            data = await reader.read()
+            # Meio-fechamento: depois do EOF do cliente o servidor ainda responde
+            writer.write(b"ok" if data == payload else b"erro")
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        
+        async def main():
+            server = await start_simple_server(handle, '127.0.0.1', 5032, verbose=False)
+            reader, writer = await open_simple_connection('127.0.0.1', server.port, verbose=False)
+            conn = writer.get_extra_info('socket')
+            low, high = conn.get_write_buffer_limits()
+            
+            # Abaixo do high-water mark drain() nao espera
+            writer.write(payload[:10])
+            small_drained = conn.drained.is_set()
+            writer.write(payload[10:])
+            paused = not conn.drained.is_set()
+            await writer.drain()
+            after_drain = conn.get_write_buffer_size()
+            
+            writer.write_eof()
+            try:
+                writer.write(b"depois do EOF")
+                write_after_eof = None
+            except RuntimeError as e:
+                write_after_eof = e
+            reply = await reader.read()
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+            return (low, high), small_drained, paused, after_drain, write_after_eof, reply
+        
+        limits, small_drained, paused, after_drain, write_after_eof, reply = asyncio.run(main())
+        
+        self.assertEqual(limits, (16 * 1024, 64 * 1024))
+        self.assertTrue(small_drained)
+        self.assertTrue(paused)
+        self.assertLessEqual(after_drain, limits[0])
+        self.assertIsInstance(write_after_eof, RuntimeError)
+        self.assertEqual(reply, b"ok")
+        
+        print(f"✓ drain() liberado com {after_drain} bytes no buffer; resposta recebida após write_eof()")
+    
+    def test_async_connect_non_loopback_address(self):
+        """Testa open_simple_connection para um endereço fora do loopback"""
+        print("\n=== Teste: Streams asyncio (endereço fora do loopback) ===")
+        
+        # Endereco da interface de saida (connect em UDP nao envia nada)
+        probe = real_socket.socket(real_socket.AF_INET, real_socket.SOCK_DGRAM)
+        try:
+            probe.connect(('10.255.255.255', 1))
+            host = probe.getsockname()[0]
+        except OSError:
+            host = '127.0.0.1'
+        finally:
+            probe.close()
+        if host.startswith('127.'):
+            self.skipTest("sem endereço IPv4 fora do loopback")
+        
+        peers = []
+        
+        async def handle(reader, writer):
+            peers.append(writer.get_extra_info('peername'))
+            writer.write(await reader.readline())
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        
+        async def main():
+            server = await start_simple_server(handle, '0.0.0.0', 5033, verbose=False)
+            reader, writer = await open_simple_connection(host, server.port, verbose=False)
+            writer.write(b"eco\n")
+            await writer.drain()
+            reply = await reader.readline()
+            writer.close()
+            await writer.wait_closed()
+            server.close()
+            await server.wait_closed()
+            return reply
+        
+        reply = asyncio.run(main())
+        
+        self.assertEqual(reply, b"eco\n")
+        # Origem roteavel: o servidor ve o cliente pelo endereco da interface, nao 127.0.0.1
+        self.assertEqual(peers[0][0], host)
+        
+        print(f"✓ Conexão com {host}:5033 pela interface de rede")
+
+
+class RawSegmentMixin:
+    """Peer UDP bruto: envia e recebe segmentos montados à mão"""
+    
+    def _raw_client(self):
+        sock = real_socket.socket(real_socket.AF_INET, real_socket.SOCK_DGRAM)
+        sock.bind(('localhost', 0))
+        sock.settimeout(2.0)
+        return sock
+    
+    def _send(self, sock, port, seq, ack, flags, data=b''):
+        segment = TCPSegment(sock.getsockname()[1], port, seq, ack, flags, 65535, data)
+        sock.sendto(segment.to_bytes(), ('localhost', port))
+    
+    def _recv(self, sock):
+        data, _ = sock.recvfrom(2048)
+        segment, is_valid = TCPSegment.from_bytes(data)
+        self.assertTrue(is_valid)
+        return segment
+
+
+class TestTCPListenBacklog(RawSegmentMixin, unittest.TestCase):
+    """Testes da fila de SYN, da fila de accept limitada e dos SYN cookies do listener"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_duplicate_syn_single_half_open(self):
+        """Testa que SYNs retransmitidos da mesma 4-tupla reusam a entrada semi-aberta"""
+        print("\n=== Teste: Fila de SYN (SYN duplicado) ===")
+        
+        server = SimpleTCPSocket(5020, verbose=False)
+        server.listen()
+        raw = self._raw_client()
+        
+        self._send(raw, 5020, 100, 0, TCPSegment.FLAG_SYN)
+        first = self._recv(raw)
+        self._send(raw, 5020, 100, 0, TCPSegment.FLAG_SYN)
+        second = self._recv(raw)
+        
+        # Mesmo SYN-ACK, uma unica entrada e nenhum socket criado antes do ACK final
+        self.assertEqual((first.seq_num, first.ack_num), (second.seq_num, second.ack_num))
+        self.assertEqual(len(server.syn_queue), 1)
+        self.assertEqual(server.syn_duplicates, 1)
+        self.assertEqual(len(server.connections), 0)
+        
+        self._send(raw, 5020, 101, first.seq_num + 1, TCPSegment.FLAG_ACK)
+        conn, addr = server.accept()
+        
+        self.assertIsNotNone(conn)
+        self.assertEqual(conn.state, SimpleTCPSocket.ESTABLISHED)
+        self.assertEqual(len(server.syn_queue), 0)
+        self.assertEqual(len(server.connections), 1)
+        
+        # O peer bruto nao responde ao FIN: descarta a conexao sem o four-way close
+        raw.close()
+        conn.running = False
+        conn._leave_listener()
+        server.close()
+        
+        print("✓ SYN duplicado respondido sem nova entrada; conexão criada só no ACK final")
+    
+    def test_syn_queue_bounded(self):
+        """Testa o limite da fila de SYN (semi-abertas) com SYNs de 6 endereços"""
+        print("\n=== Teste: Fila de SYN limitada ===")
+        
+        class SmallSynQueueTCPSocket(SimpleTCPSocket):
+            SYN_BACKLOG = 4
+        
+        server = SmallSynQueueTCPSocket(5021, verbose=False)
+        server.listen()
+        raws = [self._raw_client() for _ in range(6)]
+        
+        for raw in raws:
+            self._send(raw, 5021, 100, 0, TCPSegment.FLAG_SYN)
+        answered = 0
+        for raw in raws:
+            try:
+                self._recv(raw)
+                answered += 1
+            except real_socket.timeout:
+                pass
+        
+        self.assertEqual(answered, 4)
+        self.assertEqual(len(server.syn_queue), 4)
+        self.assertEqual(server.syn_drops, 2)
+        
+        for raw in raws:
+            raw.close()
+        server.close()
+        
+        print(f"✓ {answered} SYNs na fila, {server.syn_drops} descartados")
+    
+    def test_bounded_accept_queue(self):
+        """Testa backlog=2 com 5 clientes: a fila nunca passa de 2 e todos são aceitos"""
+        print("\n=== Teste: Fila de accept limitada (backlog=2) ===")
+        
+        num_clients = 5
+        server = SimpleTCPSocket(5022, verbose=False)
+        server.listen(backlog=2)
+        clients = []
+        
+        def client_thread():
+            client = SimpleTCPSocket(verbose=False)
+            clients.append(client)
+            client.connect('localhost', 5022)
+        
+        threads = [threading.Thread(target=client_thread, daemon=True) for _ in range(num_clients)]
+        for t in threads:
+            t.start()
+        
+        # Ninguem aceita por 1.5s: a fila enche e o excesso espera (SYN descartado ou handshake em espera)
+        peak = 0
+        deadline = time.time() + 1.5
+        while time.time() < deadline:
+            peak = max(peak, len(server.accept_queue))
+            time.sleep(0.01)
+        
+        accepted = []
+        while len(accepted) < num_clients:
+            peak = max(peak, len(server.accept_queue))
+            conn, _ = server.accept()
+            if conn is None:
+                break
+            accepted.append(conn)
+        for t in threads:
+            t.join(timeout=10.0)
+        
+        self.assertEqual(len(accepted), num_clients)
+        self.assertLessEqual(peak, 2)
+        self.assertGreater(server.syn_drops + server.accept_overflows, 0)
+        self.assertTrue(all(client.state == SimpleTCPSocket.ESTABLISHED for client in clients))
+        
+        closers = [threading.Thread(target=client.close, daemon=True) for client in clients]
+        closers += [threading.Thread(target=conn.close, daemon=True) for conn in accepted]
+        for t in closers:
+            t.start()
+        for t in closers:
+            t.join(timeout=15.0)
+        server.close()
+        
+        print(f"✓ {len(accepted)} conexões aceitas com pico de {peak} na fila "
+              f"(SYNs descartados: {server.syn_drops}, handshakes em espera: {server.accept_overflows})")
+    
+    def test_syn_cookies_stateless(self):
+        """Testa SYN cookies: nenhum estado até o ACK final; cookie inválido é ignorado"""
+        print("\n=== Teste: SYN cookies ===")
+        
+        server = SimpleTCPSocket(5023, verbose=False)
+        server.listen(syn_cookies=True)
+        raw = self._raw_client()
+        
+        self._send(raw, 5023, 500, 0, TCPSegment.FLAG_SYN)
+        syn_ack = self._recv(raw)
+        self.assertEqual(len(server.syn_queue), 0)
+        self.assertEqual(server.syn_cookies_sent, 1)
+        
+        # ACK com cookie errado nao cria conexao
+        self._send(raw, 5023, 501, syn_ack.seq_num + 2, TCPSegment.FLAG_ACK)
+        time.sleep(0.2)
+        self.assertEqual(len(server.connections), 0)
+        raw.close()
+        
+        # Cliente real: handshake validado pelo cookie e eco de dados
+        def server_thread():
+            conn, _ = server.accept()
+            if conn:
+                conn.send(conn.recv(4096, timeout=5.0))
+                conn.recv(4096, timeout=5.0)
+                conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        client = SimpleTCPSocket(verbose=False)
+        self.assertTrue(client.connect('localhost', 5023))
+        client.send(b"cookie")
+        reply = client.recv(4096, timeout=5.0)
+        client.close()
+        thread.join(timeout=10.0)
+        server.close()
+        
+        self.assertEqual(reply, b"cookie")
+        self.assertEqual(len(server.syn_queue), 0)
+        
+        print(f"✓ Handshakes validados por cookie sem fila de SYN (cookies enviados: {server.syn_cookies_sent})")
+    
+    def test_lost_final_ack_synack_retransmitted(self):
+        """Testa ACK final perdido: o listener retransmite o SYN-ACK e o cliente repete o ACK"""
+        print("\n=== Teste: ACK final perdido ===")
+        
+        class DropFirstAckTCPSocket(SimpleTCPSocket):
+            dropped = False
+            
+            def _send_segment(self, segment, addr=None):
+                if segment.flags == TCPSegment.FLAG_ACK and not self.dropped:
+                    self.dropped = True
+                    return
+                super()._send_segment(segment, addr)
+        
+        server = SimpleTCPSocket(5024, verbose=False)
+        server.listen()
+        client = DropFirstAckTCPSocket(verbose=False)
+        self.assertTrue(client.connect('localhost', 5024))
+        
+        # O cliente ja esta ESTABLISHED; o listener so conclui o handshake com o SYN-ACK repetido
+        start = time.monotonic()
+        conn, _ = server.accept()
+        elapsed = time.monotonic() - start
+        
+        self.assertIsNotNone(conn)
+        self.assertEqual(conn.state, SimpleTCPSocket.ESTABLISHED)
+        self.assertTrue(client.dropped)
+        self.assertEqual(server.get_statistics()['syn_ack_retransmissions'], 1)
+        self.assertLess(elapsed, 3.0)
+        
+        client.close()
+        conn.close()
+        server.close()
+        
+        print(f"✓ Handshake concluído em {elapsed:.2f}s pelo SYN-ACK retransmitido")
 
 
+class TestTCPDelayedAck(RawSegmentMixin, unittest.TestCase):
+    """Testes de ACK atrasado: timer, a cada 2 MSS, imediato fora de ordem e de carona nos dados"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_delayed_ack_rules(self):
+        """Testa quando o receptor atrasa, antecipa ou omite o ACK puro"""
+        print("\n=== Teste: Regras do ACK atrasado ===")
+        
+        # Atraso folgado: a resposta da aplicacao sai antes do timer mesmo com a maquina carregada
+        delayed_ack_timeout = 0.2
+        server = SimpleTCPSocket(5025, verbose=False, delayed_ack_timeout=delayed_ack_timeout)
+        server.listen()
+        raw = self._raw_client()
+        
+        self._send(raw, 5025, 100, 0, TCPSegment.FLAG_SYN)
+        syn_ack = self._recv(raw)
+        ack = syn_ack.seq_num + 1
+        self._send(raw, 5025, 101, ack, TCPSegment.FLAG_ACK)
+        conn, _ = server.accept()
+        self.assertIsNotNone(conn)
+        seq = 101
+        
+        # Segmento pequeno sem PSH: ACK so quando o timer expira
+        start = time.monotonic()
+        self._send(raw, 5025, seq, ack, TCPSegment.FLAG_ACK, b"x" * 100)
+        seq += 100
+        reply = self._recv(raw)
+        delay = time.monotonic() - start
+        self.assertEqual(reply.ack_num, seq)
+        self.assertGreaterEqual(delay, delayed_ack_timeout / 2)
+        self.assertEqual(conn.delayed_acks, 1)
+        
+        # Dois segmentos cheios: um unico ACK, sem esperar o timer
+        for _ in range(2):
+            self._send(raw, 5025, seq, ack, TCPSegment.FLAG_ACK, b"y" * SimpleTCPSocket.MSS)
+            seq += SimpleTCPSocket.MSS
+        self.assertEqual(self._recv(raw).ack_num, seq)
+        raw.settimeout(0.3)
+        with self.assertRaises(real_socket.timeout):
+            self._recv(raw)
+        raw.settimeout(2.0)
+        self.assertEqual(conn.delayed_acks, 1)
+        
+        # Fora de ordem: ACK duplicado imediato com o proximo byte esperado
+        self._send(raw, 5025, seq + 500, ack, TCPSegment.FLAG_ACK, b"z" * 100)
+        self.assertEqual(self._recv(raw).ack_num, seq)
+        self.assertEqual(conn.delayed_acks, 1)
+        self._send(raw, 5025, seq, ack, TCPSegment.FLAG_ACK, b"z" * 500)
+        seq += 600
+        self.assertEqual(self._recv(raw).ack_num, seq)
+        
+        # Resposta da aplicacao dentro do atraso: o ACK vai de carona nos dados
+        acks_before = conn.acks_sent
+        self._send(raw, 5025, seq, ack, TCPSegment.FLAG_ACK, b"ping")
+        seq += 4
+        while conn.next_seq_expected != seq:
+            time.sleep(0.01)
+        sender = threading.Thread(target=conn.send, args=(b"pong",), daemon=True)
+        sender.start()
+        data_segment = self._recv(raw)
+        self._send(raw, 5025, seq, ack + 4, TCPSegment.FLAG_ACK)
+        sender.join(timeout=5.0)
+        
+        self.assertEqual(data_segment.data, b"pong")
+        self.assertEqual(data_segment.ack_num, seq)
+        self.assertTrue(data_segment.has_flag(TCPSegment.FLAG_PSH))
+        self.assertEqual(conn.acks_sent, acks_before)
+        self.assertEqual(conn.piggybacked_acks, 1)
+        
+        # O peer bruto nao responde ao FIN: descarta a conexao sem o four-way close
+        raw.close()
+        conn.running = False
+        conn._leave_listener()
+        server.close()
+        
+        print(f"✓ ACK pelo timer após {delay * 1000:.0f} ms; a cada 2 MSS; imediato fora de ordem; de carona na resposta")
+    
+    def test_bulk_transfer_halves_acks(self):
+        """Testa transferência em massa com um ACK a cada dois segmentos"""
+        print("\n=== Teste: ACKs em transferência em massa (256 KB) ===")
+        
+        test_data = os.urandom(256 * 1024)
+        results = {}
+        
+        server = SimpleTCPSocket(5026, verbose=False)
+        server.listen()
+        
+        def server_thread():
+            conn, addr = server.accept()
+            if conn:
+                received = bytearray()
+                while len(received) < len(test_data):
+                    chunk = conn.recv(65536, timeout=5.0)
+                    if not chunk:
+                        break
+                    received += chunk
+                results['received'] = bytes(received)
+                results['stats'] = conn.get_statistics()
+                conn.close()
+        
+        thread = threading.Thread(target=server_thread, daemon=True)
+        thread.start()
+        
+        time.sleep(0.1)
+        
+        client = SimpleTCPSocket(verbose=False)
+        client.connect('localhost', 5026)
+        client.send(test_data)
+        client.drain(timeout=10.0)
+        sent = client.get_statistics()['segments_sent']
+        client.close()
+        thread.join(timeout=10.0)
+        server.close()
+        
+        self.assertEqual(results['received'], test_data)
+        acks = results['stats']['acks_sent']
+        self.assertLessEqual(acks, sent * 0.6)
+        
+        print(f"✓ {acks} ACKs para {sent} segmentos de dados")
+
+
+class TestTCPSendBuffer(RawSegmentMixin, unittest.TestCase):
+    """Testes do buffer de envio: send() sem esperar ACKs, high-water mark, Nagle, flush() e drain()"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    # Recebe segmentos de dados ate cobrir total bytes a partir de seq, confirmando cada um
+    # (retransmissoes ja recebidas sao ignoradas); retorna os segmentos novos
+    def _recv_and_ack(self, raw, port, seq, ack, total):
+        segments = []
+        end = seq + total
+        while seq < end:
+            segment = self._recv(raw)
+            if segment.seq_num != seq:
+                continue
+            segments.append(segment)
+            seq += len(segment.data)
+            self._send(raw, port, ack, seq, TCPSegment.FLAG_ACK)
+        return segments
+    
+    def test_buffered_send_nagle_flush_backpressure(self):
+        """Testa send() não bloqueante, coalescência de Nagle, flush() e o high-water mark"""
+        print("\n=== Teste: Buffer de envio com Nagle e high-water mark ===")
+        
+        server = SimpleTCPSocket(5027, verbose=False, send_buffer_size=4000)
+        server.listen()
+        raw = self._raw_client()
+        
+        self._send(raw, 5027, 100, 0, TCPSegment.FLAG_SYN)
+        syn_ack = self._recv(raw)
+        seq = syn_ack.seq_num + 1
+        self._send(raw, 5027, 101, seq, TCPSegment.FLAG_ACK)
+        conn, _ = server.accept()
+        self.assertIsNotNone(conn)
+        
+        # send() retorna com o segmento ainda sem ACK
+        self.assertEqual(conn.send(b"a" * 100), 100)
+        first = self._recv(raw)
+        self.assertEqual(first.data, b"a" * 100)
+        self.assertTrue(first.has_flag(TCPSegment.FLAG_PSH))
+        self.assertEqual(len(conn.unacked), 1)
+        
+        # Nagle: escritas pequenas com dados em transito esperam no buffer e saem juntas no ACK
+        for _ in range(5):
+            self.assertEqual(conn.send(b"b" * 10), 10)
+        self.assertEqual(conn.get_statistics()['send_buffered'], 50)
+        self._send(raw, 5027, 101, seq + 100, TCPSegment.FLAG_ACK)
+        seq += 100
+        coalesced = self._recv_and_ack(raw, 5027, seq, 101, 50)
+        self.assertEqual([segment.data for segment in coalesced], [b"b" * 50])
+        seq += 50
+        while conn.unacked:
+            time.sleep(0.01)
+        
+        # flush(): a sobra retida sai sem esperar o ACK
+        conn.send(b"c" * 10)
+        conn.send(b"d" * 10)
+        self.assertEqual(conn.get_statistics()['send_buffered'], 10)
+        conn.flush()
+        flushed = self._recv_and_ack(raw, 5027, seq, 101, 20)
+        self.assertEqual(b"".join(segment.data for segment in flushed), b"c" * 10 + b"d" * 10)
+        seq += 20
+        self.assertTrue(conn.drain(timeout=5.0))
+        
+        # High-water mark: send() bloqueia com 4000 bytes aceitos e nao confirmados
+        data = os.urandom(8000)
+        sender = threading.Thread(target=conn.send, args=(data,), daemon=True)
+        sender.start()
+        time.sleep(0.1)
+        self.assertTrue(sender.is_alive())
+        stats = conn.get_statistics()
+        self.assertEqual(stats['bytes_in_flight'] + stats['send_buffered'], 4000)
+        
+        segments = self._recv_and_ack(raw, 5027, seq, 101, len(data))
+        sender.join(timeout=5.0)
+        self.assertFalse(sender.is_alive())
+        self.assertEqual(b"".join(segment.data for segment in segments), data)
+        self.assertTrue(conn.drain(timeout=5.0))
+        self.assertEqual(conn.get_statistics()['send_buffered'], 0)
+        
+        # O peer bruto nao responde ao FIN: descarta a conexao sem o four-way close
+        raw.close()
+        conn.running = False
+        conn._leave_listener()
+        server.close()
+        
+        print("✓ 5 escritas de 10 bytes em 1 segmento; flush imediato; send() bloqueado acima de 4000 bytes")
+    
+    def test_small_writes_nagle_vs_nodelay(self):
+        """Testa 300 escritas de 1 byte: o Nagle junta em poucos segmentos, nodelay envia um por escrita"""
+        print("\n=== Teste: Escritas de 1 byte com Nagle e com nodelay ===")
+        
+        writes = 300
+        for port, nodelay in ((5028, False), (5029, True)):
+            with self.subTest(nodelay=nodelay):
+                received = bytearray()
+                
+                server = SimpleTCPSocket(port, verbose=False)
+                server.listen()
+                
+                def server_thread():
+                    conn, addr = server.accept()
+                    if conn:
+                        while len(received) < writes:
+                            data = conn.recv(4096, timeout=5.0)
+                            if not data:
+                                break
+                            received.extend(data)
+                        conn.close()
+                
+                thread = threading.Thread(target=server_thread, daemon=True)
+                thread.start()
+                time.sleep(0.1)
+                
+                client = SimpleTCPSocket(verbose=False, nodelay=nodelay)
+                client.connect('localhost', port)
+                for i in range(writes):
+                    client.send(bytes([i % 256]))
+                self.assertTrue(client.drain(timeout=10.0))
+                segments = client.get_statistics()['segments_sent']
+                
+                client.close()
+                thread.join(timeout=10.0)
+                server.close()
+                
+                self.assertEqual(bytes(received), bytes(i % 256 for i in range(writes)))
+                if nodelay:
+                    self.assertEqual(segments, writes)
+                else:
+                    self.assertLess(segments, writes // 10)
+                
+                print(f"✓ nodelay={nodelay}: {writes} escritas em {segments} segmentos")
+
+
+class TestTCPPassiveClose(RawSegmentMixin, unittest.TestCase):
+    """Testes do FIN recebido: so aceito em ordem e dentro da janela de recepcao"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def _wait_ack(self, sock, ack_num):
+        segment = self._recv(sock)
+        while segment.ack_num != ack_num:
+            segment = self._recv(sock)
+        return segment
+    
+    def test_fin_with_data_respects_window(self):
+        """Testa que FIN com dados além da janela ou fora de ordem é descartado até caber"""
+        print("\n=== Teste: FIN com dados e janela de recepção ===")
+        
+        class SmallBufferTCPSocket(SimpleTCPSocket):
+            BUFFER_SIZE = 4000
+        
+        server = SmallBufferTCPSocket(5030, verbose=False)
+        server.listen()
+        raw = self._raw_client()
+        
+        self._send(raw, 5030, 100, 0, TCPSegment.FLAG_SYN)
+        syn_ack = self._recv(raw)
+        ack = syn_ack.seq_num + 1
+        self._send(raw, 5030, 101, ack, TCPSegment.FLAG_ACK)
+        conn, _ = server.accept()
+        self.assertIsNotNone(conn)
+        seq = 101
+        
+        # Aplicacao nao le: sobram 1000 bytes no buffer de recepcao
+        flags = TCPSegment.FLAG_ACK | TCPSegment.FLAG_PSH
+        for _ in range(3):
+            self._send(raw, 5030, seq, ack, flags, b"a" * 1000)
+            seq += 1000
+        self._wait_ack(raw, seq)
+        
+        # FIN com dados alem da janela e FIN fora de ordem: ACK do proximo byte esperado
+        fin = TCPSegment.FLAG_FIN | TCPSegment.FLAG_ACK
+        tail = b"f" * 1500
+        self._send(raw, 5030, seq, ack, fin, tail)
+        self.assertEqual(self._recv(raw).ack_num, seq)
+        self._send(raw, 5030, seq + 10, ack, fin)
+        self.assertEqual(self._recv(raw).ack_num, seq)
+        self.assertEqual(conn.state, SimpleTCPSocket.ESTABLISHED)
+        self.assertEqual(conn.next_seq_expected, seq)
+        self.assertEqual(len(conn.recv_ring), 3000)
+        
+        # Com a janela aberta, o FIN retransmitido entrega os dados e fecha o lado do peer
+        self.assertEqual(conn.recv(4096, timeout=2.0), b"a" * 3000)
+        self._send(raw, 5030, seq, ack, fin, tail)
+        self._wait_ack(raw, seq + len(tail) + 1)
+        self.assertEqual(conn.state, SimpleTCPSocket.CLOSE_WAIT)
+        self.assertEqual(conn.recv(4096, timeout=2.0), tail)
+        
+        # O peer bruto nao responde ao FIN: descarta a conexao sem o four-way close
+        raw.close()
+        conn.running = False
+        conn._leave_listener()
+        server.close()
+        
+        print("✓ FIN além da janela e fora de ordem descartados; aceito após a leitura da aplicação")
+    
+    def test_simultaneous_close(self):
+        """Testa FINs cruzados: FIN_WAIT_1 -> CLOSING -> TIME_WAIT"""
+        print("\n=== Teste: Fechamento simultâneo ===")
+        
+        server = SimpleTCPSocket(5034, verbose=False)
+        server.listen()
+        raw = self._raw_client()
+        
+        self._send(raw, 5034, 100, 0, TCPSegment.FLAG_SYN)
+        syn_ack = self._recv(raw)
+        self._send(raw, 5034, 101, syn_ack.seq_num + 1, TCPSegment.FLAG_ACK)
+        conn, _ = server.accept()
+        self.assertIsNotNone(conn)
+        
+        closer = threading.Thread(target=conn.close, daemon=True)
+        closer.start()
+        fin = self._recv(raw)
+        self.assertTrue(fin.has_flag(TCPSegment.FLAG_FIN))
+        
+        # FIN do peer cruza com o nosso: ainda nao confirma o FIN recebido
+        self._send(raw, 5034, 101, fin.seq_num, TCPSegment.FLAG_FIN | TCPSegment.FLAG_ACK)
+        ack = self._recv(raw)
+        self.assertEqual(ack.ack_num, 102)
+        # O ACK sai com o lock da conexao adquirido, antes da troca de estado
+        with conn.lock:
+            self.assertEqual(conn.state, SimpleTCPSocket.CLOSING)
+        
+        self._send(raw, 5034, 102, fin.seq_num + 1, TCPSegment.FLAG_ACK)
+        closer.join(timeout=5.0)
+        self.assertFalse(closer.is_alive())
+        self.assertEqual(conn.state, SimpleTCPSocket.CLOSED)
+        
+        raw.close()
+        server.close()
+        
+        print("✓ FINs cruzados fecham pela passagem por CLOSING e TIME_WAIT")
+    
+
+class TestTCPTimers(RawSegmentMixin, unittest.TestCase):
+    """Testes dos timers: todos os sockets compartilham uma única thread de timers"""
+    
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        time.sleep(2.0)
+    
+    def test_rto_timers_share_one_thread(self):
+        """Testa 20 conexões com RTO armado e retransmitindo sem uma thread por timer"""
+        print("\n=== Teste: Timers de 20 conexões em uma única thread ===")
+        
+        server = SimpleTCPSocket(5031, verbose=False)
+        server.listen()
+        baseline = threading.active_count()
+        
+        peers = []
+        for i in range(20):
+            raw = self._raw_client()
+            self._send(raw, 5031, 100, 0, TCPSegment.FLAG_SYN)
+            syn_ack = self._recv(raw)
+            self._send(raw, 5031, 101, syn_ack.seq_num + 1, TCPSegment.FLAG_ACK)
+            conn, _ = server.accept()
+            self.assertIsNotNone(conn)
+            peers.append((raw, conn))
+        
+        # O peer bruto nunca confirma: cada conexao fica com o RTO armado e retransmite
+        for raw, conn in peers:
+            conn.send(b"r" * 100)
+        peak = threading.active_count()
+        deadline = time.monotonic() + 5.0
+        while time.monotonic() < deadline and not all(conn.retransmissions for _, conn in peers):
+            peak = max(peak, threading.active_count())
+            time.sleep(0.05)
+        
+        self.assertTrue(all(conn.retransmissions for _, conn in peers))
+        # So a roda compartilhada (criada no primeiro SYN-ACK se ainda nao existia) e extra
+        self.assertLessEqual(peak, baseline + 1)
+        
+        # O peer bruto nao responde ao FIN: descarta as conexoes sem o four-way close
+        for raw, conn in peers:
+            with conn.lock:
+                conn.timer.cancel()
+                conn.timer = None
+            raw.close()
+            conn.running = False
+            conn._leave_listener()
+        server.close()
+        
+        print(f"✓ 20 RTOs disparados com {peak - baseline} thread(s) extra")
+    
+    def test_timer_callback_errors_are_reported(self):
+        """Testa que erro num callback é registrado e a roda segue disparando os demais timers"""
+        print("\n=== Teste: Erro em callback de timer ===")
+        
+        sock = SimpleTCPSocket(verbose=False)
+        errors = []
+        sock.logger.log_error = errors.append
+        fired = threading.Event()
+        
+        def broken(timer):
+            raise RuntimeError("falha no callback")
+        
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            sock._schedule(0.01, broken)
+            sock._schedule(0.05, lambda timer: fired.set())
+            self.assertTrue(fired.wait(2.0))
+        
+        self.assertEqual(len(errors), 1)
+        self.assertIn("falha no callback", errors[0])
+        self.assertIn("RuntimeError: falha no callback", stderr.getvalue())
+        sock.udp_socket.close()
+        
+        print("✓ Erro registrado com traceback; timer seguinte disparado")
+    
 def run_tests():
     """Executa todos os testes"""
     print("\n" + "="*70)
@@ -455,6 +1908,18 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestTCPBasic))
     suite.addTests(loader.loadTestsFromTestCase(TestTCPReliability))
     suite.addTests(loader.loadTestsFromTestCase(TestTCPFlowControl))
+    suite.addTests(loader.loadTestsFromTestCase(TestCongestionControl))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPCongestionControl))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPRTTEstimation))
+    suite.addTests(loader.loadTestsFromTestCase(TestByteRing))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPReceivePath))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPMultiplexedListener))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPAsyncStreams))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPListenBacklog))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPDelayedAck))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPSendBuffer))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPPassiveClose))
+    suite.addTests(loader.loadTestsFromTestCase(TestTCPTimers))
     
     # Executar
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,6 +1,8 @@
 """
 Pacote Utils - Utilitários para Protocolos de Transporte
-Contém: pacotes, logger, simulador
+Contém: pacotes, logger, simulador, fila de entrega, leitura de arquivos,
+endpoint multiplexado por flow-ID, pool de buffers, timer wheel,
+buffer de reordenação, ring de bytes
 """
 
 from .packet import (
@@ -12,11 +14,22 @@ from .sr_packet import SRPacket
 from .tcp_segment import TCPSegment
 from .logger import ProtocolLogger, Colors
 from .simulator import UnreliableChannel
+from .delivery_queue import DeliveryQueue
+from .packet_ring import PacketRing
+from .file_chunks import iter_file_chunks
+from .flow_endpoint import FlowEndpoint
+from .buffer_pool import BufferPool, shared_pool, recv_view
+from .timer_wheel import TimerWheel
+from .reorder_buffer import ReorderBuffer
+from .byte_ring import ByteRing
 
 __all__ = [
     'RDT20Packet', 'RDT21Packet', 'RDT30Packet',
     'PACKET_TYPE_DATA', 'PACKET_TYPE_ACK', 'PACKET_TYPE_NAK',
     'GBNPacket', 'SRPacket', 'TCPSegment',
-    'ProtocolLogger', 'Colors', 'UnreliableChannel'
+    'ProtocolLogger', 'Colors', 'UnreliableChannel',
+    'DeliveryQueue', 'PacketRing', 'iter_file_chunks', 'FlowEndpoint',
+    'BufferPool', 'shared_pool', 'recv_view', 'TimerWheel',
+    'ReorderBuffer', 'ByteRing'
 ]
 
@@ -0,0 +1,54 @@
+"""
+Pool de Buffers de Recepção
+Slabs bytearray reutilizáveis preenchidos com recvfrom_into (sem alocar bytes por datagrama)
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+# Implementacao da classe BufferPool:
+class BufferPool:
+    # Maior datagrama UDP; cada slab comporta qualquer pacote dos protocolos
+    DEFAULT_SLAB_SIZE = 65535
+
+    # Construtor - inicializa o objeto
+    def __init__(self, slab_size=DEFAULT_SLAB_SIZE, max_free=32):
+        self.slab_size = slab_size
+        self.max_free = max_free
+        self.free = []
+        self.allocated = 0
+        self.lock = threading.Lock()
+
+    # Metodo para obter um slab (reaproveita um livre ou aloca um novo)
+    def acquire(self):
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            self.allocated += 1
+        return bytearray(self.slab_size)
+
+    # Metodo para devolver um slab ao pool
+    def release(self, slab):
+        with self.lock:
+            if len(self.free) < self.max_free:
+                self.free.append(slab)
+
+    @contextmanager
+    def slab(self):
+        slab = self.acquire()
+        try:
+            yield slab
+        finally:
+            self.release(slab)
+
+
+# Recebe um datagrama no slab; retorna (memoryview dos bytes lidos, endereco).
+# A view so vale ate a proxima recepcao no mesmo slab: os decodificadores copiam o payload.
+def recv_view(sock, slab, nbytes=0):
+    n, addr = sock.recvfrom_into(slab, nbytes)
+    return memoryview(slab)[:n], addr
+
+
+# Pool compartilhado por todos os loops de recepcao
+shared_pool = BufferPool()
@@ -0,0 +1,89 @@
+"""
+Ring Buffer de Bytes
+Buffer circular contíguo para o fluxo recebido: cópias em no máximo 2 fatias e leitura por memoryview
+"""
+
+
+# Implementacao da classe ByteRing:
+class ByteRing:
+    # Construtor - inicializa o objeto (arena alocada uma unica vez, salvo crescimento)
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity deve ser >= 1")
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        # Posicao do primeiro byte legivel e quantidade de bytes guardados
+        self.head = 0
+        self.size = 0
+        self.grows = 0
+
+    def __len__(self):
+        return self.size
+
+    def free_space(self):
+        return self.capacity - self.size
+
+    # Metodo para anexar bytes ao fim do ring; dobra a arena se nao couberem
+    def write(self, data):
+        src = memoryview(data)
+        n = len(src)
+        if n > self.capacity - self.size:
+            self._grow(self.size + n)
+        tail = (self.head + self.size) % self.capacity
+        first = min(n, self.capacity - tail)
+        self.view[tail:tail + first] = src[:first]
+        if first < n:
+            self.view[:n - first] = src[first:]
+        self.size += n
+        return n
+
+    # Copia ate len(dest) bytes para dest (buffer gravavel) e os consome; retorna a quantidade
+    def read_into(self, dest):
+        dest = memoryview(dest)
+        n = min(len(dest), self.size)
+        first = min(n, self.capacity - self.head)
+        dest[:first] = self.view[self.head:self.head + first]
+        if first < n:
+            dest[first:n] = self.view[:n - first]
+        self.consume(n)
+        return n
+
+    # Remove e retorna ate n bytes (uma unica copia, mesmo quando os dados dao a volta)
+    def read(self, n):
+        n = min(n, self.size)
+        end = self.head + n
+        if end <= self.capacity:
+            data = bytes(self.view[self.head:end])
+        else:
+            data = b''.join((self.view[self.head:], self.view[:end - self.capacity]))
+        self.consume(n)
+        return data
+
+    # View dos primeiros bytes contiguos (ate n, sem copia); so fica valida enquanto nao consumidos
+    def peek(self, n):
+        n = min(n, self.size, self.capacity - self.head)
+        return self.view[self.head:self.head + n]
+
+    def consume(self, n):
+        if n > self.size:
+            raise ValueError(f"consume({n}) maior que os {self.size} bytes guardados")
+        self.size -= n
+        # Ring vazio volta ao inicio: proximas leituras ficam contiguas
+        self.head = 0 if self.size == 0 else (self.head + n) % self.capacity
+
+    # Realoca a arena linearizando o conteudo (views antigas continuam apontando para a arena anterior)
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        buffer = bytearray(capacity)
+        size = self.size
+        first = min(size, self.capacity - self.head)
+        buffer[:first] = self.view[self.head:self.head + first]
+        buffer[first:size] = self.view[:size - first]
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        self.capacity = capacity
+        self.head = 0
+        self.grows += 1
@@ -0,0 +1,245 @@
+"""
+Fila de Entrega Limitada
+Entrega os dados em ordem do protocolo para a aplicação com capacidade fixa
+(ring de slots com cursores de leitura/escrita e backpressure quando cheia)
+"""
+
+import asyncio
+import threading
+import time
+
+
+# Implementacao da classe DeliveryQueue:
+class DeliveryQueue:
+    DEFAULT_CAPACITY = 1024
+
+    # Construtor - inicializa o objeto
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity deve ser >= 1")
+        self.capacity = capacity
+        self.slots = [None] * capacity
+
+        # Cursores monotônicos; o slot físico é cursor % capacity
+        self.read_cursor = 0
+        self.write_cursor = 0
+        # Bytes já consumidos do item na cabeça da fila (read_into parcial)
+        self.read_offset = 0
+
+        self.callback = None
+        self.closed = False
+
+        self.total_delivered = 0
+        self.total_bytes = 0
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        # Leitores asyncio aguardando: (loop, future) acordados via call_soon_threadsafe
+        self.async_waiters = []
+
+    def __len__(self):
+        with self.lock:
+            return self.write_cursor - self.read_cursor
+
+    # Vagas livres para offer(); None se ilimitado (consumidor por callback)
+    def free_space(self):
+        with self.lock:
+            if self.closed:
+                return 0
+            if self.callback is not None:
+                return None
+            return self.capacity - (self.write_cursor - self.read_cursor)
+
+    def is_full(self):
+        with self.lock:
+            return self.callback is None and self.write_cursor - self.read_cursor >= self.capacity
+
+    def _push(self, data):
+        self.slots[self.write_cursor % self.capacity] = data
+        self.write_cursor += 1
+        self.total_delivered += 1
+        self.total_bytes += len(data)
+        self.not_empty.notify()
+        if self.async_waiters:
+            self._wake_async()
+
+    # Acorda os leitores asyncio (chamado com self.lock adquirido)
+    def _wake_async(self):
+        for loop, future in self.async_waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        self.async_waiters = []
+    
+    def _pop(self):
+        idx = self.read_cursor % self.capacity
+        data = self.slots[idx]
+        self.slots[idx] = None
+        self.read_cursor += 1
+        if self.read_offset:
+            data = data[self.read_offset:]
+            self.read_offset = 0
+        self.not_full.notify()
+        return data
+
+    # Metodo para entregar sem bloquear (usado pelo protocolo)
+    def offer(self, data):
+        with self.lock:
+            if self.closed:
+                return False
+            if self.callback is None and self.write_cursor - self.read_cursor >= self.capacity:
+                return False
+            callback = self._admit(data)
+        if callback is not None:
+            callback(data)
+        return True
+
+    # Metodo para entregar bloqueando ate haver espaco; a espera e o push usam o mesmo lock,
+    # entao so retorna False em timeout ou com a fila fechada
+    def put(self, data, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self.lock:
+            while (self.callback is None and not self.closed
+                   and self.write_cursor - self.read_cursor >= self.capacity):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.not_full.wait(remaining)
+            if self.closed:
+                return False
+            callback = self._admit(data)
+        if callback is not None:
+            callback(data)
+        return True
+
+    # Enfileira o item ou, com consumidor por callback, so contabiliza e retorna o callback
+    # a chamar fora do lock (chamado com self.lock adquirido e vaga garantida)
+    def _admit(self, data):
+        if self.callback is None:
+            self._push(data)
+            return None
+        self.total_delivered += 1
+        self.total_bytes += len(data)
+        return self.callback
+
+    def _wait_item(self, timeout):
+        deadline = None if timeout is None else time.time() + timeout
+        while self.write_cursor == self.read_cursor:
+            if self.closed:
+                return False
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            self.not_empty.wait(remaining)
+        return True
+
+    # Metodo para ler o proximo item (None em timeout ou fila fechada)
+    def read(self, timeout=None):
+        with self.lock:
+            if not self._wait_item(timeout):
+                return None
+            return self._pop()
+
+    # Metodo para ler ate max_items itens ate o prazo
+    def read_many(self, max_items, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        items = []
+        with self.lock:
+            while len(items) < max_items:
+                remaining = None if deadline is None else max(0.0, deadline - time.time())
+                if not self._wait_item(remaining):
+                    break
+                items.append(self._pop())
+        return items
+
+    # Versao awaitable de read_many: nao bloqueia o event loop
+    async def read_many_async(self, max_items, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        items = []
+        while True:
+            with self.lock:
+                while len(items) < max_items and self.read_cursor != self.write_cursor:
+                    items.append(self._pop())
+                if len(items) >= max_items or self.closed:
+                    return items
+                waiter = (loop, loop.create_future())
+                self.async_waiters.append(waiter)
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                if remaining is not None and remaining <= 0:
+                    return items
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                return items
+            finally:
+                with self.lock:
+                    if waiter in self.async_waiters:
+                        self.async_waiters.remove(waiter)
+    
+    # Metodo para copiar dados para um buffer da aplicacao
+    def read_into(self, buffer, timeout=None):
+        view = memoryview(buffer).cast('B')
+        with self.lock:
+            if not self._wait_item(timeout):
+                return 0
+            idx = self.read_cursor % self.capacity
+            data = self.slots[idx]
+            n = min(len(view), len(data) - self.read_offset)
+            view[:n] = memoryview(data)[self.read_offset:self.read_offset + n]
+            self.read_offset += n
+            if self.read_offset >= len(data):
+                self.slots[idx] = None
+                self.read_cursor += 1
+                self.read_offset = 0
+                self.not_full.notify()
+            return n
+
+    # Metodo para esvaziar a fila sem bloquear
+    def drain(self):
+        with self.lock:
+            items = []
+            while self.read_cursor != self.write_cursor:
+                items.append(self._pop())
+            return items
+
+    # Metodo para registrar consumidor por callback
+    def subscribe(self, callback):
+        with self.lock:
+            pending = []
+            while self.read_cursor != self.write_cursor:
+                pending.append(self._pop())
+            self.callback = callback
+            self.not_full.notify_all()
+        for data in pending:
+            callback(data)
+
+    def unsubscribe(self):
+        with self.lock:
+            self.callback = None
+
+    def clear(self):
+        with self.lock:
+            self.slots = [None] * self.capacity
+            self.read_cursor = self.write_cursor
+            self.read_offset = 0
+            self.not_full.notify_all()
+
+    # Fecha e acorda leitores/escritores bloqueados
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+            self._wake_async()
+
+    def __iter__(self):
+        while True:
+            data = self.read()
+            if data is None:
+                return
+            yield data
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,29 @@
+"""
+Leitura de Arquivos em Fatias
+Mapeia o arquivo em memória (mmap) e fatia memoryviews sob demanda, sem cópias
+"""
+
+import mmap
+import os
+
+
+# Gera fatias memoryview de chunk_size bytes do arquivo, na ordem
+def iter_file_chunks(path, chunk_size):
+    if chunk_size < 1:
+        raise ValueError("chunk_size deve ser >= 1")
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, size, chunk_size):
+                yield view[offset:offset + chunk_size]
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # Fatias ainda referenciadas pelo chamador: o GC desfaz o mapeamento
+                pass
@@ -0,0 +1,186 @@
+"""
+Endpoint Multiplexado por Flow-ID
+Um único socket UDP e uma thread de recepção despacham pacotes GBN/SR para os fluxos
+"""
+
+import socket
+import struct
+import threading
+import time
+
+from .logger import ProtocolLogger
+from .buffer_pool import shared_pool, recv_view
+from .timer_wheel import TimerWheel
+
+
+# Implementacao da classe FlowEndpoint:
+class FlowEndpoint:
+    # Layout comum a GBNPacket e SRPacket: tipo (bit alto = flow-ID presente) + flow_id
+    FLAG_FLOW_ID = 0x80
+    TYPE_ACK = 1
+    # Resolucao da timer wheel compartilhada pelos fluxos
+    TIMER_TICK = 0.01
+
+    # Construtor - inicializa o objeto
+    def __init__(self, port=0, host=''):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.port = self.socket.getsockname()[1]
+        self.logger = ProtocolLogger("FLOW-ENDPOINT")
+
+        # flow_id -> fluxo; ACKs vao para senders, dados para receivers
+        self.senders = {}
+        self.receivers = {}
+        # fluxo -> instante em que deve ser acordado (ex.: ACK atrasado, timer de retransmissao)
+        self.wakeups = {}
+        # Instante ate o qual a thread de recepcao esta bloqueada no socket
+        self.sleep_until = None
+        # Timer wheel unica para os fluxos (criada no primeiro uso), chaves (flow_id, seq)
+        self.timers = None
+
+        self.datagrams_received = 0
+        self.unknown_flow = 0
+
+        self.running = False
+        self.recv_thread = None
+        self.lock = threading.Lock()
+
+        self.start()
+
+    # Extrai o flow_id do cabecalho sem decodificar o pacote (None se ausente)
+    @classmethod
+    def peek_flow_id(cls, datagram):
+        if len(datagram) < 5 or not datagram[0] & cls.FLAG_FLOW_ID:
+            return None
+        return struct.unpack_from('!I', datagram, 1)[0]
+
+    # Inicia operacao
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.recv_thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.recv_thread.start()
+        self.logger.info(f"Listening on port {self.port}")
+
+    # Metodo para registrar um fluxo (sender recebe ACKs, receiver recebe dados)
+    def register(self, flow_id, flow, sender):
+        table = self.senders if sender else self.receivers
+        with self.lock:
+            if flow_id in table:
+                raise ValueError(f"flow_id {flow_id} ja registrado")
+            table[flow_id] = flow
+
+    def unregister(self, flow_id, sender):
+        table = self.senders if sender else self.receivers
+        with self.lock:
+            flow = table.pop(flow_id, None)
+            self.wakeups.pop(flow, None)
+
+    # Agenda uma chamada a flow._on_wakeup() a partir do instante deadline
+    def wake_at(self, flow, deadline):
+        with self.lock:
+            current = self.wakeups.get(flow)
+            if current is None or deadline < current:
+                self.wakeups[flow] = deadline
+            # Outra thread antecipou o proximo prazo: um datagrama vazio desbloqueia o recv
+            nudge = (threading.current_thread() is not self.recv_thread
+                     and self.sleep_until is not None and deadline < self.sleep_until)
+            if nudge:
+                self.sleep_until = deadline
+        if nudge:
+            self._nudge()
+
+    def _nudge(self):
+        host, port = self.socket.getsockname()[:2]
+        try:
+            self.socket.sendto(b'', ('127.0.0.1' if host in ('', '0.0.0.0') else host, port))
+        except OSError:
+            pass
+
+    # Metodo para obter a timer wheel compartilhada; expiracoes vao para sender._on_timeouts(chaves)
+    def timer_wheel(self):
+        with self.lock:
+            if self.timers is None:
+                self.timers = TimerWheel(self._on_timer_expire, tick=self.TIMER_TICK)
+            return self.timers
+
+    # Agrupa o lote vencido por fluxo: cada sender trata as suas chaves sob um unico lock
+    def _on_timer_expire(self, keys):
+        by_flow = {}
+        for key in keys:
+            by_flow.setdefault(key[0], []).append(key)
+        for flow_id, flow_keys in by_flow.items():
+            flow = self.senders.get(flow_id)
+            if flow is not None:
+                flow._on_timeouts(flow_keys)
+
+    def _dispatch(self, datagram, addr):
+        flow_id = self.peek_flow_id(datagram)
+        table = self.senders if datagram[0] & ~self.FLAG_FLOW_ID == self.TYPE_ACK else self.receivers
+        flow = table.get(flow_id) if flow_id is not None else None
+        if flow is None:
+            self.unknown_flow += 1
+            return
+        flow._process_datagram(datagram, addr)
+
+    def _run_wakeups(self):
+        now = time.time()
+        with self.lock:
+            due = [flow for flow, deadline in self.wakeups.items() if deadline <= now]
+            for flow in due:
+                del self.wakeups[flow]
+        for flow in due:
+            flow._on_wakeup()
+
+    def _receive_loop(self):
+        idle_timeout = 1.0
+        current_timeout = idle_timeout
+        self.socket.settimeout(idle_timeout)
+        with shared_pool.slab() as slab:
+            while self.running:
+                with self.lock:
+                    deadline = min(self.wakeups.values()) if self.wakeups else None
+                    now = time.time()
+                    if deadline is None:
+                        wanted_timeout = idle_timeout
+                    else:
+                        wanted_timeout = max(0.001, min(idle_timeout, deadline - now))
+                    self.sleep_until = now + wanted_timeout
+                try:
+                    if wanted_timeout != current_timeout:
+                        self.socket.settimeout(wanted_timeout)
+                        current_timeout = wanted_timeout
+                    datagram, addr = recv_view(self.socket, slab)
+                    # Datagrama vazio: so acorda o loop (ver wake_at)
+                    if datagram:
+                        self.datagrams_received += 1
+                        self._dispatch(datagram, addr)
+                except socket.timeout:
+                    pass
+                except Exception as e:
+                    if self.running:
+                        self.logger.error(f"Error in receive loop: {e}")
+                self._run_wakeups()
+
+    def get_statistics(self):
+        with self.lock:
+            return {
+                'senders': len(self.senders),
+                'receivers': len(self.receivers),
+                'datagrams_received': self.datagrams_received,
+                'unknown_flow': self.unknown_flow
+            }
+
+    # Para operacao
+    def stop(self):
+        self.running = False
+        if self.timers:
+            self.timers.stop()
+        if self.recv_thread:
+            self.recv_thread.join(timeout=2.0)
+
+    # Fecha e libera recursos
+    def close(self):
+        self.stop()
+        self.socket.close()
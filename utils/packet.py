@@ -12,8 +12,12 @@ PACKET_TYPE_ACK = 1
 PACKET_TYPE_NAK = 2
 
 
-def calculate_checksum(data):
-    return hashlib.md5(data).digest()[:4]
+# Aceita varias partes (ex.: views do cabecalho e do payload) sem concatena-las
+def calculate_checksum(*parts):
+    digest = hashlib.md5()
+    for part in parts:
+        digest.update(part)
+    return digest.digest()[:4]
 
 def verify_checksum(data, expected_checksum):
     actual_checksum = calculate_checksum(data)
@@ -34,17 +38,17 @@ class RDT20Packet:
         return header + self.data
     @classmethod
     def from_bytes(cls, packet_bytes):
-        if len(packet_bytes) < cls.HEADER_SIZE:
+        # Aceita bytes ou memoryview (slab do BufferPool); so o payload e copiado
+        view = memoryview(packet_bytes)
+        if len(view) < cls.HEADER_SIZE:
             return None, False
-        header = packet_bytes[:cls.HEADER_SIZE]
-        packet_type, checksum = struct.unpack(cls.HEADER_FORMAT, header)
+        packet_type, checksum = struct.unpack_from(cls.HEADER_FORMAT, view)
         
-        data = packet_bytes[cls.HEADER_SIZE:]
+        is_valid = calculate_checksum(view[:1], view[cls.HEADER_SIZE:]) == checksum
         
-        expected_data = bytes([packet_type]) + data
-        is_valid = verify_checksum(expected_data, checksum)
-        
-        packet = cls(packet_type, data)
+        packet = cls.__new__(cls)
+        packet.packet_type = packet_type
+        packet.data = bytes(view[cls.HEADER_SIZE:])
         packet.checksum = checksum
         
         return packet, is_valid
@@ -71,17 +75,17 @@ class RDT21Packet:
         return header + self.data
     @classmethod
     def from_bytes(cls, packet_bytes):
-        if len(packet_bytes) < cls.HEADER_SIZE:
+        view = memoryview(packet_bytes)
+        if len(view) < cls.HEADER_SIZE:
             return None, False
-        header = packet_bytes[:cls.HEADER_SIZE]
-        packet_type, seq_num, checksum = struct.unpack(cls.HEADER_FORMAT, header)
-        
-        data = packet_bytes[cls.HEADER_SIZE:]
+        packet_type, seq_num, checksum = struct.unpack_from(cls.HEADER_FORMAT, view)
         
-        expected_data = bytes([packet_type, seq_num]) + data
-        is_valid = verify_checksum(expected_data, checksum)
+        is_valid = calculate_checksum(view[:2], view[cls.HEADER_SIZE:]) == checksum
         
-        packet = cls(packet_type, seq_num, data)
+        packet = cls.__new__(cls)
+        packet.packet_type = packet_type
+        packet.seq_num = seq_num
+        packet.data = bytes(view[cls.HEADER_SIZE:])
         packet.checksum = checksum
         
         return packet, is_valid
@@ -93,4 +97,50 @@ class RDT21Packet:
 
 # Implementacao da classe RDT30Packet
 class RDT30Packet(RDT21Packet):
-    pass
\ No newline at end of file
+    HEADER_FORMAT = '!BBB4s'
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    
+    FLAG_MORE_FRAGMENTS = 0x01
+    
+    # Datagrama usado ate o receptor anunciar o seu maximo no ACK
+    DEFAULT_MAX_DATAGRAM = 1024
+    MAX_DATAGRAM = 8192
+    
+    # Construtor - inicializa o objeto
+    def __init__(self, packet_type, seq_num, data=b'', flags=0):
+        self.packet_type = packet_type
+        self.seq_num = seq_num
+        self.flags = flags
+        self.data = data
+        self.checksum = calculate_checksum(bytes([packet_type, seq_num, flags]) + data)
+    def to_bytes(self):
+        header = struct.pack(self.HEADER_FORMAT, self.packet_type,
+                           self.seq_num, self.flags, self.checksum)
+        return header + self.data
+    @classmethod
+    def from_bytes(cls, packet_bytes):
+        view = memoryview(packet_bytes)
+        if len(view) < cls.HEADER_SIZE:
+            return None, False
+        packet_type, seq_num, flags, checksum = struct.unpack_from(cls.HEADER_FORMAT, view)
+        
+        is_valid = calculate_checksum(view[:3], view[cls.HEADER_SIZE:]) == checksum
+        
+        packet = cls.__new__(cls)
+        packet.packet_type = packet_type
+        packet.seq_num = seq_num
+        packet.flags = flags
+        packet.data = bytes(view[cls.HEADER_SIZE:])
+        packet.checksum = checksum
+        
+        return packet, is_valid
+    
+    @property
+    def more_fragments(self):
+        return (self.flags & self.FLAG_MORE_FRAGMENTS) != 0
+    
+    def __str__(self):
+        text = super().__str__()
+        if self.more_fragments:
+            text += " MF"
+        return text
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Ring Buffer de Pacotes
+Slots de capacidade fixa indexados por seq % capacidade (janelas deslizantes)
+"""
+
+
+# Implementacao da classe PacketRing:
+class PacketRing:
+    # Construtor - inicializa o objeto (slots alocados uma unica vez)
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity deve ser >= 1")
+        self.capacity = capacity
+        self.slots = [None] * capacity
+
+    def put(self, seq, item):
+        self.slots[seq % self.capacity] = item
+
+    def get(self, seq):
+        return self.slots[seq % self.capacity]
+
+    # Retorna os itens de [start, end) em ordem, no maximo 2 fatias contiguas
+    def range(self, start, end):
+        count = end - start
+        if count <= 0:
+            return []
+        if count > self.capacity:
+            raise ValueError("intervalo maior que a capacidade do ring")
+        first = start % self.capacity
+        last = first + count
+        if last <= self.capacity:
+            return self.slots[first:last]
+        return self.slots[first:] + self.slots[:last - self.capacity]
@@ -0,0 +1,97 @@
+"""
+Buffer de Reordenação Circular
+Slots de capacidade fixa (seq % capacidade) com bitmap de ocupação para pacotes fora de ordem
+"""
+
+
+# Implementacao da classe ReorderBuffer:
+class ReorderBuffer:
+    # Construtor - inicializa o objeto (slots alocados uma unica vez)
+    # Com slot_size, os payloads sao copiados para uma arena unica e lidos como memoryview
+    def __init__(self, capacity, slot_size=None):
+        if capacity < 1:
+            raise ValueError("capacity deve ser >= 1")
+        self.capacity = capacity
+        self.occupied = bytearray(capacity)
+        self.count = 0
+        self.slot_size = slot_size
+        if slot_size is None:
+            self.slots = [None] * capacity
+        else:
+            self.arena = bytearray(capacity * slot_size)
+            self.view = memoryview(self.arena)
+            self.lengths = [0] * capacity
+
+    def __len__(self):
+        return self.count
+
+    # Valido apenas para seqs dentro da janela atual (a mesma seq % capacity)
+    def __contains__(self, seq):
+        return self.occupied[seq % self.capacity] == 1
+
+    # Metodo para guardar um pacote fora de ordem (False se o slot ja estiver ocupado)
+    def insert(self, seq, data):
+        idx = seq % self.capacity
+        if self.occupied[idx]:
+            return False
+        if self.slot_size is None:
+            self.slots[idx] = data
+        else:
+            if len(data) > self.slot_size:
+                raise ValueError(f"payload de {len(data)} bytes excede slot_size={self.slot_size}")
+            # Atribuicao pela memoryview: copia direta do buffer de origem
+            size = len(data)
+            offset = idx * self.slot_size
+            self.view[offset:offset + size] = data
+            self.lengths[idx] = size
+        self.occupied[idx] = 1
+        self.count += 1
+        return True
+
+    # Retorna o payload guardado (None se livre); no modo arena, a view vale ate o slot ser reusado
+    def get(self, seq):
+        idx = seq % self.capacity
+        if not self.occupied[idx]:
+            return None
+        if self.slot_size is None:
+            return self.slots[idx]
+        offset = idx * self.slot_size
+        return self.view[offset:offset + self.lengths[idx]]
+
+    def remove(self, seq):
+        idx = seq % self.capacity
+        if self.occupied[idx]:
+            self.occupied[idx] = 0
+            self.count -= 1
+            if self.slot_size is None:
+                self.slots[idx] = None
+
+    # Remove e retorna os payloads contiguos a partir de start (no maximo max_items);
+    # a sequencia ocupada e localizada no bitmap com find(0), no maximo 2 fatias
+    def drain(self, start, max_items=None):
+        if not self.count:
+            return []
+        limit = self.count if max_items is None else min(max_items, self.count)
+        first = start % self.capacity
+        items = self._take(first, min(self.capacity, first + limit))
+        if first + len(items) == self.capacity and len(items) < limit:
+            items += self._take(0, limit - len(items))
+        return items
+
+    # Remove a sequencia ocupada que comeca no slot first (ate o slot end, exclusive)
+    def _take(self, first, end):
+        stop = self.occupied.find(0, first, end)
+        if stop < 0:
+            stop = end
+        n = stop - first
+        if not n:
+            return []
+        if self.slot_size is None:
+            items = self.slots[first:stop]
+            self.slots[first:stop] = [None] * n
+        else:
+            items = [self.view[idx * self.slot_size:idx * self.slot_size + self.lengths[idx]]
+                     for idx in range(first, stop)]
+        self.occupied[first:stop] = bytes(n)
+        self.count -= n
+        return items
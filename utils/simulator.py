@@ -11,13 +11,21 @@ import time
 # Implementacao da classe UnreliableChannel:
 class UnreliableChannel:
     # Construtor - inicializa o objeto
-    def __init__(self, loss_rate=0.1, corrupt_rate=0.1, delay_range=(0.01, 0.5)):
+    def __init__(self, loss_rate=0.1, corrupt_rate=0.1, delay_range=(0.01, 0.5),
+                 bandwidth=None, queue_limit=64 * 1024):
         self.loss_rate = loss_rate
         self.corrupt_rate = corrupt_rate
         self.delay_range = delay_range
         self.packets_sent = 0
         self.packets_lost = 0
         self.packets_corrupted = 0
+        
+        # Gargalo opcional: bandwidth em bytes/s e fila drop-tail de queue_limit bytes
+        self.bandwidth = bandwidth
+        self.queue_limit = queue_limit
+        self.link_free_at = 0.0
+        self.packets_dropped_queue = 0
+        self.lock = threading.Lock()
     
     # Metodo para enviar dados
     def send(self, packet, dest_socket, dest_addr):
@@ -33,10 +41,28 @@ class UnreliableChannel:
             print(f"[SIMULADOR] 📦⚠️  Pacote {self.packets_sent} CORROMPIDO")
         
         delay = random.uniform(*self.delay_range)
+        if self.bandwidth:
+            queue_delay = self._enqueue_on_link(len(packet))
+            if queue_delay is None:
+                self.packets_lost += 1
+                self.packets_dropped_queue += 1
+                print(f"[SIMULADOR] 📦❌ Pacote {self.packets_sent} DESCARTADO (fila do gargalo cheia)")
+                return
+            delay += queue_delay
         timer = threading.Timer(delay, lambda: dest_socket.sendto(packet, dest_addr))
         timer.daemon = True
         timer.start()
     
+    # Reserva o enlace; retorna o atraso de fila + transmissao ou None se a fila transbordar
+    def _enqueue_on_link(self, size):
+        with self.lock:
+            now = time.time()
+            start = max(now, self.link_free_at)
+            if (start - now) * self.bandwidth + size > self.queue_limit:
+                return None
+            self.link_free_at = start + size / self.bandwidth
+            return self.link_free_at - now
+    
     def _corrupt_packet(self, packet):
         if len(packet) == 0:
             return packet
@@ -54,6 +80,7 @@ class UnreliableChannel:
             'packets_sent': self.packets_sent,
             'packets_lost': self.packets_lost,
             'packets_corrupted': self.packets_corrupted,
+            'packets_dropped_queue': self.packets_dropped_queue,
             'loss_rate_actual': self.packets_lost / max(1, self.packets_sent),
             'corrupt_rate_actual': self.packets_corrupted / max(1, self.packets_sent)
         }
@@ -63,6 +90,7 @@ class UnreliableChannel:
         self.packets_sent = 0
         self.packets_lost = 0
         self.packets_corrupted = 0
+        self.packets_dropped_queue = 0
     def print_stats(self, logger=None):
         stats = self.get_statistics()
         msg = (f"Channel stats: {{'packets_sent': {stats['packets_sent']}, "
@@ -7,8 +7,12 @@ import struct
 import hashlib
 
 
-def calculate_checksum(data):
-    return hashlib.md5(data).digest()[:4]
+# Aceita varias partes (ex.: views do cabecalho e do payload) sem concatena-las
+def calculate_checksum(*parts):
+    digest = hashlib.md5()
+    for part in parts:
+        digest.update(part)
+    return digest.digest()[:4]
 
 def verify_checksum(data, expected_checksum):
     actual_checksum = calculate_checksum(data)
@@ -22,43 +26,73 @@ class SRPacket:
     HEADER_FORMAT = '!BI4s'
     HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
     
+    # Flow-ID opcional: bit alto do tipo sinaliza 4 bytes de flow_id apos o tipo
+    FLAG_FLOW_ID = 0x80
+    FLOW_HEADER_FORMAT = '!BII4s'
+    FLOW_HEADER_SIZE = struct.calcsize(FLOW_HEADER_FORMAT)
+    
     # Construtor - inicializa o objeto
-    def __init__(self, packet_type, seq_num, data=b''):
+    def __init__(self, packet_type, seq_num, data=b'', flow_id=None):
         self.packet_type = packet_type
         self.seq_num = seq_num
         self.data = data
-        self.checksum = calculate_checksum(
-            struct.pack('!BI', packet_type, seq_num) + data
-        )
+        self.flow_id = flow_id
+        self.checksum = calculate_checksum(self._checksum_header() + data)
+    
+    def _checksum_header(self):
+        if self.flow_id is None:
+            return struct.pack('!BI', self.packet_type, self.seq_num)
+        return struct.pack('!BII', self.packet_type | self.FLAG_FLOW_ID, self.flow_id, self.seq_num)
+    
     def to_bytes(self):
-        header = struct.pack(self.HEADER_FORMAT, 
-                           self.packet_type, 
-                           self.seq_num, 
-                           self.checksum)
+        if self.flow_id is None:
+            header = struct.pack(self.HEADER_FORMAT, 
+                               self.packet_type, 
+                               self.seq_num, 
+                               self.checksum)
+        else:
+            header = struct.pack(self.FLOW_HEADER_FORMAT,
+                               self.packet_type | self.FLAG_FLOW_ID,
+                               self.flow_id,
+                               self.seq_num,
+                               self.checksum)
         return header + self.data
     @classmethod
     def from_bytes(cls, packet_bytes):
-        if len(packet_bytes) < cls.HEADER_SIZE:
+        # Aceita bytes ou memoryview (slab do BufferPool); so o payload e copiado
+        view = memoryview(packet_bytes)
+        if len(view) < cls.HEADER_SIZE:
             return None
-        header = packet_bytes[:cls.HEADER_SIZE]
-        packet_type, seq_num, checksum = struct.unpack(cls.HEADER_FORMAT, header)
-        
-        data = packet_bytes[cls.HEADER_SIZE:]
+        flow_id = None
+        if view[0] & cls.FLAG_FLOW_ID:
+            header_size = cls.FLOW_HEADER_SIZE
+            if len(view) < header_size:
+                return None
+            packet_type, flow_id, seq_num, checksum = struct.unpack_from(cls.FLOW_HEADER_FORMAT, view)
+            packet_type &= ~cls.FLAG_FLOW_ID
+        else:
+            header_size = cls.HEADER_SIZE
+            packet_type, seq_num, checksum = struct.unpack_from(cls.HEADER_FORMAT, view)
         
-        expected_data = struct.pack('!BI', packet_type, seq_num) + data
-        is_valid = verify_checksum(expected_data, checksum)
+        is_valid = calculate_checksum(view[:header_size - 4], view[header_size:]) == checksum
         
         if not is_valid:
             return None
         
-        packet = cls(packet_type, seq_num, data)
+        # Sem passar pelo construtor: o checksum ja veio no cabecalho
+        packet = cls.__new__(cls)
+        packet.packet_type = packet_type
+        packet.seq_num = seq_num
+        packet.flow_id = flow_id
+        packet.data = bytes(view[header_size:])
         packet.checksum = checksum
         
         return packet
     
     def __str__(self):
         type_names = {self.TYPE_DATA: 'DATA', self.TYPE_ACK: 'ACK'}
-        return f"[{type_names.get(self.packet_type, 'UNKNOWN')}] seq={self.seq_num} len={len(self.data)}"
+        flow = f" flow={self.flow_id}" if self.flow_id is not None else ""
+        return f"[{type_names.get(self.packet_type, 'UNKNOWN')}]{flow} seq={self.seq_num} len={len(self.data)}"
     
     def __repr__(self):
         return self.__str__()
@@ -75,8 +109,7 @@ class SRPacket:
     
     # Metodo para verificar corrupcao
     def is_corrupt(self):
-        expected_data = struct.pack('!BI', self.packet_type, self.seq_num) + self.data
-        return not verify_checksum(expected_data, self.checksum)
+        return not verify_checksum(self._checksum_header() + self.data, self.checksum)
     
     # Metodo para criar pacote ACK
     @classmethod
@@ -7,8 +7,12 @@ import struct
 import hashlib
 
 
-def calculate_checksum(data):
-    return hashlib.md5(data).digest()[:4]
+# Aceita varias partes (ex.: views do cabecalho e do payload) sem concatena-las
+def calculate_checksum(*parts):
+    digest = hashlib.md5()
+    for part in parts:
+        digest.update(part)
+    return digest.digest()[:4]
 
 def verify_checksum(data, expected_checksum):
     actual_checksum = calculate_checksum(data)
@@ -19,6 +23,7 @@ class TCPSegment:
     FLAG_SYN = 0x02
     FLAG_ACK = 0x10
     FLAG_FIN = 0x01
+    FLAG_PSH = 0x08
     
     HEADER_FORMAT = '!HHIIBHH4s'
     HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
@@ -49,18 +54,23 @@ class TCPSegment:
         return header + self.data
     @classmethod
     def from_bytes(cls, segment_bytes):
-        if len(segment_bytes) < cls.HEADER_SIZE:
+        # Aceita bytes ou memoryview (slab do BufferPool); so o payload e copiado
+        view = memoryview(segment_bytes)
+        if len(view) < cls.HEADER_SIZE:
             return None, False
-        header = segment_bytes[:cls.HEADER_SIZE]
         src_port, dst_port, seq_num, ack_num, flags, window, _, checksum = \
-            struct.unpack(cls.HEADER_FORMAT, header)
+            struct.unpack_from(cls.HEADER_FORMAT, view)
         
-        data = segment_bytes[cls.HEADER_SIZE:]
+        is_valid = calculate_checksum(view[:cls.HEADER_SIZE - 4], view[cls.HEADER_SIZE:]) == checksum
         
-        header_data = struct.pack('!HHIIBHH', src_port, dst_port, seq_num, ack_num, flags, window, 0)
-        is_valid = verify_checksum(header_data + data, checksum)
-        
-        segment = cls(src_port, dst_port, seq_num, ack_num, flags, window, data)
+        segment = cls.__new__(cls)
+        segment.src_port = src_port
+        segment.dst_port = dst_port
+        segment.seq_num = seq_num
+        segment.ack_num = ack_num
+        segment.flags = flags
+        segment.window = window
+        segment.data = bytes(view[cls.HEADER_SIZE:])
         segment.checksum = checksum
         
         return segment, is_valid
@@ -75,6 +85,8 @@ class TCPSegment:
             flags_str.append("ACK")
         if self.has_flag(self.FLAG_FIN):
             flags_str.append("FIN")
+        if self.has_flag(self.FLAG_PSH):
+            flags_str.append("PSH")
         
         flags_repr = "|".join(flags_str) if flags_str else "NONE"
         return f"TCP[{flags_repr}] seq={self.seq_num} ack={self.ack_num} len={len(self.data)}"
@@ -0,0 +1,115 @@
+"""
+Timer Wheel
+Uma thread por roda com prazos por chave: arm/cancel O(1) e expirações entregues em lote
+"""
+
+import threading
+import time
+
+
+# Implementacao da classe TimerWheel:
+class TimerWheel:
+    # Construtor - inicializa o objeto
+    def __init__(self, on_expire, tick=0.01, slots=512):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick deve ser > 0 e slots >= 1")
+        self.on_expire = on_expire
+        self.tick = tick
+        self.num_slots = slots
+        # Cada slot guarda chave -> tick absoluto de expiracao (voltas futuras ficam no slot)
+        self.slots = [{} for _ in range(slots)]
+        # chave -> tick absoluto, para cancelar sem procurar
+        self.deadlines = {}
+
+        self.start_time = time.monotonic()
+        self.current_tick = 0
+
+        self.expirations = 0
+        self.batches = 0
+
+        self.running = True
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        with self.cond:
+            return len(self.deadlines)
+
+    # Metodo para armar (ou rearmar) o prazo de uma chave
+    def arm(self, key, delay):
+        with self.cond:
+            now = time.monotonic()
+            if not self.deadlines:
+                # Roda vazia: pula os ticks ociosos em vez de percorre-los depois
+                self.current_tick = max(self.current_tick, int((now - self.start_time) / self.tick))
+            expiry = self._tick_for(now + delay)
+            previous = self.deadlines.get(key)
+            if previous is not None:
+                self._remove(key, previous)
+            self.deadlines[key] = expiry
+            self.slots[expiry % self.num_slots][key] = expiry
+            if len(self.deadlines) == 1:
+                self.cond.notify()
+
+    # Metodo para cancelar o prazo de uma chave (sem efeito se nao armada)
+    def cancel(self, key):
+        with self.cond:
+            expiry = self.deadlines.pop(key, None)
+            if expiry is not None:
+                self._remove(key, expiry)
+
+    def _remove(self, key, expiry):
+        slot = self.slots[expiry % self.num_slots]
+        del slot[key]
+        if not slot:
+            # dict nao encolhe ao remover: clear() devolve a tabela de um slot vazio
+            slot.clear()
+
+    def _tick_for(self, instant):
+        # Arredonda para cima: nunca expira antes do prazo
+        ticks = (instant - self.start_time) / self.tick
+        return max(self.current_tick + 1, int(ticks) + (ticks > int(ticks)))
+
+    # Remove e retorna as chaves vencidas ate o tick atual (chamado com self.cond adquirido)
+    def _advance(self, now_tick):
+        expired = []
+        while self.current_tick < now_tick and self.deadlines:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % self.num_slots]
+            if slot:
+                due = [key for key, expiry in slot.items() if expiry <= self.current_tick]
+                for key in due:
+                    self._remove(key, expiry=self.current_tick)
+                    del self.deadlines[key]
+                expired.extend(due)
+        self.current_tick = max(self.current_tick, now_tick)
+        return expired
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.deadlines:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                next_tick_at = self.start_time + (self.current_tick + 1) * self.tick
+                remaining = next_tick_at - time.monotonic()
+                if remaining > 0:
+                    self.cond.wait(remaining)
+                    if not self.running:
+                        return
+                now_tick = int((time.monotonic() - self.start_time) / self.tick)
+                expired = self._advance(now_tick)
+            if expired:
+                self.expirations += len(expired)
+                self.batches += 1
+                self.on_expire(expired)
+
+    # Para operacao
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)